@@ -0,0 +1,101 @@
+"""
+Latency of ordinary requests while logins are in flight.
+
+Runs the app in-process on one event loop (like a single uvicorn worker) against a throwaway SQLite DB,
+and measures GET /health latency idle, then while --login-concurrency clients log in back to back.
+
+Usage: python bench_auth.py [--login-concurrency 8] [--probes 200] [--probe-concurrency 5]
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import httpx
+from sqlmodel import SQLModel, Session, create_engine
+
+from database import get_session
+from models import User
+from routers.auth import get_password_hash
+from bench_stats import percentile
+from main import app
+
+USERNAME = "bench"
+PASSWORD = "bench-password"
+
+def _report(label, latencies):
+    ms = [v * 1000 for v in latencies]
+    print(f"{label:<22} n={len(ms):<5} p50={percentile(ms, 50):7.2f}ms  p95={percentile(ms, 95):7.2f}ms  max={max(ms):7.2f}ms")
+
+async def _probe(client, count, latencies):
+    for _ in range(count):
+        start = time.perf_counter()
+        res = await client.get("/health")
+        latencies.append(time.perf_counter() - start)
+        assert res.status_code == 200
+
+async def _probes(client, total, concurrency):
+    latencies = []
+    await asyncio.gather(*(_probe(client, total // concurrency, latencies) for _ in range(concurrency)))
+    return latencies
+
+async def _login_loop(client, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        res = await client.post("/auth/login", data={"username": USERNAME, "password": PASSWORD})
+        assert res.status_code == 200, res.text
+        latencies.append(time.perf_counter() - start)
+
+async def run(login_concurrency, probes, probe_concurrency):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await _probes(client, probe_concurrency * 4, probe_concurrency) # Warm up
+
+        idle = await _probes(client, probes, probe_concurrency)
+        _report("health (idle)", idle)
+
+        stop = asyncio.Event()
+        login_times = []
+        logins = [asyncio.create_task(_login_loop(client, stop, login_times)) for _ in range(login_concurrency)]
+        await asyncio.sleep(0.05) # Let the logins get going
+
+        start = time.perf_counter()
+        busy = await _probes(client, probes, probe_concurrency)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*logins)
+
+        _report("health (during logins)", busy)
+        _report("login", login_times)
+        print(f"{len(login_times)} logins, {probes} probes in {elapsed:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--login-concurrency", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--probe-concurrency", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+            connect_args={"check_same_thread": False}
+        )
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(User(username=USERNAME, password_hash=get_password_hash(PASSWORD), role="worker"))
+            session.commit()
+
+        def override_session():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = override_session
+        try:
+            asyncio.run(run(args.login_concurrency, args.probes, args.probe_concurrency))
+        finally:
+            app.dependency_overrides.pop(get_session, None)
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
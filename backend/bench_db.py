@@ -0,0 +1,152 @@
+"""
+Throughput of the hot read endpoints: sync sessions in the threadpool vs the async engine (ASYNC_DB=true).
+
+Each mode runs in a fresh subprocess (ASYNC_DB is read at import time) against the same throwaway SQLite DB,
+seeded with --rows transactions. Set BENCH_DATABASE_URL to benchmark an existing Postgres DB instead
+(read only, nothing is seeded). The result cache is disabled so every request reaches the DB.
+
+Usage: python bench_db.py [--clients 50] [--seconds 10] [--rows 5000]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+
+from bench_stats import percentile
+
+# Request mix: (method, path, json body)
+ENDPOINTS = [
+    ("GET", "/inventory/", None),
+    ("GET", "/stats/dashboard", None),
+    ("GET", "/transactions/page?limit=100", None),
+    ("GET", "/transactions/?limit=200", None),
+    ("GET", "/reports/transport?limit=100", None),
+    ("POST", "/analytics/query", {"report_type": "profit", "group_by": "grain"}),
+]
+
+def seed(rows):
+    from sqlmodel import Session
+    from database import engine, create_db_and_tables
+    from models import Grain, Warehouse, Contact, Transaction, DispatchInfo
+    import ledger
+
+    create_db_and_tables()
+    rng = random.Random(1)
+    with Session(engine) as session:
+        grains = [Grain(name=f"Grain {i}") for i in range(5)]
+        warehouses = [Warehouse(name=f"Godown {i}") for i in range(3)]
+        contacts = [Contact(name=f"Party {i}", type=rng.choice(["buyer", "supplier"])) for i in range(50)]
+        session.add_all(grains + warehouses + contacts)
+        session.flush()
+
+        start = datetime(2024, 4, 1)
+        for i in range(rows):
+            trx_type = "purchase" if i % 3 else "sale"
+            qty = round(rng.uniform(5, 100), 2)
+            rate = round(rng.uniform(2000, 3000), 2)
+            group_id = f"bench-{i}" if trx_type == "sale" else None
+            session.add(Transaction(
+                date=start + timedelta(minutes=i * 7), type=trx_type, invoice_number=i + 1,
+                grain_id=rng.choice(grains).id, contact_id=rng.choice(contacts).id,
+                warehouse_id=rng.choice(warehouses).id, quantity_quintal=qty, rate_per_quintal=rate,
+                total_amount=round(qty * rate, 2), amount_paid=rng.choice([0.0, round(qty * rate, 2)]),
+                sale_group_id=group_id, transporter_name="Bench Transport" if group_id else None
+            ))
+            if group_id:
+                session.add(DispatchInfo(
+                    sale_group_id=group_id, transporter_name="Bench Transport",
+                    total_weight=qty, rate=50, gross_freight=qty * 50
+                ))
+        ledger.rebuild(session)
+        session.commit()
+
+async def _client(client, deadline, latencies, errors):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        method, path, body = rng.choice(ENDPOINTS)
+        start = time.perf_counter()
+        res = await client.request(method, path, json=body)
+        latencies.append(time.perf_counter() - start)
+        if res.status_code != 200:
+            errors.append(res.status_code)
+
+async def _run(clients, seconds):
+    import httpx
+    import database
+    from main import app
+
+    latencies, errors = [], []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+        for method, path, body in ENDPOINTS: # Warm up
+            await client.request(method, path, json=body)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_client(client, start + seconds, latencies, errors) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(ms),
+        "errors": len(errors),
+        "rps": len(ms) / elapsed,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99)
+    }
+
+def _child(mode, args):
+    if mode == "seed":
+        seed(args.rows)
+        return
+    result = asyncio.run(_run(args.clients, args.seconds))
+    print("RESULT " + json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--child", choices=["seed", "sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args)
+        return
+
+    script = os.path.abspath(__file__)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, CACHE_TTL_SECONDS="0")
+        env.pop("DATABASE_URL", None)
+        if os.getenv("BENCH_DATABASE_URL"):
+            env["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+        else:
+            print(f"Seeding {args.rows} transactions...")
+            subprocess.run([sys.executable, script, "--child", "seed", "--rows", str(args.rows)],
+                           cwd=tmp_dir, env=env, check=True, capture_output=True)
+
+        results = {}
+        for mode in ("sync", "async"):
+            mode_env = dict(env, ASYNC_DB="true" if mode == "async" else "false")
+            proc = subprocess.run(
+                [sys.executable, script, "--child", mode, "--clients", str(args.clients), "--seconds", str(args.seconds)],
+                cwd=tmp_dir, env=mode_env, check=True, capture_output=True, text=True
+            )
+            line = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")][-1]
+            results[mode] = json.loads(line[len("RESULT "):])
+
+    print(f"{args.clients} concurrent clients, {args.seconds:.0f}s per mode")
+    for mode, r in results.items():
+        print(f"{mode:<6} {r['rps']:8.1f} req/s  p50={r['p50_ms']:7.1f}ms  p95={r['p95_ms']:7.1f}ms  "
+              f"p99={r['p99_ms']:7.1f}ms  requests={r['requests']}  errors={r['errors']}")
+
+if __name__ == "__main__":
+    main()
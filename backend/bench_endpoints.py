@@ -0,0 +1,186 @@
+"""
+Endpoint micro-benchmarks, in-process (TestClient on a temporary SQLite DB) at fixed dataset sizes,
+checked against a stored baseline.
+
+Each size runs in its own subprocess on a fresh copy of a generate_data.py dataset. The result cache is
+off, so every call reaches the DB. The median of --repeat runs is compared to bench_baseline.json.
+A case regresses when it is more than --threshold (default 25%) and MIN_REGRESSION_MS slower than the
+baseline, and the script then exits with code 1. Baselines depend on the machine: record them with
+--update-baseline on the machine that runs the check.
+
+Usage: python bench_endpoints.py [--sizes 10000,100000,1000000] [--repeat 5] [--threshold 0.25]
+                                 [--data-dir DIR] [--baseline bench_baseline.json] [--update-baseline]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+DEFAULT_SIZES = "10000,100000,1000000"
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DB_FILE = "grain_trading_v11.db" # database.py's local SQLite file, relative to the working directory
+MIN_REGRESSION_MS = 5.0 # Ignore slowdowns smaller than this (timer noise on fast cases)
+
+def _check(res):
+    assert res.status_code == 200, f"{res.request.method} {res.request.url} -> {res.status_code}: {res.text[:200]}"
+    return res
+
+def _cases(client, engine):
+    """name -> zero-argument callable doing one timed call."""
+    from sqlmodel import Session, select
+    from models import StockBalance, Contact
+    from routers.analytics import _get_analytics_data, AnalyticsQuery
+
+    def analytics(**query):
+        # Short session per call: an open SQLite read transaction would block create_bulk_sale's commit
+        with Session(engine) as session:
+            return _get_analytics_data(session, AnalyticsQuery(**query), 500)
+
+    # Bulk sale: 1 quintal from the fullest warehouse, so repeated runs never run out of stock
+    with Session(engine) as session:
+        stock = session.exec(select(StockBalance).order_by(StockBalance.quantity_quintal.desc())).first()
+        buyer = session.exec(select(Contact).where(Contact.type == "buyer")).first() or session.exec(select(Contact)).first()
+    sale = {
+        "contact_id": buyer.id, "grain_id": stock.grain_id, "rate_per_quintal": 2500, "total_weight_kg": 100,
+        "transport_cost_per_qtl": 40, "warehouses": [{"warehouse_id": stock.warehouse_id, "bags": 2}]
+    }
+    end = datetime.now()
+    export = {"report_type": "sale", "group_by": "none", "start_date": (end - timedelta(days=365)).isoformat(),
+              "end_date": end.isoformat(), "status": "all", "search_query": None}
+
+    return {
+        "get_inventory_status": lambda: _check(client.get("/inventory/")),
+        "get_dashboard_stats": lambda: _check(client.get("/stats/dashboard")),
+        "_get_analytics_data (profit, detail)": lambda: analytics(report_type="profit"),
+        "_get_analytics_data (profit, by grain)": lambda: analytics(report_type="profit", group_by="grain"),
+        "get_transport_report": lambda: _check(client.get("/reports/transport")), # As the Reports screen calls it: no limit
+        "create_bulk_sale": lambda: _check(client.post("/transactions/bulk_sale", json=sale)),
+        "/analytics/export (sales, 1 year)": lambda: _check(client.post("/analytics/export", json=export)),
+    }
+
+def run_cases(repeat: int) -> dict:
+    from fastapi.testclient import TestClient
+    from database import engine
+    from main import app
+
+    results = {}
+    with TestClient(app) as client:
+        for name, call in _cases(client, engine).items():
+            call() # Warm up (first-call imports, SQLite page cache)
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                call()
+                times.append((time.perf_counter() - start) * 1000)
+            results[name] = {"median_ms": round(statistics.median(times), 2), "min_ms": round(min(times), 2)}
+    return results
+
+def _child(args):
+    if args.child == "seed":
+        from database import engine, create_db_and_tables
+        from generate_data import generate
+        create_db_and_tables()
+        generate(engine, args.rows, seed=1, log=lambda msg: None)
+        return
+    print("RESULT " + json.dumps(run_cases(args.repeat)))
+
+def _dataset(size: int, data_dir: str, env: dict) -> str:
+    path = os.path.join(data_dir, str(size))
+    if not os.path.exists(os.path.join(path, DB_FILE)):
+        os.makedirs(path, exist_ok=True)
+        print(f"Generating {size} transactions...")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "seed", "--rows", str(size)],
+                       cwd=path, env=env, check=True, capture_output=True)
+    return os.path.join(path, DB_FILE)
+
+def _measure(size: int, dataset: str, repeat: int, env: dict) -> dict:
+    # Fresh copy per run: create_bulk_sale writes
+    with tempfile.TemporaryDirectory() as run_dir:
+        shutil.copy(dataset, os.path.join(run_dir, DB_FILE))
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "run", "--repeat", str(repeat)],
+            cwd=run_dir, env=env, capture_output=True, text=True
+        )
+    if proc.returncode != 0:
+        sys.exit(f"Benchmark at {size} rows failed:\n{proc.stderr[-3000:]}")
+    line = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")][-1]
+    return json.loads(line[len("RESULT "):])
+
+def _compare(results: dict, baseline: dict, threshold: float):
+    regressions = []
+    print(f"{'rows':>8}  {'case':<40} {'median':>10} {'baseline':>10} {'change':>8}")
+    for size, cases in results.items():
+        for name, r in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                print(f"{size:>8}  {name:<40} {r['median_ms']:>8.1f}ms {'-':>10} {'new':>8}")
+                continue
+            change = r["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+            regressed = change > threshold and r["median_ms"] - base["median_ms"] > MIN_REGRESSION_MS
+            print(f"{size:>8}  {name:<40} {r['median_ms']:>8.1f}ms {base['median_ms']:>8.1f}ms {change * 100:>+7.1f}%"
+                  + ("  REGRESSION" if regressed else ""))
+            if regressed:
+                regressions.append((size, name))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma separated transaction counts")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--data-dir", help="Keep generated datasets here and reuse them (default: temporary)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--child", choices=["seed", "run"], help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    env = dict(os.environ, CACHE_TTL_SECONDS="0", SLOW_QUERY_MS="1e9")
+    env.pop("DATABASE_URL", None)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_data_")
+    results = {}
+    try:
+        for size in sizes:
+            dataset = _dataset(size, data_dir, env)
+            print(f"Benchmarking {size} rows...")
+            results[str(size)] = _measure(size, dataset, args.repeat, env)
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    baseline = {"results": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = _compare(results, baseline["results"], args.threshold)
+
+    if args.update_baseline:
+        baseline["results"].update(results)
+        baseline["meta"] = {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+            "repeat": args.repeat
+        }
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Serialization time and bytes on the wire for the large list endpoints.
+
+Runs in-process on a throwaway SQLite DB seeded by generate_data.py. Compares, for one GET /transactions/
+page of --rows rows:
+  - building the JSON body: ORM objects + response_model (validate + dump_json, the old path) against
+    Core rows + orjson (serialization.row_dicts, the lean path), query included and body only;
+  - the full request per Accept-Encoding: identity, gzip and br, with the body size actually sent.
+
+Usage: python bench_serialization.py [--rows 2000] [--repeat 15]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+def _median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp()) # database.py's local SQLite file lands here
+    os.environ["CACHE_TTL_SECONDS"] = "0"
+    os.environ.pop("DATABASE_URL", None)
+
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlmodel import Session, select
+    from fastapi.testclient import TestClient
+    import database
+    from generate_data import generate
+    from models import Transaction
+    from routers.transactions import TRANSACTION_COLUMNS
+    from serialization import dumps, row_dicts
+    from main import app
+
+    print(f"Seeding {args.rows} transactions...")
+    database.create_db_and_tables()
+    generate(database.engine, args.rows, log=lambda *a: None)
+
+    adapter = TypeAdapter(List[Transaction])
+    with Session(database.engine) as session:
+        orm_stmt = select(Transaction).limit(args.rows)
+        lean_stmt = select(*TRANSACTION_COLUMNS).limit(args.rows)
+        objects = session.exec(orm_stmt).all()
+        rows = session.exec(lean_stmt).all()
+        timings = [
+            ("ORM + response_model (before)", lambda: adapter.dump_json(adapter.validate_python(session.exec(orm_stmt).all()))),
+            ("Core rows + orjson (after)", lambda: dumps(row_dicts(session.exec(lean_stmt).all()))),
+            ("  body only, before", lambda: adapter.dump_json(adapter.validate_python(objects))),
+            ("  body only, after", lambda: dumps(row_dicts(rows))),
+        ]
+        print(f"\nJSON body for {args.rows} rows (median of {args.repeat})")
+        for name, fn in timings:
+            print(f"{name:<32} {_median_ms(fn, args.repeat):8.1f} ms")
+
+    client = TestClient(app)
+    print(f"\nGET /transactions/?limit={args.rows} (median of {args.repeat})")
+    for accept in ("identity", "gzip", "br"):
+        headers = {"Accept-Encoding": accept}
+        res = client.get("/transactions/", params={"limit": args.rows}, headers=headers)
+        sent = int(res.headers["content-length"])
+        ms = _median_ms(lambda: client.get("/transactions/", params={"limit": args.rows}, headers=headers), args.repeat)
+        print(f"{accept:<10} {ms:8.1f} ms  {sent:>10,} bytes  {res.headers.get('content-encoding', '-')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# Shared by the benchmark and load-test scripts (load_test.py, bench_db.py, bench_auth.py)
+
+def percentile(values, pct):
+    """Nearest-rank percentile (pct 0-100) of a non-empty list of latencies."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Config
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(32 * 1024 * 1024))) # Approximate (JSON size of cached results)
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300")) # Also bounds staleness across multiple workers
+
+# Global data version: every committed write bumps it, so cached results from before the write are never served again.
+# Per process. With several uvicorn workers, a write in one worker reaches the others' caches only after the TTL.
+_data_version = 0
+_version_lock = threading.Lock()
+
+def bump_data_version():
+    global _data_version
+    with _version_lock:
+        _data_version += 1
+
+def data_version() -> int:
+    return _data_version
+
+# Set for one request to recompute instead of serving cached results (profiled requests, see profiler.py).
+# The fresh result is still stored, so later requests benefit from it
+bypass_var: ContextVar[bool] = ContextVar("cache_bypass", default=False)
+
+# Per-resource versions (grains, warehouses, contacts, inventory) for conditional GETs, see conditional.py.
+# Bumped only by the writes that change that resource, so e.g. a payment leaves the master data ETags valid.
+_resource_versions: Dict[str, int] = {}
+
+def bump_resource_version(*resources: str):
+    with _version_lock:
+        for resource in resources:
+            _resource_versions[resource] = _resource_versions.get(resource, 0) + 1
+
+def resource_version(resource: str) -> int:
+    return _resource_versions.get(resource, 0)
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and an approximate memory cap."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Returns (found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key: Hashable, value: Any, size: int):
+        if size > self.max_bytes:
+            return # Would evict everything else, not worth caching
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self.current_bytes += size
+
+            # Evict least recently used until under the cap
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "data_version": _data_version
+            }
+
+result_cache = ResultCache(CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+def _cache_key(namespace: str, params: Any):
+    return (namespace, json.dumps(params, sort_keys=True, default=str), data_version())
+
+async def cached(namespace: str, params: Any, compute: Callable[[], Awaitable[Any]]):
+    """
+    Return await compute() from cache, keyed by namespace + normalized params + current data version.
+    The cached value is shared between requests: callers must not mutate it.
+    """
+    # Version read before computing: a write landing mid-compute leaves the result under the old version
+    key = _cache_key(namespace, params)
+    if not bypass_var.get():
+        found, value = result_cache.get(key)
+        if found:
+            return value
+
+    value = await compute()
+    result_cache.set(key, value, len(json.dumps(value, default=str)))
+    return value
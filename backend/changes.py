@@ -0,0 +1,90 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import inspect, literal, text, insert
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import Session, SQLModel, select, delete
+from models import Grain, Warehouse, Contact, Transaction, PaymentHistory, DispatchInfo, Tombstone
+
+# Rows written this close to a sync may not be committed yet: the next cursor starts this far back,
+# so they are picked up next time (replicas upsert by id, repeats are harmless)
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+# Tombstones are pruned after this long; a replica that has not synced for longer gets a full snapshot
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "90"))
+
+# Response key -> model, in dependency order (master data before the rows that reference it)
+SYNCED_MODELS: Dict[str, type] = {
+    "grains": Grain,
+    "warehouses": Warehouse,
+    "contacts": Contact,
+    "transactions": Transaction,
+    "payments": PaymentHistory,
+    "dispatches": DispatchInfo,
+}
+_KEY_BY_TABLE = {model.__tablename__: key for key, model in SYNCED_MODELS.items()}
+
+def record_delete(session: Session, row: SQLModel):
+    """Tombstone a synced row deleted through the ORM. Call in the same DB transaction as the delete."""
+    session.add(Tombstone(table_name=row.__tablename__, row_id=row.id))
+
+def record_delete_all(session: Session, model):
+    """Tombstone every row of a table about to be wiped, in one INSERT ... SELECT."""
+    session.exec(insert(Tombstone).from_select(
+        ["table_name", "row_id", "deleted_at"],
+        select(literal(model.__tablename__), model.id, literal(datetime.utcnow()))
+    ))
+
+def add_sync_columns(engine) -> List[str]:
+    """
+    Add updated_at (and its index) to synced tables created before delta sync.
+    Existing rows keep NULL: they are only sent in full snapshots. Returns the altered table names.
+    """
+    inspector = inspect(engine)
+    altered = []
+    with engine.begin() as conn:
+        for model in SYNCED_MODELS.values():
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            if "updated_at" in {c["name"] for c in inspector.get_columns(table.name)}:
+                continue
+            column_type = table.c.updated_at.type.compile(dialect=engine.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN updated_at {column_type}'))
+            for index in table.indexes:
+                if list(index.columns.keys()) == ["updated_at"]:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+            altered.append(table.name)
+    return altered
+
+def prune_tombstones(session: Session) -> int:
+    """Delete tombstones past the retention window. Returns the number removed. Caller commits."""
+    horizon = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    return session.exec(delete(Tombstone).where(Tombstone.deleted_at < horizon)).rowcount
+
+def changes_since(session: Session, since: Optional[datetime]):
+    """
+    Rows changed after `since` plus the ids deleted after it, for every synced table.
+    since=None, or older than the tombstone retention, returns a full snapshot (reset=True):
+    the replica must replace its data instead of merging.
+    Returns (reset, rows, deleted, next_since).
+    """
+    started = datetime.utcnow()
+    reset = since is None or since < started - timedelta(days=SYNC_TOMBSTONE_DAYS)
+
+    rows = {}
+    for key, model in SYNCED_MODELS.items():
+        stmt = select(model)
+        if not reset:
+            stmt = stmt.where(model.updated_at > since)
+        rows[key] = session.exec(stmt.order_by(model.id)).all()
+
+    deleted = {key: [] for key in SYNCED_MODELS}
+    if not reset:
+        tombstones = session.exec(select(Tombstone.table_name, Tombstone.row_id).where(
+            Tombstone.deleted_at > since
+        ).order_by(Tombstone.id)).all()
+        for table_name, row_id in tombstones:
+            if table_name in _KEY_BY_TABLE:
+                deleted[_KEY_BY_TABLE[table_name]].append(row_id)
+
+    return reset, rows, deleted, started - timedelta(seconds=SYNC_OVERLAP_SECONDS)
@@ -0,0 +1,139 @@
+import os
+import zlib
+import brotli
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Responses smaller than this go out as is: below ~1 KB the encoding overhead isn't worth the CPU
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Brotli 4 compresses JSON smaller than gzip 6 and in less time; higher qualities cost far more CPU
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Bodies at least this large are compressed in a worker thread instead of blocking the event loop
+COMPRESS_THREAD_MIN_BYTES = 128 * 1024
+
+def _accepted(accept_encoding: str) -> set:
+    # "br;q=1.0, gzip, deflate" -> {"br", "gzip", "deflate"}; q=0 means refused
+    codings = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        codings.add(coding.strip())
+    return codings
+
+class _Gzip:
+    content_encoding = "gzip"
+
+    def __init__(self):
+        # wbits 16 + MAX_WBITS: gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.compress(body)
+        # Streamed responses (CSV export): flush each chunk so the client can decode it right away
+        return data + self._compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+
+class _Brotli:
+    content_encoding = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, body: bytes, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+class _Responder:
+    """Wraps `send` for one request: holds back the response start until the first body chunk shows its size."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, encoder_class):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoder_class = encoder_class
+        self.encoder = None
+        self.send = None
+        self.start_message = None
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if len(body) >= COMPRESS_THREAD_MIN_BYTES:
+            return await anyio.to_thread.run_sync(self.encoder.compress, body, more_body)
+        return self.encoder.compress(body, more_body)
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            # Already encoded, or an event stream that must not be buffered by the compressor
+            self.passthrough = self.encoder_class is None or "content-encoding" in headers or \
+                headers.get("content-type", "").startswith("text/event-stream")
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            # Caches must keep the encodings apart, even for responses sent uncompressed
+            headers.add_vary_header("Accept-Encoding")
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.encoder = self.encoder_class()
+            body = await self._compress(body, more_body)
+            headers["Content-Encoding"] = self.encoder.content_encoding
+            if more_body:
+                # Length of a streamed body is unknown until it ends
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+        body = await self._compress(body, more_body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+class CompressionMiddleware:
+    """
+    Brotli or gzip for responses of at least COMPRESS_MIN_BYTES, whichever the client accepts (br preferred).
+    Large JSON lists shrink ~10x. Streamed bodies are compressed chunk by chunk; every response gets
+    Vary: Accept-Encoding. Plain ASGI with zlib and brotli, no Starlette middleware internals.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codings = _accepted(Headers(scope=scope).get("accept-encoding", ""))
+        if "br" in codings:
+            encoder_class = _Brotli
+        elif "gzip" in codings:
+            encoder_class = _Gzip
+        else:
+            encoder_class = None
+        await _Responder(self.app, self.minimum_size, encoder_class)(scope, receive, send)
@@ -0,0 +1,39 @@
+import os
+import hashlib
+from typing import Any, Awaitable, Callable
+from fastapi import Request, Response
+from cache import result_cache, resource_version, bypass_var
+from serialization import dumps
+
+# Clients may keep the response but must revalidate (If-None-Match) before each use
+CONDITIONAL_CACHE_CONTROL = os.getenv("CONDITIONAL_CACHE_CONTROL", "private, no-cache")
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison (RFC 9110): W/ prefixes are ignored on both sides
+    opaque = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return "*" in candidates or opaque(etag) in [opaque(tag) for tag in candidates]
+
+async def conditional_json(request: Request, resource: str, compute: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    JSON response with an ETag, or 304 Not Modified when the client's If-None-Match still matches.
+    The encoded body and its ETag are cached per resource version (cache.bump_resource_version), so
+    while nothing changed neither the DB query nor the serialization runs again, 304 or not.
+    The ETag is a hash of the body, so it agrees between workers and across restarts. It is weak: the hash
+    is of the uncompressed JSON, and compression.py may send other bytes for the same representation.
+    """
+    # Version read before computing: a write landing mid-compute leaves the result under the old version
+    key = ("conditional", resource, resource_version(resource))
+    found, entry = (False, None) if bypass_var.get() else result_cache.get(key)
+    if not found:
+        body = dumps(await compute())
+        entry = (f'W/"{hashlib.sha1(body).hexdigest()}"', body)
+        result_cache.set(key, entry, len(body))
+
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
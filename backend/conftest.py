@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel, create_engine
+
+import database
+import profiler
+from cache import result_cache
+from db_metrics import instrument_engine
+from routers.auth import user_cache
+from main import app
+
+def sqlite_engine(path):
+    """Throwaway SQLite engine set up like database.py's (BEGIN IMMEDIATE support, statement timing)."""
+    engine = create_engine(
+        f"sqlite:///{path}",
+        # Generous busy timeout: the concurrency tests queue many writers on the database lock
+        connect_args={"check_same_thread": False, "timeout": 60}
+    )
+    database.configure_sqlite_engine(engine)
+    instrument_engine(engine)
+    return engine
+
+@pytest.fixture
+def engine(tmp_path):
+    # Test modules that need another database (e.g. Postgres via TEST_DATABASE_URL) override this fixture
+    engine = sqlite_engine(tmp_path / "test.db")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_engine_for(engine):
+    """Async engine on the same database as `engine`, for get_reader's ASYNC_DB path."""
+    async_engine = create_async_engine(
+        engine.url.set(drivername=ASYNC_DRIVERS[engine.dialect.name]),
+        # No pool: TestClient runs each request on its own event loop, pooled connections would outlive theirs
+        poolclass=NullPool
+    )
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+@pytest.fixture
+def app_db(request, engine, monkeypatch):
+    """
+    (client, engine): the app serving requests from `engine`.
+    The engine is swapped in under the dependencies rather than overriding them, so get_session's
+    batch-shared session and the profiler's admin check run exactly as in production.
+    Reads go through the async reader when ASYNC_DB is set, or per test with
+    @pytest.mark.parametrize("app_db", [False, True], indirect=True).
+    In-process caches are emptied: their keys don't tell one test database from another.
+    """
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(profiler, "engine", engine)
+    use_async = getattr(request, "param", database.ASYNC_DB)
+    monkeypatch.setattr(database, "async_engine", async_engine_for(engine) if use_async else None)
+    result_cache.clear()
+    user_cache.clear()
+    try:
+        yield TestClient(app), engine
+    finally:
+        result_cache.clear()
+        user_cache.clear()
+
+def seed_masters(client, grains=("Wheat",), warehouses=("A",), contacts=(("Party", "buyer"),)):
+    """Create master rows through the API. Returns (grains, warehouses, contacts) as lists of response bodies."""
+    def create(path, body):
+        res = client.post(path, json=body)
+        assert res.status_code == 200, res.text
+        return res.json()
+
+    return (
+        [create("/master/grains", {"name": name}) for name in grains],
+        [create("/master/warehouses", {"name": name}) for name in warehouses],
+        [create("/master/contacts", {"name": name, "type": contact_type}) for name, contact_type in contacts],
+    )
+
+def purchase(client, grain, contact, warehouse, quantity_quintal, rate_per_quintal=2000, **fields):
+    """POST one purchase (total computed by the server unless given). Returns the created transaction."""
+    res = client.post("/transactions/", json={
+        "type": "purchase", "grain_id": grain["id"], "contact_id": contact["id"], "warehouse_id": warehouse["id"],
+        "quantity_quintal": quantity_quintal, "rate_per_quintal": rate_per_quintal, "total_amount": 0, **fields
+    })
+    assert res.status_code == 200, res.text
+    return res.json()
@@ -1,11 +1,39 @@
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.concurrency import run_in_threadpool
+from fastapi import Depends, Request
+from typing import Any, Awaitable, Callable
 import os
 from dotenv import load_dotenv
+from db_metrics import instrument_engine
+from metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, register_pool
 
 # Load env vars from .env for local dev
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Serve the hot read endpoints through an async engine (asyncpg / aiosqlite) instead of the threadpool
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() == "true"
+# Log every SQL statement to stdout (debugging only, expensive). Timing and slow queries: see db_metrics.py
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+async_engine = None
+
+def configure_sqlite_engine(engine):
+    # pysqlite starts transactions lazily (and only before DML), which makes BEGIN IMMEDIATE impossible.
+    # Let SQLAlchemy emit BEGIN itself so writers can ask for the write lock up front.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        options = conn.get_execution_options()
+        if options.get("isolation_level") == "AUTOCOMMIT":
+            return
+        conn.exec_driver_sql(f"BEGIN {options.get('sqlite_begin', 'DEFERRED')}")
 
 if DATABASE_URL and "postgres" in DATABASE_URL:
     # Fix Render/Heroku postgres:// -> postgresql://
@@ -16,23 +44,103 @@ if DATABASE_URL and "postgres" in DATABASE_URL:
     # limit pool size to avoid "MaxClientsInSessionMode" errors
     engine = create_engine(
         DATABASE_URL, 
-        echo=True, 
+        echo=SQL_ECHO, 
+        poolclass=TimedQueuePool, # Checkout wait time for /metrics
         pool_size=5, 
         max_overflow=0, 
         pool_pre_ping=True
     )
     print("Using PostgreSQL Database (Supabase)")
+
+    if ASYNC_DB:
+        # Statement caches off: the Supabase pooler (pgbouncer) does not keep prepared statements per client
+        async_url = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": "0"}
+        )
+        async_engine = create_async_engine(
+            async_url,
+            echo=SQL_ECHO,
+            poolclass=TimedAsyncAdaptedQueuePool,
+            pool_size=5,
+            max_overflow=0,
+            pool_pre_ping=True,
+            connect_args={"statement_cache_size": 0}
+        )
 else:
     # Fallback to Local SQLite
     sqlite_file_name = "grain_trading_v11.db"
     sqlite_url = f"sqlite:///{sqlite_file_name}"
     connect_args = {"check_same_thread": False}
-    engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+    engine = create_engine(sqlite_url, echo=SQL_ECHO, connect_args=connect_args, poolclass=TimedQueuePool)
+    configure_sqlite_engine(engine)
     print("Using Local SQLite Database")
 
+    if ASYNC_DB:
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{sqlite_file_name}", echo=SQL_ECHO, poolclass=TimedAsyncAdaptedQueuePool
+        )
+
+instrument_engine(engine)
+register_pool("sync", engine.pool)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+    register_pool("async", async_engine.sync_engine.pool)
+
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
-def get_session():
+def begin_write(session: Session):
+    """
+    Start the session's DB transaction as a writer.
+    SQLite: BEGIN IMMEDIATE (takes the database write lock now, not at the first INSERT).
+    Postgres: nothing to do, callers lock the rows they need with SELECT ... FOR UPDATE.
+    Must be called before the session runs its first query, otherwise it is a no-op.
+    """
+    if session.get_bind().dialect.name == "sqlite" and not session.in_transaction():
+        session.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+
+# Scope key under which POST /batch hands its session to the sub-requests it dispatches (routers/batch.py)
+SHARED_SESSION_KEY = "db_shared_session"
+
+def get_session(request: Request):
+    shared = request.scope.get(SHARED_SESSION_KEY)
+    if shared is not None:
+        yield shared
+        return
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # Nothing to open without ASYNC_DB: get_reader then reads through the sync session
+    if async_engine is None:
+        yield None
+        return
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+# Reader: `await read(fn, *args)` runs fn(session, *args) and returns its result.
+# fn is ordinary sync query code; the reader decides where the DB I/O happens.
+Reader = Callable[..., Awaitable[Any]]
+
+def _threadpool_reader(session: Session) -> Reader:
+    async def read(fn, *args):
+        return await run_in_threadpool(fn, session, *args)
+    return read
+
+def _async_reader(session: AsyncSession) -> Reader:
+    async def read(fn, *args):
+        # Runs fn in a greenlet with a sync Session facade; queries go through the async driver
+        return await session.run_sync(fn, *args)
+    return read
+
+async def get_reader(
+    request: Request,
+    session: Session = Depends(get_session),
+    async_session: AsyncSession = Depends(get_async_session)
+) -> Reader:
+    # Decided per request, not at import, so tests can swap async_engine like they swap engine.
+    # Both sessions connect lazily: only the one actually read through opens a connection
+    if async_engine is None or request.scope.get(SHARED_SESSION_KEY) is not None:
+        # A batch sub-request reads through the shared session (get_session yields it)
+        return _threadpool_reader(session)
+    return _async_reader(async_session)
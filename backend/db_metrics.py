@@ -0,0 +1,73 @@
+import os
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from logger import get_logger
+
+# Config
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200")) # Statements slower than this go to the slow-query log
+SLOWEST_PER_REQUEST = 3 # Statements kept per request for /stats/db
+RECENT_REQUESTS = 100 # Requests kept for /stats/db
+
+slow_logger = get_logger("slow_query")
+
+class RequestDbStats:
+    """DB work done while serving one request. Shared (not copied) with threadpool workers via the context var."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time_ms = 0.0
+        self.slowest = [] # [(ms, statement)], longest first
+        self._lock = threading.Lock()
+
+    def add(self, elapsed_ms: float, statement: str):
+        with self._lock:
+            self.query_count += 1
+            self.db_time_ms += elapsed_ms
+            if len(self.slowest) < SLOWEST_PER_REQUEST or elapsed_ms > self.slowest[-1][0]:
+                self.slowest.append((elapsed_ms, statement))
+                self.slowest.sort(key=lambda s: s[0], reverse=True)
+                del self.slowest[SLOWEST_PER_REQUEST:]
+
+_current: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+_recent = deque(maxlen=RECENT_REQUESTS)
+
+def start_request() -> RequestDbStats:
+    stats = RequestDbStats()
+    _current.set(stats)
+    return stats
+
+def finish_request(stats: RequestDbStats, method: str, path: str, status_code: int, duration_ms: float):
+    _recent.append({
+        "method": method,
+        "path": path,
+        "status_code": status_code,
+        "duration_ms": round(duration_ms, 2),
+        "query_count": stats.query_count,
+        "db_time_ms": round(stats.db_time_ms, 2),
+        "slowest": [{"ms": round(ms, 2), "statement": sql} for ms, sql in stats.slowest]
+    })
+
+def recent_requests() -> List[Dict[str, Any]]:
+    return list(_recent)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.add(elapsed_ms, statement)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        slow_logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {statement} | params: {str(parameters)[:500]}")
+
+def instrument_engine(engine):
+    """Time every statement on this engine (pass async_engine.sync_engine for async engines)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
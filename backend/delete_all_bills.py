@@ -1,9 +1,14 @@
 from sqlmodel import Session, delete
 from database import engine
-from models import Transaction, PaymentHistory, DispatchInfo
+from models import Transaction, PaymentHistory, DispatchInfo, StockBalance, GrainCost
+import changes
 
 def delete_all_data():
     with Session(engine) as session:
+        # App replicas drop the wiped rows on their next sync
+        for model in (PaymentHistory, DispatchInfo, Transaction):
+            changes.record_delete_all(session, model)
+
         print("Deleting PaymetHistory...")
         session.exec(delete(PaymentHistory))
         
@@ -12,6 +17,10 @@ def delete_all_data():
         
         print("Deleting Transactions...")
         session.exec(delete(Transaction))
+
+        print("Deleting Stock Balances...")
+        session.exec(delete(StockBalance))
+        session.exec(delete(GrainCost))
         
         session.commit()
         print("All bills and related data have been deleted successfully.")
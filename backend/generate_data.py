@@ -0,0 +1,330 @@
+"""
+Synthetic data at scale: grains, contacts, warehouses, purchases, bulk-sale bills (with DispatchInfo)
+and payment histories, inserted in bulk (COPY on Postgres, executemany on SQLite).
+
+Unlike seed_data.py nothing is deleted unless --wipe is given: rows are appended after the existing ones,
+invoice counters continue, and the derived tables are rebuilt at the end.
+
+Usage: python generate_data.py --transactions 1000000 [--seed 1] [--days 730] [--wipe] [--yes]
+"""
+import io
+import csv
+import sys
+import time
+import uuid
+import random
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlmodel import Session, select, func
+
+from models import Grain, Contact, Warehouse, Transaction, PaymentHistory, DispatchInfo, StockBalance
+from invoices import sequence_scope, last_invoice_number, reset_sequences
+import ledger
+
+BATCH_SIZE = 20000 # Transactions per bulk insert
+
+# name, hindi name, standard bharti (kg per bag), base rate per quintal
+GRAINS = [
+    ("Wheat", "Gehu", 50.0, 2300), ("Chana", "Chana", 60.0, 5200), ("Soybean", "Soyabean", 60.0, 4400),
+    ("Maize", "Makka", 60.0, 2000), ("Mustard", "Sarson", 50.0, 5400), ("Paddy", "Dhaan", 40.0, 2100),
+    ("Moong", "Moong", 50.0, 7600), ("Urad", "Urad", 50.0, 6800), ("Tur", "Arhar", 50.0, 7000),
+    ("Bajra", "Bajra", 50.0, 2350), ("Jowar", "Jowar", 50.0, 3000), ("Masoor", "Masoor", 50.0, 6000),
+]
+FIRST_NAMES = ["Ram", "Shyam", "Mohan", "Suresh", "Ramesh", "Rajesh", "Mahesh", "Dinesh", "Anil", "Sunil",
+               "Vijay", "Ajay", "Prakash", "Ashok", "Manoj", "Santosh", "Govind", "Kailash", "Naresh", "Mukesh"]
+LAST_NAMES = ["Patel", "Sharma", "Verma", "Yadav", "Agrawal", "Jain", "Gupta", "Rathore", "Chouhan", "Patidar"]
+TOWNS = ["Indore", "Dewas", "Ujjain", "Sehore", "Dhar", "Khargone", "Ratlam", "Shajapur", "Bhopal", "Mandsaur"]
+TRANSPORTERS = ["VRL", "TCI", "Shree Ganesh Roadways", "Local", "Self"]
+
+def _person(rng, i):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} ({rng.choice(TOWNS)}) #{i}"
+
+def ensure_master_data(session: Session, rng, grains: int, warehouses: int, contacts: int):
+    """Top up master data to the requested counts; existing rows are kept and reused."""
+    existing = {g.name for g in session.exec(select(Grain)).all()}
+    for i in range(grains):
+        name, hindi, bharti, _ = GRAINS[i % len(GRAINS)]
+        if i >= len(GRAINS):
+            name = f"{name} {i // len(GRAINS) + 1}"
+        if name not in existing:
+            session.add(Grain(name=name, hindi_name=hindi, standard_bharti=bharti))
+
+    for i in range(session.exec(select(func.count(Warehouse.id))).one(), warehouses):
+        session.add(Warehouse(name=f"{TOWNS[i % len(TOWNS)]} Godown {i + 1}", location=TOWNS[i % len(TOWNS)]))
+
+    for i in range(session.exec(select(func.count(Contact.id))).one(), contacts):
+        session.add(Contact(
+            name=_person(rng, i + 1),
+            type=rng.choices(["supplier", "buyer", "broker"], weights=[6, 3, 1])[0],
+            phone=f"9{rng.randint(100000000, 999999999)}",
+            gst_number=f"23{rng.randint(10**12, 10**13 - 1)}" if rng.random() < 0.3 else None
+        ))
+    session.commit()
+
+    base_rates = {name: rate for name, _, _, rate in GRAINS}
+    grain_rows = [(g, base_rates.get(g.name.split(" ")[0], 3000)) for g in session.exec(select(Grain)).all()]
+    all_contacts = session.exec(select(Contact)).all()
+    return (
+        grain_rows,
+        session.exec(select(Warehouse)).all(),
+        [c for c in all_contacts if c.type != "buyer"] or all_contacts,
+        [c for c in all_contacts if c.type != "supplier"] or all_contacts
+    )
+
+def _row(table, values: dict) -> dict:
+    # Bulk inserts bypass the ORM: fill scalar column defaults and NULLs explicitly (COPY needs every column)
+    row = {}
+    for column in table.columns:
+        if column.name in values:
+            row[column.name] = values[column.name]
+        elif column.default is not None and column.default.is_scalar:
+            row[column.name] = column.default.arg
+        elif column.default is not None and column.default.is_callable:
+            row[column.name] = column.default.arg(None) # e.g. updated_at = now
+        else:
+            row[column.name] = None
+    return row
+
+def _copy(conn, table, rows):
+    columns = [c.name for c in table.columns]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buf.seek(0)
+    cursor = conn.connection.cursor() # Raw psycopg2 cursor, same DB transaction as conn
+    cursor.copy_expert(
+        f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')', buf
+    )
+
+def bulk_insert(conn, table, rows):
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        _copy(conn, table, rows)
+    else:
+        conn.execute(table.insert(), rows) # executemany
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _reset_sequences(conn):
+    # Explicit ids were inserted: move the Postgres serial sequences past them
+    if conn.dialect.name != "postgresql":
+        return
+    for table in ("transaction", "paymenthistory", "dispatchinfo"):
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), COALESCE((SELECT MAX(id) FROM \"{table}\"), 1))"
+        ))
+
+class _Generator:
+    """Time-ordered purchases and bulk-sale bills; sales only draw on stock the generated purchases built up."""
+
+    def __init__(self, session: Session, rng, grains, warehouses, suppliers, buyers, start: datetime, end: datetime, total: int):
+        self.rng = rng
+        self.grains = grains
+        self.warehouses = warehouses
+        self.suppliers = suppliers
+        self.buyers = buyers
+        self.start = start
+        self.step = (end - start) / max(total, 1)
+        self.end = end
+        self.stock = {(b.grain_id, b.warehouse_id): b.quantity_quintal for b in session.exec(select(StockBalance)).all()}
+        self.costs = {} # grain_id -> (purchased_qty, purchased_value) for sale cost price
+        self.invoices = {} # (type, financial year scope) -> last invoice number
+        self.session = session
+
+    def _invoice(self, trx_type: str, date: datetime) -> int:
+        key = (trx_type, sequence_scope(date))
+        if key not in self.invoices:
+            self.invoices[key] = last_invoice_number(self.session, *key)
+        self.invoices[key] += 1
+        return self.invoices[key]
+
+    def _status(self, net: float):
+        status = self.rng.choices(["paid", "partial", "pending"], weights=[5, 2, 3])[0]
+        paid = net if status == "paid" else round(net * self.rng.uniform(0.2, 0.8), 2) if status == "partial" else 0.0
+        return status, round(paid, 2)
+
+    def payment_history(self, trx_id: int, date: datetime, paid: float, payments: list, next_payment_id: int) -> int:
+        # 1-3 instalments after the bill date, summing to amount_paid
+        if paid <= 0:
+            return next_payment_id
+        parts = self.rng.randint(1, 3)
+        remaining = paid
+        for i in range(parts):
+            amount = remaining if i == parts - 1 else round(remaining * self.rng.uniform(0.3, 0.7), 2)
+            remaining = round(remaining - amount, 2)
+            pay_date = min(date + timedelta(days=self.rng.randint(0, 45), hours=self.rng.randint(0, 8)), self.end)
+            payments.append(_row(PaymentHistory.__table__, {
+                "id": next_payment_id, "transaction_id": trx_id, "amount": amount, "date": pay_date,
+                "notes": self.rng.choice(["Cash", "NEFT", "UPI", "Cheque"])
+            }))
+            next_payment_id += 1
+        return next_payment_id
+
+    def purchase(self, trx_id: int, date: datetime) -> dict:
+        grain, base_rate = self.rng.choice(self.grains)
+        warehouse = self.rng.choice(self.warehouses)
+        qty = round(self.rng.uniform(10, 200), 2)
+        rate = round(base_rate * self.rng.uniform(0.9, 1.1), 2)
+        bags = round(qty * 100 / (grain.standard_bharti or 60.0))
+        labour = round(bags * 3.0, 2)
+        total = round(qty * rate - labour, 2)
+        status, paid = self._status(total)
+
+        key = (grain.id, warehouse.id)
+        self.stock[key] = self.stock.get(key, 0.0) + qty
+        p_qty, p_value = self.costs.get(grain.id, (0.0, 0.0))
+        self.costs[grain.id] = (p_qty + qty, p_value + qty * rate)
+
+        return _row(Transaction.__table__, {
+            "id": trx_id, "date": date, "type": "purchase", "invoice_number": self._invoice("purchase", date),
+            "grain_id": grain.id, "contact_id": self.rng.choice(self.suppliers).id, "warehouse_id": warehouse.id,
+            "quantity_quintal": qty, "number_of_bags": bags, "rate_per_quintal": rate, "total_amount": total,
+            "labour_cost_per_bag": 3.0, "labour_cost_total": labour, "amount_paid": paid, "payment_status": status
+        })
+
+    def bulk_sale(self, trx_id: int, date: datetime, max_rows: int):
+        """One bill: 1-3 warehouse rows sharing invoice number and sale_group_id, plus its DispatchInfo."""
+        grain, base_rate = self.rng.choice(self.grains)
+        sources = [w for w in self.warehouses if self.stock.get((grain.id, w.id), 0.0) >= 5.0]
+        if not sources:
+            return [], None
+        sources = self.rng.sample(sources, min(len(sources), self.rng.randint(1, 3), max_rows))
+
+        group_id = str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+        invoice = self._invoice("sale", date)
+        contact = self.rng.choice(self.buyers)
+        rate = round(base_rate * self.rng.uniform(1.0, 1.2), 2)
+        transport_rate = round(self.rng.uniform(20, 100), 2)
+        transporter = self.rng.choice(TRANSPORTERS)
+        vehicle = f"MP-{self.rng.randint(10, 99)}-{self.rng.randint(1000, 9999)}"
+        mandi_total = 9000.0
+        p_qty, p_value = self.costs.get(grain.id, (0.0, 0.0))
+        avg_cost = p_value / p_qty if p_qty else 0.0
+
+        qtys = []
+        for w in sources:
+            key = (grain.id, w.id)
+            qty = round(self.rng.uniform(1.0, min(self.stock[key] * 0.8, 100.0)), 2)
+            self.stock[key] -= qty
+            qtys.append(qty)
+        bill_qty = sum(qtys)
+
+        rows = []
+        for i, (w, qty) in enumerate(zip(sources, qtys)):
+            bags = round(qty * 100 / (grain.standard_bharti or 60.0))
+            total = round(qty * rate, 2)
+            shortage = round(self.rng.uniform(0, 0.5), 2) if self.rng.random() < 0.2 else 0.0
+            deduction = round(self.rng.uniform(0, 500), 2) if self.rng.random() < 0.1 else 0.0
+            status, paid = self._status(total - shortage * rate - deduction)
+            rows.append(_row(Transaction.__table__, {
+                "id": trx_id + i, "date": date, "type": "sale", "invoice_number": invoice,
+                "grain_id": grain.id, "contact_id": contact.id, "warehouse_id": w.id,
+                "quantity_quintal": qty, "number_of_bags": bags, "rate_per_quintal": rate, "total_amount": total,
+                "cost_price_per_quintal": avg_cost, "amount_paid": paid, "payment_status": status,
+                "notes": f"Bulk Sale: {bags} bags", "transporter_name": transporter, "vehicle_number": vehicle,
+                "destination": self.rng.choice(TOWNS), "sale_group_id": group_id,
+                "shortage_quantity": shortage, "deduction_amount": deduction,
+                "labour_cost_per_bag": 3.0, "transport_cost_per_qtl": transport_rate,
+                "mandi_cost": mandi_total * qty / bill_qty, "expenses_total": bags * 3.0 + qty * transport_rate
+            }))
+
+        gross_freight = round(bill_qty * transport_rate, 2)
+        advance = round(gross_freight * self.rng.choice([0.0, 0.25, 0.5]), 2)
+        cleared = self.rng.random() < 0.6
+        dispatch = _row(DispatchInfo.__table__, {
+            "sale_group_id": group_id, "transporter_name": transporter, "vehicle_number": vehicle,
+            "rate": transport_rate, "total_weight": bill_qty, "gross_freight": gross_freight,
+            "advance_paid": advance, "delivery_paid": gross_freight - advance if cleared else 0.0,
+            "status": "cleared" if cleared else "pending"
+        })
+        return rows, dispatch
+
+def generate(engine, transactions: int, seed: int = 1, days: int = 730, grains: int = 8, warehouses: int = 6,
+             contacts: int = 300, batch_size: int = BATCH_SIZE, log=print):
+    """Append `transactions` rows (about 60% purchases, the rest in bulk-sale bills) and rebuild the derived tables."""
+    rng = random.Random(seed)
+    end = datetime.now().replace(microsecond=0)
+    started = time.perf_counter()
+
+    with Session(engine) as session:
+        grain_rows, warehouse_rows, suppliers, buyers = ensure_master_data(session, rng, grains, warehouses, contacts)
+        gen = _Generator(session, rng, grain_rows, warehouse_rows, suppliers, buyers, end - timedelta(days=days), end, transactions)
+
+        conn = session.connection()
+        trx_id = _next_id(conn, Transaction)
+        payment_id = _next_id(conn, PaymentHistory)
+        dispatch_id = _next_id(conn, DispatchInfo)
+
+        made = 0
+        while made < transactions:
+            trx_batch, payments, dispatches = [], [], []
+            while len(trx_batch) < batch_size and made < transactions:
+                date = gen.start + gen.step * made
+                rows = []
+                if rng.random() < 0.4:
+                    rows, dispatch = gen.bulk_sale(trx_id, date, transactions - made)
+                    if dispatch:
+                        dispatch["id"] = dispatch_id
+                        dispatch_id += 1
+                        dispatches.append(dispatch)
+                if not rows:
+                    rows = [gen.purchase(trx_id, date)]
+                for row in rows:
+                    payment_id = gen.payment_history(row["id"], date, row["amount_paid"], payments, payment_id)
+                trx_batch.extend(rows)
+                trx_id += len(rows)
+                made += len(rows)
+
+            bulk_insert(conn, Transaction.__table__, trx_batch)
+            bulk_insert(conn, PaymentHistory.__table__, payments)
+            bulk_insert(conn, DispatchInfo.__table__, dispatches)
+            log(f"  {made}/{transactions} transactions ({time.perf_counter() - started:.1f}s)")
+
+        _reset_sequences(conn)
+        reset_sequences(session)
+
+        log("Rebuilding stock balances and dashboard totals...")
+        ledger.rebuild(session)
+        session.commit()
+
+    log(f"Done: {transactions} transactions in {time.perf_counter() - started:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=730, help="Spread the transactions over this many days up to now")
+    parser.add_argument("--grains", type=int, default=8)
+    parser.add_argument("--warehouses", type=int, default=6)
+    parser.add_argument("--contacts", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--wipe", action="store_true", help="Delete existing transaction data first")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    args = parser.parse_args()
+
+    from database import engine, create_db_and_tables
+    import db_metrics
+    db_metrics.SLOW_QUERY_MS = float("inf") # Bulk inserts are slow by design, keep them out of the slow-query log
+    create_db_and_tables()
+
+    if not args.yes:
+        action = "DELETE all existing transactions and insert" if args.wipe else "insert"
+        confirm = input(f"This will {action} {args.transactions} generated transactions into {engine.url.render_as_string()}. Type 'yes' to proceed: ")
+        if confirm.lower() != "yes":
+            print("Cancelled.")
+            sys.exit(1)
+
+    if args.wipe:
+        from seed_data import clear_existing_data
+        with Session(engine) as session:
+            clear_existing_data(session)
+
+    generate(engine, args.transactions, seed=args.seed, days=args.days, grains=args.grains,
+             warehouses=args.warehouses, contacts=args.contacts, batch_size=args.batch_size)
+
+if __name__ == "__main__":
+    main()
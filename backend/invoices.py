@@ -0,0 +1,91 @@
+import os
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Session, select, func
+from sqlalchemy.exc import IntegrityError
+from database import begin_write
+from models import Transaction, InvoiceSequence
+
+# Restart invoice numbers every financial year (April - March) instead of one running sequence
+INVOICE_RESET_YEARLY = os.getenv("INVOICE_RESET_YEARLY", "false").lower() == "true"
+
+def financial_year(date: datetime) -> str:
+    # Indian FY: 1 April - 31 March, e.g. "2025-26"
+    start = date.year if date.month >= 4 else date.year - 1
+    return f"{start}-{str(start + 1)[-2:]}"
+
+def sequence_scope(date: Optional[datetime]) -> str:
+    # Counter key next to the type: the financial year, or "" for one running sequence
+    if not INVOICE_RESET_YEARLY:
+        return ""
+    if isinstance(date, str):
+        # Table-model request bodies (POST /transactions/) are not parsed, the date is still an ISO string
+        date = datetime.fromisoformat(date)
+    return financial_year(date or datetime.utcnow())
+
+def _highest_existing(session: Session, trx_type: str, fy: str) -> int:
+    # One-time scan to continue numbering from invoices created before the counter existed
+    stmt = select(func.max(Transaction.invoice_number)).where(Transaction.type == trx_type)
+    if fy:
+        start_year = int(fy[:4])
+        stmt = stmt.where(
+            Transaction.date >= datetime(start_year, 4, 1),
+            Transaction.date < datetime(start_year + 1, 4, 1)
+        )
+    return session.exec(stmt).first() or 0
+
+def _scopes_between(first: datetime, last: datetime) -> list:
+    if not INVOICE_RESET_YEARLY:
+        return [""]
+    start, end = int(financial_year(first)[:4]), int(financial_year(last)[:4])
+    return [financial_year(datetime(year, 4, 1)) for year in range(start, end + 1)]
+
+def last_invoice_number(session: Session, trx_type: str, fy: str) -> int:
+    """Last number handed out for `trx_type` in scope `fy`, without reserving or locking anything."""
+    seq = session.get(InvoiceSequence, (trx_type, fy))
+    return seq.last_value if seq else _highest_existing(session, trx_type, fy)
+
+def reset_sequences(session: Session) -> None:
+    """
+    Move every invoice counter to the highest invoice number already stored, for bulk loads that
+    insert numbered transactions directly (generate_data.py). The caller commits.
+    """
+    stmt = select(Transaction.type, func.min(Transaction.date), func.max(Transaction.date)).where(
+        Transaction.invoice_number.is_not(None)
+    ).group_by(Transaction.type)
+    for trx_type, first, last in session.exec(stmt).all():
+        for fy in _scopes_between(first, last):
+            session.merge(InvoiceSequence(type=trx_type, financial_year=fy, last_value=_highest_existing(session, trx_type, fy)))
+    session.flush()
+
+def _lock_sequence(session: Session, trx_type: str, fy: str):
+    stmt = select(InvoiceSequence).where(
+        InvoiceSequence.type == trx_type,
+        InvoiceSequence.financial_year == fy
+    ).with_for_update().execution_options(populate_existing=True)
+    return session.exec(stmt).first()
+
+def next_invoice_number(session: Session, trx_type: str, date: Optional[datetime] = None, count: int = 1) -> int:
+    """
+    Reserve `count` consecutive invoice numbers for `trx_type` and return the first one.
+    The counter row stays locked until the caller commits (FOR UPDATE on Postgres,
+    BEGIN IMMEDIATE on SQLite), so concurrent saves never share a number.
+    """
+    begin_write(session)
+    fy = sequence_scope(date)
+
+    seq = _lock_sequence(session, trx_type, fy)
+    if not seq:
+        try:
+            with session.begin_nested():
+                seq = InvoiceSequence(type=trx_type, financial_year=fy, last_value=_highest_existing(session, trx_type, fy))
+                session.add(seq)
+        except IntegrityError:
+            # Another request created the counter first, use theirs
+            seq = _lock_sequence(session, trx_type, fy)
+
+    first = seq.last_value + 1
+    seq.last_value += count
+    session.add(seq)
+    session.flush()
+    return first
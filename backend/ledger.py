@@ -0,0 +1,254 @@
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import case, and_
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, update, delete, func
+from models import Transaction, StockBalance, GrainCost
+
+# Stock/cost-affecting fields: changing any of these moves quantity or value between balances
+STOCK_FIELDS = {"type", "grain_id", "warehouse_id", "quantity_quintal", "rate_per_quintal", "total_amount"}
+# Fields that only change the pending amount (receivable / payable)
+PENDING_FIELDS = {"total_amount", "amount_paid", "shortage_quantity", "deduction_amount", "rate_per_quintal", "type"}
+
+# Derived tables: safe to drop and rebuild from Transaction at any time
+DERIVED_TABLES = [StockBalance, GrainCost]
+
+BALANCE_FIELDS = ("quantity_quintal", "receivable", "payable")
+GRAIN_FIELDS = ("purchased_qty", "purchased_value", "purchased_amount")
+
+# Allowed difference between stored and recomputed values before check() reports drift
+DRIFT_TOLERANCE = 0.01
+
+def _pending(trx: Transaction):
+    """(receivable, payable) contribution of one transaction, same rules as the dashboard."""
+    if trx.type == 'sale':
+        # Adjusted Expected Amount = Total - (Shortage * Rate) - Deduction
+        loss_amt = (trx.shortage_quantity or 0) * (trx.rate_per_quintal or 0) + (trx.deduction_amount or 0)
+        pending = (trx.total_amount or 0) - loss_amt - (trx.amount_paid or 0)
+        return max(pending, 0.0), 0.0
+    if trx.type == 'purchase':
+        pending = (trx.total_amount or 0) - (trx.amount_paid or 0)
+        return 0.0, max(pending, 0.0)
+    return 0.0, 0.0
+
+def _inventory_value(stock_qty: float, purchased_qty: float, purchased_amount: float) -> float:
+    # Current stock x average purchase price; negative or never-purchased stock counts as 0
+    if stock_qty > 0 and purchased_qty > 0:
+        return stock_qty * (purchased_amount / purchased_qty)
+    return 0.0
+
+def _lock_row(session: Session, model, key, **columns):
+    # Lock one derived row, creating it first if it doesn't exist yet (there is nothing to lock otherwise)
+    row = session.get(model, key, with_for_update=True, populate_existing=True)
+    if row is None:
+        try:
+            with session.begin_nested():
+                row = model(**columns)
+                session.add(row)
+        except IntegrityError:
+            # Another request created the row first, lock theirs
+            row = session.get(model, key, with_for_update=True, populate_existing=True)
+    return row
+
+def lock_balances(session: Session, stock_keys: Iterable[Tuple[int, int]], grain_ids: Iterable[int] = ()) -> Dict[Tuple[int, int], float]:
+    """
+    Lock the derived rows a write is about to change and return the locked stock per (grain_id, warehouse_id).
+    Every write path calls this before changing StockBalance / GrainCost, and takes the locks in one
+    fixed order: StockBalance rows sorted by (grain_id, warehouse_id), then GrainCost rows sorted by
+    grain_id (the invoice counter, if any, comes after both). Two writers can then wait on each other
+    but never deadlock, and sales of different stock don't wait at all.
+    Locks are held until commit (SELECT ... FOR UPDATE on Postgres).
+    SQLite has no row locks: callers take the database write lock with begin_write() instead.
+    """
+    stock = {}
+    for grain_id, warehouse_id in sorted(set(stock_keys)):
+        row = _lock_row(session, StockBalance, (grain_id, warehouse_id), grain_id=grain_id, warehouse_id=warehouse_id)
+        stock[(grain_id, warehouse_id)] = row.quantity_quintal
+    for grain_id in sorted(set(grain_ids)):
+        _lock_row(session, GrainCost, grain_id, grain_id=grain_id)
+    return stock
+
+def ledger_keys(trx_type: str, grain_id: int, warehouse_id: int):
+    """([stock key], [grain ids]) a transaction of this type writes: sales never touch GrainCost."""
+    return [(grain_id, warehouse_id)], [grain_id] if trx_type == 'purchase' else []
+
+def _add_stock(session: Session, grain_id: int, warehouse_id: int, delta: float = 0.0,
+               receivable: float = 0.0, payable: float = 0.0):
+    # Atomic increment so concurrent writers never lose an update
+    result = session.exec(update(StockBalance).where(
+        StockBalance.grain_id == grain_id,
+        StockBalance.warehouse_id == warehouse_id
+    ).values(
+        quantity_quintal=StockBalance.quantity_quintal + delta,
+        receivable=StockBalance.receivable + receivable,
+        payable=StockBalance.payable + payable
+    ))
+
+    if result.rowcount == 0:
+        session.add(StockBalance(
+            grain_id=grain_id, warehouse_id=warehouse_id, quantity_quintal=delta, receivable=receivable, payable=payable
+        ))
+        session.flush()
+
+def _add_grain(session: Session, grain_id: int, qty: float = 0.0, value: float = 0.0, amount: float = 0.0):
+    # Purchase totals only: sales and payments never write this row, so it is off the sale path
+    result = session.exec(update(GrainCost).where(GrainCost.grain_id == grain_id).values(
+        purchased_qty=GrainCost.purchased_qty + qty,
+        purchased_value=GrainCost.purchased_value + value,
+        purchased_amount=GrainCost.purchased_amount + amount
+    ))
+
+    if result.rowcount == 0:
+        session.add(GrainCost(grain_id=grain_id, purchased_qty=qty, purchased_value=value, purchased_amount=amount))
+        session.flush()
+
+def record_transaction(session: Session, trx: Transaction, sign: int = 1):
+    """
+    Apply a transaction's effect on StockBalance (stock, pending amounts) and, for purchases, GrainCost.
+    Call inside the same DB transaction as the insert/update/delete (caller commits), after lock_balances.
+    sign=-1 reverses the effect (before an edit or delete).
+    """
+    qty = (trx.quantity_quintal or 0) * sign
+    receivable, payable = _pending(trx)
+
+    if trx.type == 'purchase':
+        _add_stock(session, trx.grain_id, trx.warehouse_id, qty, receivable * sign, payable * sign)
+        _add_grain(
+            session, trx.grain_id, qty=qty, value=qty * (trx.rate_per_quintal or 0),
+            amount=(trx.total_amount or 0) * sign
+        )
+    elif trx.type == 'sale':
+        _add_stock(session, trx.grain_id, trx.warehouse_id, -qty, receivable * sign, payable * sign)
+
+def reverse_transaction(session: Session, trx: Transaction):
+    record_transaction(session, trx, sign=-1)
+
+def record_pending(session: Session, trx: Transaction, sign: int = 1):
+    """Receivable/payable part of record_transaction only, for payments and deduction edits."""
+    receivable, payable = _pending(trx)
+    _add_stock(session, trx.grain_id, trx.warehouse_id, receivable=receivable * sign, payable=payable * sign)
+
+def reverse_pending(session: Session, trx: Transaction):
+    record_pending(session, trx, sign=-1)
+
+def grain_avg_cost(session: Session, grain_id: int) -> float:
+    # Weighted average purchase rate (Cost to Company) from the running totals
+    cost = session.get(GrainCost, grain_id)
+    if not cost or cost.purchased_qty <= 0:
+        return 0.0
+    return cost.purchased_value / cost.purchased_qty
+
+def dashboard_totals(session: Session) -> Dict[str, float]:
+    """/stats/dashboard totals, from the StockBalance rows (one per grain+warehouse) and GrainCost (one per grain)."""
+    totals = {"total_receivable": 0.0, "total_payable": 0.0, "total_inventory_value": 0.0}
+    costs = {cost.grain_id: cost for cost in session.exec(select(GrainCost)).all()}
+    rows = session.exec(select(
+        StockBalance.grain_id,
+        func.sum(StockBalance.quantity_quintal),
+        func.sum(StockBalance.receivable),
+        func.sum(StockBalance.payable)
+    ).group_by(StockBalance.grain_id)).all()
+    for gid, stock_qty, receivable, payable in rows:
+        totals["total_receivable"] += receivable or 0.0
+        totals["total_payable"] += payable or 0.0
+        cost = costs.get(gid)
+        if cost:
+            totals["total_inventory_value"] += _inventory_value(stock_qty or 0.0, cost.purchased_qty, cost.purchased_amount)
+    return totals
+
+def _recompute(session: Session):
+    """
+    Derived state computed from scratch out of the Transaction table.
+    Returns (balances, costs):
+    balances: (grain_id, warehouse_id) -> {field: value for field in BALANCE_FIELDS}
+    costs: grain_id -> {field: value for field in GRAIN_FIELDS}
+    """
+    rows = session.exec(select(
+        Transaction.grain_id,
+        Transaction.warehouse_id,
+        Transaction.type,
+        func.sum(Transaction.quantity_quintal),
+        func.sum(Transaction.quantity_quintal * Transaction.rate_per_quintal),
+        func.sum(Transaction.total_amount)
+    ).group_by(Transaction.grain_id, Transaction.warehouse_id, Transaction.type)).all()
+
+    balances = {}
+    costs = {}
+
+    def balance(key):
+        return balances.setdefault(key, {field: 0.0 for field in BALANCE_FIELDS})
+
+    for gid, wid, trx_type, qty, value, amount in rows:
+        bal = balance((gid, wid))
+        if trx_type == 'purchase':
+            bal["quantity_quintal"] += qty or 0.0
+            cost = costs.setdefault(gid, {field: 0.0 for field in GRAIN_FIELDS})
+            cost["purchased_qty"] += qty or 0.0
+            cost["purchased_value"] += value or 0.0
+            cost["purchased_amount"] += amount or 0.0
+        elif trx_type == 'sale':
+            bal["quantity_quintal"] -= qty or 0.0
+
+    # Pending is clamped per transaction, so sum it row by row in SQL
+    sale_pending = (
+        Transaction.total_amount
+        - func.coalesce(Transaction.shortage_quantity, 0) * Transaction.rate_per_quintal
+        - func.coalesce(Transaction.deduction_amount, 0)
+        - Transaction.amount_paid
+    )
+    purchase_pending = Transaction.total_amount - Transaction.amount_paid
+    pending = session.exec(select(
+        Transaction.grain_id,
+        Transaction.warehouse_id,
+        func.sum(case((and_(Transaction.type == 'sale', sale_pending > 0), sale_pending), else_=0.0)),
+        func.sum(case((and_(Transaction.type == 'purchase', purchase_pending > 0), purchase_pending), else_=0.0))
+    ).group_by(Transaction.grain_id, Transaction.warehouse_id)).all()
+    for gid, wid, receivable, payable in pending:
+        bal = balance((gid, wid))
+        bal["receivable"] = receivable or 0.0
+        bal["payable"] = payable or 0.0
+
+    return balances, costs
+
+def rebuild(session: Session):
+    """
+    Recompute StockBalance and GrainCost from scratch out of the Transaction table.
+    Returns (balance_rows, grain_rows). Caller commits.
+    """
+    balances, costs = _recompute(session)
+
+    for table in DERIVED_TABLES:
+        session.exec(delete(table))
+
+    for (gid, wid), bal in balances.items():
+        session.add(StockBalance(grain_id=gid, warehouse_id=wid, **bal))
+    for gid, cost in costs.items():
+        session.add(GrainCost(grain_id=gid, **cost))
+    session.flush()
+
+    return len(balances), len(costs)
+
+def _drifted(stored: float, expected: float) -> bool:
+    return abs((stored or 0.0) - expected) > DRIFT_TOLERANCE
+
+def check(session: Session) -> List[str]:
+    """
+    Compare the stored derived tables with a from-scratch recompute.
+    Returns one message per drifted value (empty list = consistent). Read only.
+    """
+    balances, costs = _recompute(session)
+    problems = []
+
+    for table, key_fields, fields, expected_rows in (
+        (StockBalance, ("grain_id", "warehouse_id"), BALANCE_FIELDS, balances),
+        (GrainCost, ("grain_id",), GRAIN_FIELDS, {(gid,): cost for gid, cost in costs.items()})
+    ):
+        stored_rows = {tuple(getattr(row, f) for f in key_fields): row for row in session.exec(select(table)).all()}
+        for key in sorted(expected_rows.keys() | stored_rows.keys()):
+            label = " ".join(f"{f.split('_')[0]}={v}" for f, v in zip(key_fields, key))
+            for field in fields:
+                stored = getattr(stored_rows[key], field) if key in stored_rows else 0.0
+                expected = expected_rows.get(key, {}).get(field, 0.0)
+                if _drifted(stored, expected):
+                    problems.append(f"{table.__name__} {label} {field}: stored {stored} != expected {expected}")
+
+    return problems
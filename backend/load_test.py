@@ -0,0 +1,182 @@
+"""
+Load test against a running server: every router, weighted towards the screens users open most.
+Records per-endpoint p50/p95/p99 to a JSON file, and compares against an earlier run with --compare.
+
+Start the server first (uvicorn main:app), ideally on data from generate_data.py. Reads only, unless --writes
+(adds purchases and payments to the database, don't use against production).
+
+Usage: python load_test.py [--base-url http://localhost:8000] [--concurrency 20] [--seconds 60]
+                           [--out load_test_results.json] [--compare baseline.json] [--writes]
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+import httpx
+
+from bench_stats import percentile
+
+class Fixtures:
+    """Ids picked from the server's own data so detail endpoints hit real rows."""
+
+    def __init__(self, transaction_ids, sale_groups, grain_ids, warehouse_ids, contact_ids):
+        self.transaction_ids = transaction_ids or [1]
+        self.sale_groups = sale_groups or ["missing"]
+        self.grain_ids = grain_ids or [1]
+        self.warehouse_ids = warehouse_ids or [1]
+        self.contact_ids = contact_ids or [1]
+
+async def load_fixtures(client) -> Fixtures:
+    page = (await client.get("/transactions/page", params={"limit": 500})).json()["items"]
+    return Fixtures(
+        [t["id"] for t in page],
+        [t["sale_group_id"] for t in page if t.get("sale_group_id")],
+        [g["id"] for g in (await client.get("/master/grains")).json()],
+        [w["id"] for w in (await client.get("/master/warehouses")).json()],
+        [c["id"] for c in (await client.get("/master/contacts")).json()]
+    )
+
+def _last_days(days):
+    end = datetime.now()
+    return {"start_date": (end - timedelta(days=days)).isoformat(), "end_date": end.isoformat()}
+
+# name -> (weight, request builder(rng, fixtures, login) -> (method, url, kwargs))
+SCENARIOS = {
+    "GET /stats/dashboard": (10, lambda r, f, l: ("GET", "/stats/dashboard", {})),
+    "GET /inventory/": (10, lambda r, f, l: ("GET", "/inventory/", {})),
+    "GET /transactions/page": (12, lambda r, f, l: ("GET", "/transactions/page", {"params": {"limit": 50}})),
+    "GET /transactions/page (filtered)": (6, lambda r, f, l: ("GET", "/transactions/page", {"params": {
+        "limit": 50, "type": r.choice(["purchase", "sale"]), "grain_id": r.choice(f.grain_ids)}})),
+    "GET /transactions/": (2, lambda r, f, l: ("GET", "/transactions/", {"params": {"limit": 200}})),
+    "GET /transactions/bill/{id}": (5, lambda r, f, l: ("GET", f"/transactions/bill/{r.choice(f.transaction_ids)}", {})),
+    "GET /transactions/{id}/payments": (4, lambda r, f, l: ("GET", f"/transactions/{r.choice(f.transaction_ids)}/payments", {})),
+    "GET /transactions/dispatch/{group}": (3, lambda r, f, l: ("GET", f"/transactions/dispatch/{r.choice(f.sale_groups)}", {})),
+    "GET /master/grains": (3, lambda r, f, l: ("GET", "/master/grains", {})),
+    "GET /master/warehouses": (3, lambda r, f, l: ("GET", "/master/warehouses", {})),
+    "GET /master/contacts": (3, lambda r, f, l: ("GET", "/master/contacts", {})),
+    "GET /master/bank-details": (1, lambda r, f, l: ("GET", "/master/bank-details", {})),
+    "GET /reports/transport": (5, lambda r, f, l: ("GET", "/reports/transport", {"params": {"limit": 100}})),
+    "POST /analytics/query (profit by grain)": (4, lambda r, f, l: ("POST", "/analytics/query", {"json": {
+        "report_type": "profit", "group_by": "grain"}})),
+    "POST /analytics/query (detail, 90 days)": (4, lambda r, f, l: ("POST", "/analytics/query", {"json": dict(
+        _last_days(90), report_type=r.choice(["purchase", "sale", "profit"]), group_by="none")})),
+    "POST /analytics/query (by party)": (2, lambda r, f, l: ("POST", "/analytics/query", {"json": {
+        "report_type": r.choice(["purchase", "sale"]), "group_by": "party", "status": r.choice(["all", "pending"])}})),
+    "POST /analytics/export (30 days)": (1, lambda r, f, l: ("POST", "/analytics/export", {"json": dict(
+        _last_days(30), report_type="sale", group_by="none")})),
+    "GET /users/": (1, lambda r, f, l: ("GET", "/users/", {})),
+    "POST /auth/login": (1, lambda r, f, l: ("POST", "/auth/login", {"data": l})),
+}
+
+WRITE_SCENARIOS = {
+    "POST /transactions/": (2, lambda r, f, l: ("POST", "/transactions/", {"json": {
+        "type": "purchase", "grain_id": r.choice(f.grain_ids), "contact_id": r.choice(f.contact_ids),
+        "warehouse_id": r.choice(f.warehouse_ids), "quantity_quintal": round(r.uniform(10, 100), 2),
+        "number_of_bags": 100, "rate_per_quintal": round(r.uniform(2000, 5000), 2), "total_amount": 0}})),
+    "POST /transactions/{id}/payment": (1, lambda r, f, l: ("POST", f"/transactions/{r.choice(f.transaction_ids)}/payment", {"json": {"amount": 1}})),
+}
+
+async def _worker(client, scenarios, fixtures, login, deadline, results, seed):
+    rng = random.Random(seed)
+    names = list(scenarios)
+    weights = [scenarios[n][0] for n in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, url, kwargs = scenarios[name][1](rng, fixtures, login)
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, url, **kwargs)
+            await res.aread()
+            ok = res.status_code < 400 or (res.status_code == 404 and "dispatch" in url)
+        except httpx.HTTPError:
+            ok = False
+        latencies, errors = results.setdefault(name, ([], []))
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(name)
+
+def _summary(latencies, errors, elapsed):
+    ms = [v * 1000 for v in latencies]
+    return {
+        "requests": len(ms),
+        "errors": len(errors),
+        "rps": round(len(ms) / elapsed, 2),
+        "mean_ms": round(sum(ms) / len(ms), 2),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2)
+    }
+
+async def run(args):
+    login = {"username": args.username, "password": args.password}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        res = await client.post("/auth/login", data=login)
+        if res.status_code != 200:
+            sys.exit(f"Login failed ({res.status_code}): {res.text}")
+        client.headers["Authorization"] = f"Bearer {res.json()['access_token']}"
+
+        fixtures = await load_fixtures(client)
+        scenarios = dict(SCENARIOS, **(WRITE_SCENARIOS if args.writes else {}))
+
+        results = {}
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, scenarios, fixtures, login, start + args.seconds, results, seed)
+            for seed in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    all_latencies = [v for latencies, _ in results.values() for v in latencies]
+    all_errors = [e for _, errors in results.values() for e in errors]
+    return {
+        "meta": {
+            "base_url": args.base_url,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "concurrency": args.concurrency,
+            "seconds": args.seconds,
+            "writes": args.writes
+        },
+        "overall": _summary(all_latencies, all_errors, elapsed),
+        "endpoints": {name: _summary(lat, err, elapsed) for name, (lat, err) in sorted(results.items())}
+    }
+
+def _print(report, baseline=None):
+    print(f"{'endpoint':<42} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8}" + ("   p95 vs baseline" if baseline else ""))
+    rows = list(report["endpoints"].items()) + [("OVERALL", report["overall"])]
+    for name, r in rows:
+        line = f"{name:<42} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        if baseline:
+            old = baseline["overall"] if name == "OVERALL" else baseline["endpoints"].get(name)
+            if old:
+                line += f"   {old['p95_ms']:8.1f} -> {(r['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0:+6.1f}%"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--writes", action="store_true", help="Also create purchases and payments")
+    parser.add_argument("--out", default="load_test_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare p95 against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    _print(report, baseline)
+    print(f"Saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
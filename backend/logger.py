@@ -1,6 +1,11 @@
 import logging
 import sys
-from logging.handlers import RotatingFileHandler
+import json
+import queue
+import atexit
+import threading
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 
 # Create logs directory if it doesn't exist
@@ -10,27 +15,115 @@ if not os.path.exists(LOG_DIR):
 
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
 
+# Config
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower() # text, json (one object per line with request_id / route / duration_ms)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-logger sampling of noisy loggers, e.g. "access=0.1,slow_query=0.5" keeps 10% / 50% of their records. ERROR and above are always kept
+LOG_SAMPLE = {
+    name.strip(): float(rate)
+    for name, rate in (item.split("=") for item in os.getenv("LOG_SAMPLE", "").split(",") if "=" in item)
+}
+
+# Record fields no format here uses: skip collecting them on every call (see "Optimization" in the logging HOWTO)
+logging._srcfile = None # No caller frame lookup (filename / lineno / funcName)
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# Set per request by main.py, copied onto every record by the queue handler
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+route_var: ContextVar[str] = ContextVar("route", default="-")
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "route": getattr(record, "route", "-"),
+        }
+        if hasattr(record, "duration_ms"):
+            entry["duration_ms"] = record.duration_ms
+        if hasattr(record, "status_code"):
+            entry["status_code"] = record.status_code
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records below ERROR, evenly spread (every 10th at 0.1), no randomness."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        with self._lock:
+            self._credit += self.rate
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            return False
+
+class ContextQueueHandler(QueueHandler):
+    # Runs in the logging thread: stamp the request context (not visible from the listener thread), then enqueue
+    def prepare(self, record):
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return super().prepare(record)
+
+def _formatter():
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+# One file + stdout handler pair for the whole process, written by a background thread.
+# Request threads only pay for formatting the message and a queue put.
+_queue_handler = None
+_listener = None
+_setup_lock = threading.Lock()
+
+def _start_listener():
+    global _queue_handler, _listener
+    formatter = _formatter()
+
+    # File Handler (Rotating)
+    file_handler = RotatingFileHandler(
+        LOG_FILE, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+
+    # Console Handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = ContextQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    # Flush whatever is still queued (called at exit; safe to call twice)
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 def get_logger(name):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
 
     # Check if handlers are already added to avoid duplicates
     if not logger.handlers:
-        # Formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-
-        # File Handler (Rotating)
-        file_handler = RotatingFileHandler(
-            LOG_FILE, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8"
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-
-        # Console Handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        with _setup_lock:
+            if _listener is None:
+                _start_listener()
+        logger.addHandler(_queue_handler)
+        if name in LOG_SAMPLE:
+            logger.addFilter(SamplingFilter(LOG_SAMPLE[name]))
 
     return logger
@@ -1,17 +1,31 @@
-from fastapi import FastAPI
-from database import create_db_and_tables, engine
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from database import create_db_and_tables, engine, async_engine
 from contextlib import asynccontextmanager
 from sqlmodel import Session, select
-from models import User
+from models import User, Transaction, StockBalance
 from routers.auth import get_password_hash
+import ledger
+import changes
+import compression
+import db_metrics
+import metrics
+import profiler
+import time
+import uuid
 
-from logger import get_logger
+from logger import get_logger, request_id_var, route_var
 
 logger = get_logger("main")
+access_logger = get_logger("access") # One line per request; thin it out with LOG_SAMPLE=access=0.1
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Server starting up...")
+    # Tables from before delta sync get their updated_at column
+    altered = changes.add_sync_columns(engine)
+    if altered:
+        logger.info(f"Added updated_at to: {', '.join(altered)}")
     create_db_and_tables()
     logger.info("Database initialized.")
     
@@ -30,23 +44,71 @@ async def lifespan(app: FastAPI):
             session.add(admin)
             session.commit()
             logger.info("Default admin created: admin / admin123")
+
+        # First start after upgrade: build stock balances and dashboard totals from existing transactions
+        if not session.exec(select(StockBalance)).first() and session.exec(select(Transaction)).first():
+            logger.info("Derived tables empty, rebuilding from transactions...")
+            ledger.rebuild(session)
+            session.commit()
+            logger.info("Stock balances rebuilt.")
+
+        pruned = changes.prune_tombstones(session)
+        session.commit()
+        if pruned:
+            logger.info(f"Pruned {pruned} sync tombstones older than {changes.SYNC_TOMBSTONE_DAYS} days.")
     
     yield
     logger.info("Server shutting down...")
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(lifespan=lifespan, title="Grain Manager API")
 
 from fastapi.middleware.cors import CORSMiddleware
 
+# Innermost, so it shares the endpoint's asyncio task: admin-only per-request profiling (X-Profile: 1)
+app.add_middleware(profiler.ProfilerMiddleware)
+
+# Brotli / gzip for responses over COMPRESS_MIN_BYTES (compression.py)
+app.add_middleware(compression.CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-DB-Query-Count", "X-DB-Time-Ms", "X-Profile-File", "ETag"],
 )
 
-from routers import auth, master_data, transactions, inventory, stats, reports, analytics
+@app.middleware("http")
+async def request_instrumentation(request: Request, call_next):
+    # Request id / route on every log record of this request (logger.py)
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    route = metrics.route_template(request.scope)
+    request_id_var.set(request_id)
+    route_var.set(route)
+
+    # Per-request query count / DB time (collected by the engine event hooks in db_metrics.py)
+    stats = db_metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    response.headers["X-Request-ID"] = request_id
+    response.headers["X-DB-Query-Count"] = str(stats.query_count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.db_time_ms:.1f}"
+    db_metrics.finish_request(stats, request.method, request.url.path, response.status_code, duration_ms)
+    access_logger.info(
+        f"{request.method} {request.url.path} {response.status_code} {duration_ms:.1f}ms",
+        extra={"duration_ms": round(duration_ms, 2), "status_code": response.status_code}
+    )
+    return response
+
+# Outermost: latency / counts per route template, including time spent in the middlewares above
+app.add_middleware(metrics.MetricsMiddleware)
+
+from routers import auth, master_data, transactions, inventory, stats, reports, analytics, sync, bills, batch
 app.include_router(auth.router)
 app.include_router(master_data.router)
 app.include_router(transactions.router)
@@ -54,6 +116,9 @@ app.include_router(inventory.router)
 app.include_router(stats.router)
 app.include_router(reports.router)
 app.include_router(analytics.router)
+app.include_router(sync.router)
+app.include_router(bills.router)
+app.include_router(batch.router)
 
 @app.get("/")
 def read_root():
@@ -64,4 +129,9 @@ def read_root():
 def health_check():
     return {"status": "ok", "service": "grain-manager-api"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Force reload for DB regeneration
@@ -0,0 +1,186 @@
+import time
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Tuple
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from starlette.routing import compile_path
+
+# Prometheus text exposition without extra dependencies. Served by GET /metrics (main.py).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot: +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def render(self, name: str, labels: str, lines: list):
+        cumulative = 0
+        sep = "," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+
+# Request metrics, keyed by (method, route template). Only touched from the event loop.
+_latency: Dict[Tuple[str, str], Histogram] = {}
+_requests = defaultdict(int) # (method, route, status) -> count
+_errors = defaultdict(int) # (method, route) -> 5xx responses and unhandled exceptions
+_in_flight = defaultdict(int) # (method, route) -> requests being served
+
+# Pools registered by database.py: name -> pool
+_pools = {}
+_pool_wait: Dict[str, Histogram] = {}
+
+try:
+    # Newer FastAPI keeps each included router as one nested entry in app.router.routes;
+    # this yields every endpoint route with its full path (prefix included)
+    from fastapi.routing import iter_route_contexts as _endpoint_routes
+except ImportError:
+    def _endpoint_routes(routes):
+        return routes
+
+_route_table = None # [(path_regex, template, methods, endpoint)], built on first request
+
+def resolve_route(scope):
+    """
+    (path template, endpoint) of the route that will serve this request, before routing runs.
+    ("unmatched", None) for 404s, (template, None) for 405s.
+    """
+    # Only the template and endpoint are needed, so match compiled path regexes directly instead of
+    # Route.matches(), which also builds a child scope per candidate
+    global _route_table
+    if _route_table is None:
+        _route_table = [
+            (compile_path(route.path)[0], route.path, getattr(route, "methods", None), route.endpoint)
+            for route in _endpoint_routes(scope["app"].router.routes)
+            if getattr(route, "endpoint", None) is not None
+        ]
+
+    path, method = scope["path"], scope["method"]
+    fallback = "unmatched" # 404s: one label instead of one per random URL
+    for regex, template, methods, endpoint in _route_table:
+        if regex.match(path):
+            if methods is None or method in methods:
+                return template, endpoint
+            if fallback == "unmatched":
+                fallback = template # 405: right path, wrong method
+    return fallback, None
+
+def route_template(scope) -> str:
+    return resolve_route(scope)[0]
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body wrapping) so the overhead stays in microseconds."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["method"], route_template(scope))
+        status_code = 500
+        _in_flight[key] += 1
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight[key] -= 1
+            histogram = _latency.get(key)
+            if histogram is None:
+                histogram = _latency[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            _requests[(key[0], key[1], status_code)] += 1
+            if status_code >= 500:
+                _errors[key] += 1
+
+class _TimedPoolMixin:
+    # Times every connection checkout, including the wait when all pool_size connections are busy
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            wait = _pool_wait.get(getattr(self, "_metrics_name", None))
+            if wait is not None:
+                wait.observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def register_pool(name: str, pool):
+    pool._metrics_name = name
+    _pools[name] = pool
+    _pool_wait[name] = Histogram(POOL_WAIT_BUCKETS)
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{v}"' for k, v in labels.items())
+
+def render() -> str:
+    lines = []
+
+    lines.append("# HELP http_requests_total Requests served, by route template and status code.")
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route, status_code), count in list(_requests.items()):
+        lines.append(f"http_requests_total{{{_labels(method=method, route=route, status=status_code)}}} {count}")
+
+    lines.append("# HELP http_request_errors_total Requests that ended in a 5xx or an unhandled exception.")
+    lines.append("# TYPE http_request_errors_total counter")
+    for (method, route), count in list(_errors.items()):
+        lines.append(f"http_request_errors_total{{{_labels(method=method, route=route)}}} {count}")
+
+    lines.append("# HELP http_requests_in_flight Requests currently being served.")
+    lines.append("# TYPE http_requests_in_flight gauge")
+    for (method, route), count in list(_in_flight.items()):
+        lines.append(f"http_requests_in_flight{{{_labels(method=method, route=route)}}} {count}")
+
+    lines.append("# HELP http_request_duration_seconds Request latency, by route template.")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    for (method, route), histogram in list(_latency.items()):
+        histogram.render("http_request_duration_seconds", _labels(method=method, route=route), lines)
+
+    for metric, help_text in (
+        ("db_pool_size", "Configured pool size."),
+        ("db_pool_checked_out", "Connections currently checked out."),
+        ("db_pool_overflow", "Connections open beyond pool_size (negative: pool not yet full)."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for name, pool in _pools.items():
+            value = {"db_pool_size": pool.size, "db_pool_checked_out": pool.checkedout, "db_pool_overflow": pool.overflow}[metric]()
+            lines.append(f"{metric}{{{_labels(pool=name)}}} {value}")
+
+    lines.append("# HELP db_pool_wait_seconds Time spent getting a connection from the pool.")
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for name, histogram in _pool_wait.items():
+        histogram.render("db_pool_wait_seconds", _labels(pool=name), lines)
+
+    return "\n".join(lines) + "\n"
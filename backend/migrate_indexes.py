@@ -0,0 +1,105 @@
+from sqlalchemy import text, inspect
+from sqlalchemy.schema import CreateIndex
+from database import engine
+from models import Transaction, PaymentHistory, DispatchInfo
+
+# Tables whose declared indexes (models.py) must exist on old databases too
+INDEXED_TABLES = [Transaction.__table__, PaymentHistory.__table__, DispatchInfo.__table__]
+
+# Indexes this script created earlier that no query uses anymore: dropped, they only slow down writes
+# (stock sums per grain+warehouse are read from StockBalance since the ledger tables)
+RETIRED_INDEXES = ["ix_transaction_type_grain_warehouse"]
+
+# Hot queries and the index each one must use
+HOT_QUERIES = [
+    ("ix_transaction_sale_group_id",
+     'SELECT * FROM "transaction" WHERE sale_group_id = :group_id',
+     {"group_id": "x"}),
+    ("ix_transaction_type_date",
+     'SELECT * FROM "transaction" WHERE type = :type AND date >= :start AND date <= :end',
+     {"type": "sale", "start": "2024-04-01", "end": "2025-03-31"}),
+    ("ix_transaction_date_id",
+     'SELECT * FROM "transaction" ORDER BY date DESC, id DESC LIMIT 100',
+     {}),
+    ("ix_paymenthistory_transaction_id",
+     'SELECT * FROM paymenthistory WHERE transaction_id = :trx_id ORDER BY date DESC',
+     {"trx_id": 1}),
+]
+
+def _invalid_postgres_indexes(conn):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that IF NOT EXISTS would skip
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+    )).fetchall()
+    return {r[0] for r in rows}
+
+def _existing_columns(table):
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return set()
+    return {c["name"] for c in inspector.get_columns(table.name)}
+
+def ensure_indexes():
+    is_postgres = engine.dialect.name == "postgresql"
+
+    # CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        invalid = _invalid_postgres_indexes(conn) if is_postgres else set()
+
+        for table in INDEXED_TABLES:
+            columns = _existing_columns(table)
+            for index in sorted(table.indexes, key=lambda i: i.name):
+                missing = [name for name in index.columns.keys() if name not in columns]
+                if missing:
+                    # e.g. updated_at on databases from before delta sync: server startup adds the column and its index
+                    print(f"Skipping index {index.name}: {table.name} has no column {', '.join(missing)} yet")
+                    continue
+
+                if index.name in invalid:
+                    print(f"Dropping invalid index {index.name}...")
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+
+                ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+                if is_postgres:
+                    # Build without blocking writes on the live table
+                    ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+
+                print(f"Ensuring index {index.name}...")
+                conn.execute(text(ddl))
+
+        for index_name in RETIRED_INDEXES:
+            print(f"Dropping unused index {index_name}...")
+            conn.execute(text(f'DROP INDEX {"CONCURRENTLY " if is_postgres else ""}IF EXISTS "{index_name}"'))
+
+def check_query_plans():
+    """
+    EXPLAIN every hot query and confirm the planner picks its index.
+    Returns True if all of them do.
+    """
+    is_postgres = engine.dialect.name == "postgresql"
+    explain = "EXPLAIN" if is_postgres else "EXPLAIN QUERY PLAN"
+    all_good = True
+
+    with engine.connect() as conn:
+        if is_postgres:
+            # Small tables are cheaper to seq-scan; we only care that the index is usable
+            conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for index_name, sql, params in HOT_QUERIES:
+            plan = "\n".join(str(row[-1]) for row in conn.execute(text(f"{explain} {sql}"), params))
+            if index_name in plan:
+                print(f"PASS: {index_name}")
+            else:
+                all_good = False
+                print(f"FAIL: {index_name} not used by: {sql}\n{plan}")
+
+    return all_good
+
+if __name__ == "__main__":
+    print("Creating missing indexes...")
+    ensure_indexes()
+    print("Checking query plans...")
+    if check_query_plans():
+        print("Index migration complete.")
+    else:
+        print("WARNING: Some hot queries are not using their index.")
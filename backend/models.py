@@ -1,19 +1,24 @@
 from typing import Optional
 from sqlmodel import Field, SQLModel
+from sqlalchemy import Index
 from datetime import datetime
 
-
+def _updated_at():
+    # Last insert/update time, for delta sync (GET /sync). NULL on rows that predate the column
+    return Field(default_factory=datetime.utcnow, index=True, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 class Grain(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)  # Wheat, Rice, etc.
     hindi_name: Optional[str] = None # Gehu, Chana
     standard_bharti: float = Field(default=60.0)
+    updated_at: Optional[datetime] = _updated_at()
 
 class Warehouse(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     location: Optional[str] = None
+    updated_at: Optional[datetime] = _updated_at()
 
 class Contact(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -21,8 +26,15 @@ class Contact(SQLModel, table=True):
     type: str  # supplier, buyer, broker
     phone: Optional[str] = None
     gst_number: Optional[str] = None
+    updated_at: Optional[datetime] = _updated_at()
 
 class Transaction(SQLModel, table=True):
+    # Hot-path indexes. Existing databases get them via migrate_indexes.py
+    __table_args__ = (
+        Index("ix_transaction_type_date", "type", "date"), # Analytics / report date ranges
+        Index("ix_transaction_date_id", "date", "id"), # Keyset pagination
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     date: datetime = Field(default_factory=datetime.utcnow)
     type: str  # purchase, sale
@@ -49,7 +61,7 @@ class Transaction(SQLModel, table=True):
     destination: Optional[str] = None
     driver_name: Optional[str] = None
     vehicle_number: Optional[str] = None
-    sale_group_id: Optional[str] = None # To group multiple rows of a single bill
+    sale_group_id: Optional[str] = Field(default=None, index=True) # To group multiple rows of a single bill
     
     # Settlement / Deductions (Sale only)
     shortage_quantity: float = Field(default=0.0) # Quantity lost/short
@@ -64,13 +76,38 @@ class Transaction(SQLModel, table=True):
     # Store calculated totals
     labour_cost_total: float = Field(default=0.0) # Used in Purchase to deduct
     expenses_total: float = Field(default=0.0) # Sale: Labour + Transport (Hidden)
+    updated_at: Optional[datetime] = _updated_at()
 
 class PaymentHistory(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    transaction_id: int = Field(foreign_key="transaction.id")
+    transaction_id: int = Field(foreign_key="transaction.id", index=True)
     amount: float
     date: datetime = Field(default_factory=datetime.utcnow)
     notes: Optional[str] = None
+    updated_at: Optional[datetime] = _updated_at()
+
+class StockBalance(SQLModel, table=True):
+    # Running stock per grain per warehouse, kept in step with Transaction by ledger.py
+    grain_id: int = Field(foreign_key="grain.id", primary_key=True)
+    warehouse_id: int = Field(foreign_key="warehouse.id", primary_key=True)
+    quantity_quintal: float = Field(default=0.0) # Purchases - Sales
+    # Dashboard totals for the transactions at this grain+warehouse (summed by ledger.dashboard_totals).
+    # Kept here, not per grain, so a sale or payment writes only the stock row it already locks
+    receivable: float = Field(default=0.0) # Sum of positive sale pending (after shortage/deduction)
+    payable: float = Field(default=0.0) # Sum of positive purchase pending
+
+class GrainCost(SQLModel, table=True):
+    # Running purchase totals per grain (weighted average cost = value / qty), written by purchases only
+    grain_id: int = Field(foreign_key="grain.id", primary_key=True)
+    purchased_qty: float = Field(default=0.0)
+    purchased_value: float = Field(default=0.0) # Sum of qty * rate_per_quintal
+    purchased_amount: float = Field(default=0.0) # Sum of purchase total_amount (after labour), dashboard valuation
+
+class InvoiceSequence(SQLModel, table=True):
+    # One counter per transaction type (and financial year when INVOICE_RESET_YEARLY is on)
+    type: str = Field(primary_key=True) # purchase, sale
+    financial_year: str = Field(default="", primary_key=True) # "2025-26", or "" for a running sequence
+    last_value: int = Field(default=0) # Last invoice number handed out
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -142,3 +179,11 @@ class DispatchInfo(SQLModel, table=True):
     deduction_note: Optional[str] = None
     
     status: str = Field(default="pending") # pending, cleared
+    updated_at: Optional[datetime] = _updated_at()
+
+class Tombstone(SQLModel, table=True):
+    # One row per deleted synced row, so GET /sync can tell app replicas to drop it. Pruned after SYNC_TOMBSTONE_DAYS
+    id: Optional[int] = Field(default=None, primary_key=True)
+    table_name: str # SQL table name of the deleted row, e.g. "transaction"
+    row_id: int
+    deleted_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import threading
+from datetime import datetime
+from urllib.parse import parse_qs
+from fastapi import HTTPException
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import engine
+from cache import bypass_var
+import metrics
+from logger import get_logger, LOG_DIR
+
+# Config
+REQUEST_PROFILER = os.getenv("REQUEST_PROFILER", "true").lower() == "true" # Set false to disable the feature entirely
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "1"))
+PROFILE_HEADER = "x-profile" # Or ?profile=1
+
+logger = get_logger("profiler")
+
+class RequestSampler:
+    """
+    Samples the stacks doing work for one request, from a background thread:
+    - the event loop thread, only while the request's own task is running
+    - threadpool workers, only while their stack passes through the endpoint's module
+      (sync endpoints and read() helpers run there). Concurrent requests to the same router module
+      can show up in worker samples.
+    """
+
+    def __init__(self, loop, task, module_file: str, interval: float):
+        self.loop = loop
+        self.task = task
+        self.loop_thread_id = threading.get_ident()
+        self.module_file = module_file
+        self.interval = interval
+        self.frames = [] # speedscope shared frames
+        self._frame_index = {} # (name, file, line) -> index
+        self.samples = {} # thread name -> ([stack], [weight])
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self):
+        now = time.perf_counter()
+        weight = (now - self._last) * 1000
+        self._last = now
+
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == self._thread.ident:
+                continue
+            if thread_id == self.loop_thread_id:
+                if asyncio.current_task(self.loop) is not self.task:
+                    continue # Loop idle or serving another request
+                thread_name = "event loop"
+            else:
+                thread_name = names.get(thread_id, str(thread_id))
+
+            stack = []
+            on_request = thread_id == self.loop_thread_id
+            while frame is not None:
+                stack.append(self._frame_id(frame))
+                on_request = on_request or frame.f_code.co_filename == self.module_file
+                frame = frame.f_back
+            if not on_request:
+                continue
+
+            stacks, weights = self.samples.setdefault(thread_name, ([], []))
+            stacks.append(stack[::-1]) # Root first
+            weights.append(weight)
+
+    def speedscope(self, name: str) -> dict:
+        profiles = []
+        for thread_name, (stacks, weights) in self.samples.items():
+            profiles.append({
+                "type": "sampled",
+                "name": f"{name} [{thread_name}]",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": stacks,
+                "weights": weights
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{name} ({self.elapsed * 1000:.1f} ms)",
+            "exporter": "grain-manager request profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": profiles
+        }
+
+def _wants_profile(scope) -> bool:
+    for key, value in scope["headers"]:
+        if key == PROFILE_HEADER.encode() and value not in (b"", b"0", b"false"):
+            return True
+    return parse_qs(scope.get("query_string", b"").decode()).get("profile", ["0"])[0] not in ("", "0", "false")
+
+async def _is_admin(scope) -> bool:
+    auth = dict(scope["headers"]).get(b"authorization", b"").decode()
+    if not auth.lower().startswith("bearer "):
+        return False
+    from routers.auth import get_current_user # Late import: auth imports this module's dependencies
+    try:
+        with Session(engine) as session:
+            user = await get_current_user(auth[7:], session)
+    except HTTPException:
+        return False
+    return user.role == "admin"
+
+def _endpoint_file(scope):
+    route_path, endpoint = metrics.resolve_route(scope)
+    if endpoint is None:
+        return None, None
+    return inspect.unwrap(endpoint).__code__.co_filename, route_path
+
+def _write(path: str, data: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+class ProfilerMiddleware:
+    """
+    Profiles a single request when an admin sends `X-Profile: 1` (or `?profile=1`).
+    The speedscope file goes to logs/ and its path comes back in the X-Profile-File header.
+    Cached results are not served to a profiled request, so the profile shows the real work.
+    Added innermost (main.py) so it runs in the same asyncio task as the endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REQUEST_PROFILER or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        module_file, route_path = _endpoint_file(scope)
+        if module_file is None or not await _is_admin(scope):
+            if module_file is not None:
+                logger.warning(f"Profile requested by non-admin for {scope['method']} {scope['path']}, ignored")
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {route_path}"
+        slug = "".join(c if c.isalnum() else "_" for c in label).strip("_")
+        path = os.path.join(LOG_DIR, f"profile-{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.speedscope.json")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", path.encode())]
+            await send(message)
+
+        sampler = RequestSampler(asyncio.get_running_loop(), asyncio.current_task(), module_file, PROFILER_INTERVAL_MS / 1000)
+        bypass = bypass_var.set(True)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            bypass_var.reset(bypass)
+            await run_in_threadpool(_write, path, sampler.speedscope(label))
+            logger.info(f"Profiled {label} in {sampler.elapsed * 1000:.1f} ms -> {path}")
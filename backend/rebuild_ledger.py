@@ -0,0 +1,33 @@
+import sys
+from sqlmodel import Session
+from database import engine, create_db_and_tables
+from ledger import rebuild, check
+
+def rebuild_ledger():
+    create_db_and_tables()
+    with Session(engine) as session:
+        print("Recomputing stock balances and dashboard totals from transactions...")
+        balance_rows, grain_rows = rebuild(session)
+        session.commit()
+        print(f"Done. {balance_rows} stock balances, {grain_rows} grain cost records.")
+
+def check_ledger():
+    """Recompute from scratch and report drift without changing anything. Returns True if consistent."""
+    with Session(engine) as session:
+        print("Checking stock balances and dashboard totals against transactions...")
+        problems = check(session)
+
+    for problem in problems:
+        print(f"DRIFT: {problem}")
+    if problems:
+        print(f"{len(problems)} drifted values. Run without --check to rebuild.")
+        return False
+    print("OK: derived tables match transactions.")
+    return True
+
+if __name__ == "__main__":
+    # python rebuild_ledger.py          -> rebuild
+    # python rebuild_ledger.py --check  -> report drift only (exit code 1 on drift)
+    if "--check" in sys.argv:
+        sys.exit(0 if check_ledger() else 1)
+    rebuild_ledger()
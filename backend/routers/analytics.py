@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from sqlmodel import Session, select
-from database import get_session
+from sqlmodel import Session, select, func
+from sqlalchemy import case, cast, literal, String
+from database import get_session, get_reader, Reader
+from cache import cached
+from serialization import ORJSONResponse
 from models import Transaction, Grain, Contact, Warehouse, DispatchInfo
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel
 from datetime import datetime
 import io
 import csv
+import os
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -19,7 +23,40 @@ class AnalyticsQuery(BaseModel):
     status: str = "all" # all, paid, pending, partial
     search_query: Optional[str] = None
 
-def _get_analytics_data(session: Session, query: AnalyticsQuery, limit: Optional[int] = None):
+# Set ANALYTICS_SQL_PUSHDOWN=false to compute reports in Python (reference implementation)
+ANALYTICS_SQL_PUSHDOWN = os.getenv("ANALYTICS_SQL_PUSHDOWN", "true").lower() == "true"
+
+def _detail_row(t: Transaction, contact_name: str, grain_name: str, warehouse_name: str, net_realized: float, status: str, profit: float):
+    # One detailed report row (group_by == 'none')
+    return {
+        "date": t.date,
+        "invoice_number": t.invoice_number,
+        "contactName": contact_name,
+        "grainName": grain_name,
+        "warehouseName": warehouse_name,
+        "quantity_quintal": t.quantity_quintal,
+        "rate_per_quintal": t.rate_per_quintal,
+        "baseAmount": t.quantity_quintal * t.rate_per_quintal,
+        "shortageCost": (t.shortage_quantity or 0) * t.rate_per_quintal,
+        "deductionCost": t.deduction_amount or 0,
+        "labourCostTotal": (t.number_of_bags or 0) * (t.labour_cost_per_bag or 0),
+        "transportCostTotal": t.quantity_quintal * (t.transport_cost_per_qtl or 0),
+        "mandi_cost": t.mandi_cost,
+        "netRealized": net_realized,
+        "paidAmount": t.amount_paid,
+        "pendingAmount": (net_realized - t.amount_paid),
+        "status": status.title(), # "Paid" vs "paid"
+        "profit": profit,
+        "cost_price_per_quintal": t.cost_price_per_quintal,
+        "bags": t.number_of_bags,
+        "bharti": (t.quantity_quintal * 100 / t.number_of_bags) if (t.number_of_bags and t.number_of_bags > 0) else 0
+    }
+
+def _get_analytics_data_python(session: Session, query: AnalyticsQuery, limit: Optional[int] = None):
+    """
+    Reference implementation: loads matching transactions and computes everything in Python.
+    Used when SQL can't express the query (see _needs_python) and by the parity test.
+    """
     # 1. Fetch Masters for Mapping
     grains = {g.id: g.name for g in session.exec(select(Grain)).all()}
     contacts = {c.id: c.name for c in session.exec(select(Contact)).all()}
@@ -126,30 +163,10 @@ def _get_analytics_data(session: Session, query: AnalyticsQuery, limit: Optional
             data_to_process = filtered_data[:limit]
             
         for d in data_to_process:
-            t = d["trx"]
-            rows.append({
-                "date": t.date,
-                "invoice_number": t.invoice_number,
-                "contactName": d["contact_name"],
-                "grainName": d["grain_name"],
-                "warehouseName": d["warehouse_name"],
-                "quantity_quintal": t.quantity_quintal,
-                "rate_per_quintal": t.rate_per_quintal,
-                "baseAmount": t.quantity_quintal * t.rate_per_quintal,
-                "shortageCost": (t.shortage_quantity or 0) * t.rate_per_quintal,
-                "deductionCost": t.deduction_amount or 0,
-                "labourCostTotal": (t.number_of_bags or 0) * (t.labour_cost_per_bag or 0),
-                "transportCostTotal": t.quantity_quintal * (t.transport_cost_per_qtl or 0),
-                "mandi_cost": t.mandi_cost,
-                "netRealized": d["net_realized"],
-                "paidAmount": t.amount_paid,
-                "pendingAmount": (d["net_realized"] - t.amount_paid),
-                "status": d["status"].title(), # "Paid" vs "paid"
-                "profit": d["profit"],
-                "cost_price_per_quintal": t.cost_price_per_quintal,
-                "bags": t.number_of_bags,
-                "bharti": (t.quantity_quintal * 100 / t.number_of_bags) if (t.number_of_bags and t.number_of_bags > 0) else 0
-            })
+            rows.append(_detail_row(
+                d["trx"], d["contact_name"], d["grain_name"], d["warehouse_name"],
+                d["net_realized"], d["status"], d["profit"]
+            ))
 
     # Always calculate Groups/Totals on FULL filtered_data (ignore limit for totals)
     for d in filtered_data:
@@ -194,70 +211,228 @@ def _get_analytics_data(session: Session, query: AnalyticsQuery, limit: Optional
         "rows": rows
     }
 
-@router.post("/query")
-def query_analytics(query: AnalyticsQuery, session: Session = Depends(get_session)):
-    # Limit to 500 for UI performance
-    return _get_analytics_data(session, query, limit=500)
+# Computed fields as SQL expressions (same arithmetic, same order as the Python version)
+_T = Transaction
+_rate = _T.rate_per_quintal
+_shortage_val = func.coalesce(_T.shortage_quantity, 0) * _rate
+_deduction = func.coalesce(_T.deduction_amount, 0)
+_labour_loss = func.coalesce(_T.number_of_bags, 0) * func.coalesce(_T.labour_cost_per_bag, 0)
+_transport_loss = _T.quantity_quintal * func.coalesce(_T.transport_cost_per_qtl, 0)
+_mandi_loss = func.coalesce(_T.mandi_cost, 0)
 
-@router.post("/export")
-def export_analytics(query: AnalyticsQuery, session: Session = Depends(get_session)):
-    # Unlimited fetch
-    data = _get_analytics_data(session, query, limit=None)
-    
-    # Generate CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
+# Net Realized: Sales = Gross - Shortage - Deduction - Labour - Transport - Mandi, Purchases = total
+NET_REALIZED = case(
+    (_T.type == 'sale', _T.total_amount - _shortage_val - _deduction - _labour_loss - _transport_loss - _mandi_loss),
+    else_=_T.total_amount
+)
+ROW_STATUS = case(
+    (_T.amount_paid >= NET_REALIZED - 1.0, 'paid'),
+    (_T.amount_paid > 0, 'partial'),
+    else_='pending'
+)
+PROFIT = case(
+    (_T.type == 'sale', NET_REALIZED - func.coalesce(_T.cost_price_per_quintal, 0) * _T.quantity_quintal),
+    else_=0
+)
+GRAIN_NAME = func.coalesce(Grain.name, 'Unknown')
+CONTACT_NAME = func.coalesce(Contact.name, 'Unknown')
+WAREHOUSE_NAME = func.coalesce(Warehouse.name, 'Unknown')
+# str(invoice_number or "")
+INVOICE_TEXT = case((func.coalesce(_T.invoice_number, 0) == 0, ''), else_=cast(_T.invoice_number, String))
+
+GROUP_KEYS = {'grain': GRAIN_NAME, 'party': CONTACT_NAME, 'warehouse': WAREHOUSE_NAME}
+
+def _needs_python(session: Session, query: AnalyticsQuery) -> bool:
+    if not ANALYTICS_SQL_PUSHDOWN:
+        return True
+    # SQLite lower() only folds ASCII, Python's str.lower() folds everything
+    if query.search_query and not query.search_query.isascii() and session.get_bind().dialect.name == "sqlite":
+        return True
+    return False
+
+def _filtered(stmt, query: AnalyticsQuery):
+    # Joins + WHERE shared by the row, group and summary queries
+    stmt = stmt.select_from(_T).outerjoin(Grain, Grain.id == _T.grain_id).outerjoin(
+        Contact, Contact.id == _T.contact_id
+    ).outerjoin(Warehouse, Warehouse.id == _T.warehouse_id)
+
+    # Filter by Report Type (Profit report shows Sales)
+    if query.report_type == 'purchase':
+        stmt = stmt.where(_T.type == 'purchase')
+    elif query.report_type in ('sale', 'profit'):
+        stmt = stmt.where(_T.type == 'sale')
+
+    # Date Filter
+    if query.start_date:
+        stmt = stmt.where(_T.date >= query.start_date)
+    if query.end_date:
+        stmt = stmt.where(_T.date <= query.end_date)
+
+    # Search: party name or invoice number
+    if query.search_query:
+        q = query.search_query.lower()
+        stmt = stmt.where(
+            func.lower(func.coalesce(Contact.name, '')).contains(q, autoescape=True) |
+            INVOICE_TEXT.contains(q, autoescape=True)
+        )
+
+    if query.status != 'all':
+        stmt = stmt.where(ROW_STATUS == query.status)
+
+    return stmt
+
+def _get_analytics_data_sql(session: Session, query: AnalyticsQuery, limit: Optional[int] = None):
+    # Same response as _get_analytics_data_python, aggregated by the database
+
+    # 1. Groups (GROUP BY in DB, ordered by first appearance like the Python dict)
+    key = GROUP_KEYS.get(query.group_by)
+    group_stmt = _filtered(select(
+        (key if key is not None else literal('All')).label("name"),
+        func.count(_T.id),
+        func.sum(_T.quantity_quintal),
+        func.sum(NET_REALIZED),
+        func.sum(_T.amount_paid),
+        func.sum(NET_REALIZED - _T.amount_paid),
+        func.sum(PROFIT)
+    ), query)
+    if key is not None:
+        group_stmt = group_stmt.group_by(key).order_by(func.min(_T.id))
+
+    groups = []
+    for name, count, qty, amount, paid, pending, profit in session.exec(group_stmt).all():
+        if not count:
+            continue # Ungrouped aggregate over zero rows
+        groups.append({
+            "name": name,
+            "count": count,
+            "qty": qty or 0.0,
+            "amount": amount or 0.0,
+            "paid": paid or 0.0,
+            "pending": pending or 0.0,
+            "profit": profit or 0.0
+        })
+
+    # 2. Summary Totals (sum of groups, every row is in exactly one group)
+    global_total = {
+        "count": 0, "qty": 0.0, "amount": 0.0, "paid": 0.0, "pending": 0.0, "profit": 0.0
+    }
+    for g in groups:
+        for field in global_total:
+            global_total[field] += g[field]
+
+    # 3. Detailed rows (only for group_by 'none')
+    rows = []
+    if query.group_by == 'none':
+        row_stmt = _filtered(select(_T, CONTACT_NAME, GRAIN_NAME, WAREHOUSE_NAME, NET_REALIZED, ROW_STATUS, PROFIT), query).order_by(_T.id)
+        if limit is not None:
+            row_stmt = row_stmt.limit(limit)
+        for t, contact_name, grain_name, warehouse_name, net_realized, status, profit in session.exec(row_stmt).all():
+            rows.append(_detail_row(t, contact_name, grain_name, warehouse_name, net_realized, status, profit))
+
+    return {
+        "summary": global_total,
+        "groups": groups,
+        "rows": rows
+    }
+
+def _get_analytics_data(session: Session, query: AnalyticsQuery, limit: Optional[int] = None):
+    if _needs_python(session, query):
+        return _get_analytics_data_python(session, query, limit)
+    return _get_analytics_data_sql(session, query, limit)
+
+@router.post("/query", response_class=ORJSONResponse)
+async def query_analytics(query: AnalyticsQuery, read: Reader = Depends(get_reader)):
+    # Limit to 500 for UI performance. Cached per query until the next write
+    return await cached("analytics", query.model_dump(mode="json"), lambda: read(_get_analytics_data, query, 500))
+
+# Rows formatted per CSV chunk: bounded memory, first bytes go out after the first batch
+EXPORT_BATCH_SIZE = 1000
+
+def _csv_headers(query: AnalyticsQuery):
     # Headers based on type
     if query.group_by != 'none':
-        headers = ['Group Name', 'Count', 'Total Qty', 'Total Amount', 'Paid', 'Pending', 'Total Profit']
-        writer.writerow(headers)
-        for g in data['groups']:
-            writer.writerow([
-                g['name'], g['count'], f"{g['qty']:.2f}", f"{g['amount']:.2f}", 
-                f"{g['paid']:.2f}", f"{g['pending']:.2f}", f"{g['profit']:.2f}"
-            ])
+        return ['Group Name', 'Count', 'Total Qty', 'Total Amount', 'Paid', 'Pending', 'Total Profit']
+
+    headers = ['Date', 'Invoice', 'Party', 'Grain']
+    if query.report_type == 'purchase':
+        headers.append('Bharti')
+    headers.extend(['Bags', 'Total Qty', 'Rate', 'Gross', 'Short', 'Ded', 'Lab', 'Trans', 'Mandi', 'Net Realized', 'Paid', 'Pending', 'Status', 'Profit'])
+    return headers
+
+def _csv_group_row(g):
+    return [
+        g['name'], g['count'], f"{g['qty']:.2f}", f"{g['amount']:.2f}", 
+        f"{g['paid']:.2f}", f"{g['pending']:.2f}", f"{g['profit']:.2f}"
+    ]
+
+def _csv_detail_row(r, query: AnalyticsQuery):
+    row = [
+        r['date'].isoformat() if r['date'] else '',
+        r['invoice_number'],
+        r['contactName'],
+        r['grainName']
+    ]
+    if query.report_type == 'purchase':
+        row.append(f"{r['bharti']:.2f}")
+    
+    row.extend([
+        r['bags'],
+        f"{r['quantity_quintal']:.2f}",
+        f"{r['rate_per_quintal']:.2f}",
+        f"{r['baseAmount']:.2f}",
+        f"{r['shortageCost']:.2f}",
+        f"{r['deductionCost']:.2f}",
+        f"{r['labourCostTotal']:.2f}",
+        f"{r['transportCostTotal']:.2f}",
+        f"{(r['mandi_cost'] or 0):.2f}",
+        f"{r['netRealized']:.2f}",
+        f"{r['paidAmount']:.2f}",
+        f"{r['pendingAmount']:.2f}",
+        r['status'],
+        f"{r['profit']:.2f}"
+    ])
+    return row
+
+def _export_csv_rows(session: Session, query: AnalyticsQuery):
+    # CSV rows (lists) in export order, streamed from the DB
+    if query.group_by != 'none':
+        # Groups are few, aggregate first (no detailed rows needed)
+        for g in _get_analytics_data(session, query, limit=0)['groups']:
+            yield _csv_group_row(g)
+    elif _needs_python(session, query):
+        for r in _get_analytics_data_python(session, query, limit=None)['rows']:
+            yield _csv_detail_row(r, query)
     else:
-        # Detailed Rows
-        headers = ['Date', 'Invoice', 'Party', 'Grain']
-        if query.report_type == 'purchase':
-            headers.append('Bharti')
-        headers.extend(['Bags', 'Total Qty', 'Rate', 'Gross', 'Short', 'Ded', 'Lab', 'Trans', 'Mandi', 'Net Realized', 'Paid', 'Pending', 'Status', 'Profit'])
-        
-        writer.writerow(headers)
-        for r in data['rows']:
-            row = [
-                r['date'].isoformat() if r['date'] else '',
-                r['invoice_number'],
-                r['contactName'],
-                r['grainName']
-            ]
-            if query.report_type == 'purchase':
-                row.append(f"{r['bharti']:.2f}")
-            
-            row.extend([
-                r['bags'],
-                f"{r['quantity_quintal']:.2f}",
-                f"{r['rate_per_quintal']:.2f}",
-                f"{r['baseAmount']:.2f}",
-                f"{r['shortageCost']:.2f}",
-                f"{r['deductionCost']:.2f}",
-                f"{r['labourCostTotal']:.2f}",
-                f"{r['transportCostTotal']:.2f}",
-                f"{(r['mandi_cost'] or 0):.2f}",
-                f"{r['netRealized']:.2f}",
-                f"{r['paidAmount']:.2f}",
-                f"{r['pendingAmount']:.2f}",
-                r['status'],
-                f"{r['profit']:.2f}"
-            ])
+        # yield_per: server-side cursor on Postgres, fetchmany batches on SQLite
+        stmt = _filtered(select(_T, CONTACT_NAME, GRAIN_NAME, WAREHOUSE_NAME, NET_REALIZED, ROW_STATUS, PROFIT), query).order_by(_T.id)
+        result = session.exec(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for t, contact_name, grain_name, warehouse_name, net_realized, status, profit in result:
+            yield _csv_detail_row(_detail_row(t, contact_name, grain_name, warehouse_name, net_realized, status, profit), query)
+            # Rows already written don't need to stay in the identity map
+            session.expunge(t)
+
+def _stream_csv(bind, query: AnalyticsQuery):
+    # Own session: the request's session may be closed before the body has been sent
+    with Session(bind) as session:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(_csv_headers(query))
+
+        for i, row in enumerate(_export_csv_rows(session, query), start=1):
             writer.writerow(row)
-            
-    output.seek(0)
-    
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+        yield buffer.getvalue().encode()
+
+@router.post("/export")
+def export_analytics(query: AnalyticsQuery, session: Session = Depends(get_session)):
+    # Unlimited, streamed: memory stays flat regardless of date range
     filename = f"report_{query.report_type}_{datetime.now().strftime('%Y%m%d')}.csv"
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        _stream_csv(session.get_bind(), query),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
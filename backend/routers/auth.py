@@ -6,10 +6,14 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
 
 from database import get_session
 from models import User
+from cache import ResultCache
 
 router = APIRouter()
 
@@ -23,7 +27,20 @@ SECRET_KEY = os.getenv("SECRET_KEY", "")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day
 
+# Auth cache: username -> (id, role, permissions, token_version). Saves the User query on every request.
+# update_user invalidates immediately in this process; other workers pick changes up after the TTL.
+AUTH_CACHE_MAX_USERS = int(os.getenv("AUTH_CACHE_MAX_USERS", "1000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+# Each entry is stored with size 1, so the byte cap works as an entry cap
+user_cache = ResultCache(AUTH_CACHE_MAX_USERS, AUTH_CACHE_TTL_SECONDS)
+# Bumped on every invalidation so a lookup that read the DB before a user update cannot re-cache stale data
+_auth_epoch = 0
+
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# pbkdf2 is CPU bound (tens of ms per call): run it on its own small pool, never on the event loop,
+# and never in the shared threadpool where a burst of logins would starve DB-bound requests
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Schemas
@@ -57,6 +74,22 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password, hashed_password):
+    return await asyncio.get_running_loop().run_in_executor(hash_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await asyncio.get_running_loop().run_in_executor(hash_executor, get_password_hash, password)
+
+# Blocking DB helpers, called through run_in_threadpool from the async routes
+def _get_user_by_username(session: Session, username: str):
+    return session.exec(select(User).where(User.username == username)).first()
+
+def _save_user(session: Session, user: User):
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -79,20 +112,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
-    user = session.exec(select(User).where(User.username == username)).first()
-    if user is None:
+
+    found, entry = user_cache.get(username)
+    # Versions only go up: a token newer than the cached entry means it is stale (changed on another worker), re-read
+    if not found or entry[3] < token_version:
+        entry = await run_in_threadpool(_load_auth_entry, session, username)
+    if entry is None:
         raise credentials_exception
-        
+    user_id, role, permissions, current_version = entry
+
     # IMMEDIATE LOGOUT CHECK
-    if user.token_version != token_version:
+    if current_version != token_version:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="Session expired/password changed",
             headers={"WWW-Authenticate": "Bearer"}
         )
-        
-    return user
+
+    # Detached copy built from the cache entry (no password hash)
+    return User(id=user_id, username=username, password_hash="", role=role, permissions=permissions, token_version=current_version)
+
+def _load_auth_entry(session: Session, username: str):
+    epoch = _auth_epoch
+    user = _get_user_by_username(session, username)
+    if user is None:
+        return None
+    entry = (user.id, user.role, user.permissions, user.token_version)
+    if epoch == _auth_epoch:
+        user_cache.set(username, entry, 1)
+    return entry
+
+def _invalidate_auth_entry(username: str):
+    global _auth_epoch
+    _auth_epoch += 1
+    user_cache.delete(username)
 
 async def get_current_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
@@ -109,8 +162,8 @@ logger = get_logger("auth")
 @router.post("/auth/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
     logger.info(f"Login attempt for user: {form_data.username}")
-    user = session.exec(select(User).where(User.username == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(_get_user_by_username, session, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         logger.warning(f"Login failed for user: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -146,28 +199,26 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 async def setup_initial_admin(user_data: UserCreate, session: Session = Depends(get_session)):
     logger.info("Setup initial admin requested")
     # Only allow if no users exist
-    users = session.exec(select(User)).all()
-    if len(users) > 0:
+    existing = await run_in_threadpool(lambda: session.exec(select(User)).first())
+    if existing:
         logger.warning("Setup attempted but users already exist")
         raise HTTPException(status_code=400, detail="Setup already complete")
         
     user = User(
         username=user_data.username,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         role="admin",
         permissions='["all"]',
         token_version=1
     )
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    await run_in_threadpool(_save_user, session, user)
     logger.info(f"Admin created via setup: {user.username}")
     return {"message": "Admin created"}
 
 # Admin User Management
 
 @router.get("/users/", response_model=List[UserRead], dependencies=[Depends(get_current_admin)])
-async def list_users(session: Session = Depends(get_session)):
+def list_users(session: Session = Depends(get_session)):
     users = session.exec(select(User)).all()
     res = []
     for u in users:
@@ -187,20 +238,18 @@ async def list_users(session: Session = Depends(get_session)):
 @router.post("/users/", response_model=UserRead, dependencies=[Depends(get_current_admin)])
 async def create_user(user_in: UserCreate, session: Session = Depends(get_session)):
     # Check exists
-    existing = session.exec(select(User).where(User.username == user_in.username)).first()
+    existing = await run_in_threadpool(_get_user_by_username, session, user_in.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
         
     user = User(
         username=user_in.username,
-        password_hash=get_password_hash(user_in.password),
+        password_hash=await get_password_hash_async(user_in.password),
         role=user_in.role,
         permissions=json.dumps(user_in.permissions),
         token_version=1
     )
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    await run_in_threadpool(_save_user, session, user)
     
     return UserRead(
          id=user.id, username=user.username, role=user.role, permissions=user_in.permissions, token_version=1
@@ -208,12 +257,12 @@ async def create_user(user_in: UserCreate, session: Session = Depends(get_sessio
 
 @router.put("/users/{user_id}", dependencies=[Depends(get_current_admin)])
 async def update_user(user_id: int, user_in: UserUpdate, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+    user = await run_in_threadpool(session.get, User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
     if user_in.password:
-        user.password_hash = get_password_hash(user_in.password)
+        user.password_hash = await get_password_hash_async(user_in.password)
         user.token_version += 1 # REVOKE TOKENS
         
     if user_in.role:
@@ -222,6 +271,7 @@ async def update_user(user_id: int, user_in: UserUpdate, session: Session = Depe
     if user_in.permissions is not None:
         user.permissions = json.dumps(user_in.permissions)
         
-    session.add(user)
-    session.commit()
+    await run_in_threadpool(_save_user, session, user)
+    # Revoked tokens / new role take effect on the next request
+    _invalidate_auth_entry(user.username)
     return {"message": "User updated", "new_version": user.token_version}
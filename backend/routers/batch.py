@@ -0,0 +1,104 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from pydantic import BaseModel
+from sqlmodel import Session
+from database import get_session, SHARED_SESSION_KEY
+from typing import Any, List, Optional
+from urllib.parse import urlsplit
+import json
+import os
+from logger import get_logger
+logger = get_logger("batch")
+
+# Upper bound on sub-requests per batch, so one call can't hold a connection for too long
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+# Headers of the batch POST itself, not meaningful for the GET sub-requests
+# (If-None-Match too: it names the batch response, a sub-request would answer an empty 304)
+_SKIP_HEADERS = {b"content-length", b"content-type", b"transfer-encoding", b"if-none-match"}
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+class SubRequest(BaseModel):
+    path: str # Existing GET route with its query string, e.g. "/transactions/page?type=sale"
+    id: Optional[str] = None # Echoed back on the matching response, defaults to path
+    method: str = "GET" # Only GET is supported
+
+class SubResponse(BaseModel):
+    id: str
+    status: int
+    body: Any # Parsed JSON, or text for non-JSON responses
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+class BatchResponse(BaseModel):
+    responses: List[SubResponse] # Same order as the requests
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request, session: Session = Depends(get_session)):
+    """
+    Several GET requests in one round trip, e.g. everything a screen needs on open.
+    Sub-requests run through the normal routing (same validation, headers and auth as a direct call)
+    against this request's DB session, one after another: a Session can't be used by two threads at once,
+    and sharing it gives every sub-request the same connection and snapshot.
+    """
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REQUESTS} requests per batch")
+    for sub in batch.requests:
+        if sub.method.upper() != "GET":
+            raise HTTPException(status_code=400, detail=f"Only GET sub-requests are supported: {sub.method} {sub.path}")
+        if not sub.path.startswith("/") or urlsplit(sub.path).path.rstrip("/") == router.prefix:
+            raise HTTPException(status_code=400, detail=f"Invalid sub-request path: {sub.path}")
+
+    responses = []
+    for sub in batch.requests:
+        responses.append(await _dispatch(request, session, sub))
+    return BatchResponse(responses=responses)
+
+async def _dispatch(request: Request, session: Session, sub: SubRequest) -> SubResponse:
+    url = urlsplit(sub.path)
+    scope = {
+        # Parent scope carries the app, exception handlers and client info; routing fills in the rest
+        **{k: v for k, v in request.scope.items() if k not in ("route", "endpoint", "path_params")},
+        "method": "GET",
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [(k, v) for k, v in request.scope["headers"] if k not in _SKIP_HEADERS],
+        "state": dict(request.scope.get("state", {})),
+        SHARED_SESSION_KEY: session,
+    }
+    status = 500
+    content_type = b""
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    sub_id = sub.id or sub.path
+    try:
+        # Straight to the router: middlewares (metrics, DB instrumentation, logging) already wrap the batch call
+        await request.app.router(scope, receive, send)
+    except StarletteHTTPException as e:
+        # Unknown path / wrong method: the router raises instead of responding when called inside the app
+        return SubResponse(id=sub_id, status=e.status_code, body={"detail": e.detail})
+    except Exception:
+        logger.exception(f"Batch sub-request failed: GET {sub.path}")
+        session.rollback() # Leave the shared session usable for the next sub-request
+        return SubResponse(id=sub_id, status=500, body={"detail": "Internal Server Error"})
+
+    raw = b"".join(chunks)
+    if content_type.startswith(b"application/json") and raw:
+        body = json.loads(raw)
+    else:
+        body = raw.decode(errors="replace")
+    return SubResponse(id=sub_id, status=status, body=body)
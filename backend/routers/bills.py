@@ -0,0 +1,223 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from sqlalchemy import func, case, cast, or_, and_, String, tuple_
+from sqlalchemy.orm import aliased
+from database import get_reader, Reader
+from models import Transaction, PaymentHistory, DispatchInfo, Grain, Contact, Warehouse
+from routers.master_data import BankDetails, get_bank_details
+from routers.transactions import _encode_cursor, _decode_cursor
+from typing import List, Optional
+from datetime import datetime
+
+router = APIRouter(prefix="/bills", tags=["bills"])
+
+# Same tolerance as the payment status update in routers/transactions.py
+PAID_TOLERANCE = 1.0
+
+class BillSummary(BaseModel):
+    bill_id: int # First transaction row of the bill, usable with /bills/{bill_id}/full
+    sale_group_id: Optional[str] = None # Bulk sales only
+    type: str
+    date: datetime
+    invoice_number: Optional[int] = None
+    contact_id: int
+    party_name: Optional[str] = None
+    grain_id: int
+    grain_name: Optional[str] = None
+    row_count: int # Transaction rows in the bill (one per warehouse for bulk sales)
+    total_quantity: float
+    bags: float
+    gross_amount: float # Sum of total_amount
+    net_amount: float # Sales: after shortage and deductions
+    paid_amount: float
+    pending_amount: float
+    status: str # pending, partial, paid
+
+class BillPage(BaseModel):
+    items: List[BillSummary]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page, null on the last page
+
+def _net(t):
+    # Amount expected for one row, same rule as the payment status / dashboard
+    return case(
+        (t.type == 'sale', t.total_amount - func.coalesce(t.shortage_quantity, 0) * t.rate_per_quintal - func.coalesce(t.deduction_amount, 0)),
+        else_=t.total_amount
+    )
+
+def _status(net, paid):
+    return case(
+        (paid >= net - PAID_TOLERANCE, 'paid'),
+        (paid > 0, 'partial'),
+        else_='pending'
+    )
+
+@router.get("", response_model=BillPage)
+async def read_bills(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    trx_type: Optional[str] = Query(None, alias="type"),
+    contact_id: Optional[int] = None,
+    grain_id: Optional[int] = None,
+    status: Optional[str] = Query(None, pattern="^(pending|partial|paid)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    q: Optional[str] = None,
+    read: Reader = Depends(get_reader)
+):
+    """
+    One row per bill (a bulk sale's rows grouped by sale_group_id, every other transaction on its own), newest first.
+    Keyset paginated on the (date, id) of each bill's first row. q matches party name or invoice number.
+    """
+    c_key = _decode_cursor(cursor) if cursor else None
+    return await read(_bill_page, c_key, limit, trx_type, contact_id, grain_id, status, start_date, end_date, q)
+
+def _bill_page(session: Session, c_key, limit, trx_type, contact_id, grain_id, status, start_date, end_date, q) -> BillPage:
+    # 1. The page's bills, as their first rows. Walks the (date, id) index and stops after limit+1 bills
+    other = aliased(Transaction)
+    first_of_group = Transaction.id == select(func.min(other.id)).where(
+        other.sale_group_id == Transaction.sale_group_id
+    ).scalar_subquery()
+
+    stmt = select(
+        Transaction.id, Transaction.date, Transaction.type, Transaction.invoice_number, Transaction.sale_group_id,
+        Transaction.contact_id, Transaction.grain_id, Contact.name.label("party_name"), Grain.name.label("grain_name")
+    ).join(Contact, Contact.id == Transaction.contact_id, isouter=True).join(
+        Grain, Grain.id == Transaction.grain_id, isouter=True
+    ).where(or_(Transaction.sale_group_id.is_(None), first_of_group))
+
+    # Bill-level filters, applied to the first row (shared by every row of a bill)
+    if trx_type:
+        stmt = stmt.where(Transaction.type == trx_type)
+    if contact_id is not None:
+        stmt = stmt.where(Transaction.contact_id == contact_id)
+    if grain_id is not None:
+        stmt = stmt.where(Transaction.grain_id == grain_id)
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    if q:
+        stmt = stmt.where(or_(
+            # Substring match; autoescape makes "%" and "_" in q match literally
+            Contact.name.icontains(q, autoescape=True),
+            cast(Transaction.invoice_number, String).contains(q, autoescape=True)
+        ))
+    if status:
+        # Whole-bill totals for the status, summed over the group only for bulk sales
+        group_net = select(func.sum(_net(other))).where(other.sale_group_id == Transaction.sale_group_id).scalar_subquery()
+        group_paid = select(func.sum(other.amount_paid)).where(other.sale_group_id == Transaction.sale_group_id).scalar_subquery()
+        stmt = stmt.where(_status(
+            case((Transaction.sale_group_id.is_(None), _net(Transaction)), else_=group_net),
+            case((Transaction.sale_group_id.is_(None), Transaction.amount_paid), else_=group_paid)
+        ) == status)
+
+    if c_key:
+        stmt = stmt.where(tuple_(Transaction.date, Transaction.id) < tuple_(*c_key))
+
+    # Fetch one extra bill to know whether another page exists
+    stmt = stmt.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+    firsts = session.exec(stmt).all()
+
+    next_cursor = None
+    if len(firsts) > limit:
+        firsts = firsts[:limit]
+        next_cursor = _encode_cursor(firsts[-1])
+    if not firsts:
+        return BillPage(items=[], next_cursor=None)
+
+    # 2. Totals for just these bills, one GROUP BY
+    bill_key = func.coalesce(Transaction.sale_group_id, cast(Transaction.id, String))
+    group_ids = [f.sale_group_id for f in firsts if f.sale_group_id]
+    single_ids = [f.id for f in firsts if not f.sale_group_id]
+    net = func.sum(_net(Transaction))
+    paid = func.sum(Transaction.amount_paid)
+    totals = session.exec(select(
+        bill_key,
+        func.count(Transaction.id),
+        func.sum(Transaction.quantity_quintal),
+        func.sum(func.coalesce(Transaction.number_of_bags, 0)),
+        func.sum(Transaction.total_amount),
+        net,
+        paid,
+        _status(net, paid)
+    ).where(or_(
+        and_(Transaction.sale_group_id.is_(None), Transaction.id.in_(single_ids)),
+        Transaction.sale_group_id.in_(group_ids)
+    )).group_by(bill_key)).all()
+    totals_by_key = {row[0]: row[1:] for row in totals}
+
+    items = []
+    for f in firsts:
+        row_count, qty, bags, gross, net_amount, paid_amount, bill_status = totals_by_key[f.sale_group_id or str(f.id)]
+        items.append(BillSummary(
+            bill_id=f.id,
+            sale_group_id=f.sale_group_id,
+            type=f.type,
+            date=f.date,
+            invoice_number=f.invoice_number,
+            contact_id=f.contact_id,
+            party_name=f.party_name,
+            grain_id=f.grain_id,
+            grain_name=f.grain_name,
+            row_count=row_count,
+            total_quantity=qty or 0.0,
+            bags=bags or 0.0,
+            gross_amount=gross or 0.0,
+            net_amount=net_amount or 0.0,
+            paid_amount=paid_amount or 0.0,
+            pending_amount=max((net_amount or 0.0) - (paid_amount or 0.0), 0.0),
+            status=bill_status
+        ))
+
+    return BillPage(items=items, next_cursor=next_cursor)
+
+class BillFull(BaseModel):
+    transactions: List[Transaction] # All rows of the bill (one per warehouse for bulk sales)
+    payments: List[PaymentHistory] # Against any row of the bill, newest first
+    dispatch: Optional[DispatchInfo] = None # Sales only
+    grains: List[Grain] # Master rows referenced by the bill
+    contacts: List[Contact]
+    warehouses: List[Warehouse]
+    bank_details: BankDetails
+
+@router.get("/{transaction_id}/full", response_model=BillFull)
+async def get_bill_full(transaction_id: int, read: Reader = Depends(get_reader)):
+    """Everything the bill view shows, in one round trip. transaction_id can be any row of the bill."""
+    bill = await read(_bill_full, transaction_id)
+    if bill is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return bill
+
+def _bill_full(session: Session, transaction_id: int) -> Optional[BillFull]:
+    main_trx = session.get(Transaction, transaction_id)
+    if not main_trx:
+        return None
+
+    if main_trx.sale_group_id:
+        rows = session.exec(select(Transaction).where(
+            Transaction.sale_group_id == main_trx.sale_group_id
+        ).order_by(Transaction.id)).all()
+        dispatch = session.exec(select(DispatchInfo).where(DispatchInfo.sale_group_id == main_trx.sale_group_id)).first()
+    else:
+        rows = [main_trx]
+        dispatch = None
+
+    payments = session.exec(select(PaymentHistory).where(
+        PaymentHistory.transaction_id.in_([t.id for t in rows])
+    ).order_by(PaymentHistory.date.desc())).all()
+
+    # Only the master rows this bill references, one query each
+    grains = session.exec(select(Grain).where(Grain.id.in_({t.grain_id for t in rows}))).all()
+    contacts = session.exec(select(Contact).where(Contact.id.in_({t.contact_id for t in rows}))).all()
+    warehouses = session.exec(select(Warehouse).where(Warehouse.id.in_({t.warehouse_id for t in rows}))).all()
+
+    return BillFull(
+        transactions=rows,
+        payments=payments,
+        dispatch=dispatch,
+        grains=grains,
+        contacts=contacts,
+        warehouses=warehouses,
+        bank_details=get_bank_details()
+    )
@@ -1,73 +1,59 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlmodel import Session, select
-from database import get_session
-from models import Transaction, Grain, Warehouse
+from database import get_reader, Reader
+from models import StockBalance, GrainCost, Grain, Warehouse
 from typing import List, Dict, Any
+from conditional import conditional_json
 from logger import get_logger
 logger = get_logger("inventory")
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
 @router.get("/", response_model=List[Dict[str, Any]])
-def get_inventory_status(session: Session = Depends(get_session)):
-    transactions = session.exec(select(Transaction)).all()
+async def get_inventory_status(request: Request, read: Reader = Depends(get_reader)):
+    # ETag / 304: served without a query until a stock-changing write or a grain/warehouse change
+    return await conditional_json(request, "inventory", lambda: read(_inventory_status))
+
+def _inventory_status(session: Session):
+    # Read maintained balances (one row per grain+warehouse) instead of scanning Transaction
+    balances = session.exec(select(StockBalance)).all()
+    costs = session.exec(select(GrainCost)).all()
     grains = session.exec(select(Grain)).all()
     warehouses = session.exec(select(Warehouse)).all()
 
     # Pre-fetch maps
     grain_map = {g.id: g for g in grains}
     wh_map = {w.id: w for w in warehouses}
+    cost_map = {c.grain_id: c for c in costs}
 
     # Data Structure:
     # {
     #   grain_id: {
-    #       total_bags: 0,
     #       total_quintal: 0,
     #       purchased_value: 0,
     #       purchased_qty: 0,
     #       warehouses: {
-    #           wh_id: { bags: 0, quintal: 0 }
+    #           wh_id: { quintal: 0 }
     #       }
     #   }
     # }
     inventory = {}
 
-    for trx in transactions:
-        gid = trx.grain_id
-        wid = trx.warehouse_id
+    for bal in balances:
+        gid = bal.grain_id
         
         if gid not in inventory:
+            cost = cost_map.get(gid)
             inventory[gid] = {
-                "total_bags": 0,
                 "total_quintal": 0.0,
-                "purchased_value": 0.0,
-                "purchased_qty": 0.0,
+                "purchased_value": cost.purchased_value if cost else 0.0,
+                "purchased_qty": cost.purchased_qty if cost else 0.0,
                 "warehouses": {}
             }
         
-        # Initialize warehouse entry if needed
-        if wid not in inventory[gid]["warehouses"]:
-            inventory[gid]["warehouses"][wid] = {"bags": 0, "quintal": 0.0}
-
-        qty = trx.quantity_quintal
-        # We ignore stored 'number_of_bags' for inventory display as per new requirement
-        # We rely on Net Weight to calculate Bags + Loose dynamically
-
-        if trx.type == 'purchase':
-            inventory[gid]["total_quintal"] += qty
-            
-            # Warehouse specific
-            inventory[gid]["warehouses"][wid]["quintal"] += qty
-            
-            # Avg Price Calc
-            inventory[gid]["purchased_value"] += (qty * trx.rate_per_quintal)
-            inventory[gid]["purchased_qty"] += qty
-            
-        elif trx.type == 'sale':
-            inventory[gid]["total_quintal"] -= qty
-            
-            # Warehouse specific
-            inventory[gid]["warehouses"][wid]["quintal"] -= qty
+        # Bags are derived from Net Weight below (stored 'number_of_bags' is ignored)
+        inventory[gid]["total_quintal"] += bal.quantity_quintal
+        inventory[gid]["warehouses"][bal.warehouse_id] = {"quintal": bal.quantity_quintal}
             
     # Format result
     result = []
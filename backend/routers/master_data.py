@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from database import get_session
+from database import get_session, get_reader, Reader
 from models import Grain, Warehouse, Contact
+from cache import bump_data_version, bump_resource_version
+from conditional import conditional_json
 from typing import List
 import os
 from pydantic import BaseModel
@@ -22,14 +24,16 @@ router = APIRouter(prefix="/master", tags=["master"])
 def create_grain(grain: Grain, session: Session = Depends(get_session)):
     session.add(grain)
     session.commit()
+    bump_data_version()
+    bump_resource_version("grains", "inventory")
     session.refresh(grain)
     logger.info(f"Grain created: {grain.name}")
     return grain
 
 @router.get("/grains", response_model=List[Grain])
-def read_grains(session: Session = Depends(get_session)):
-    grains = session.exec(select(Grain)).all()
-    return grains
+async def read_grains(request: Request, read: Reader = Depends(get_reader)):
+    # ETag / 304: served without a query while no grain changed
+    return await conditional_json(request, "grains", lambda: read(lambda session: session.exec(select(Grain)).all()))
 
 @router.put("/grains/{grain_id}", response_model=Grain)
 def update_grain(grain_id: int, updates: Grain, session: Session = Depends(get_session)):
@@ -44,6 +48,8 @@ def update_grain(grain_id: int, updates: Grain, session: Session = Depends(get_s
     
     session.add(grain)
     session.commit()
+    bump_data_version()
+    bump_resource_version("grains", "inventory") # Inventory shows grain names and bharti
     session.refresh(grain)
     return grain
 
@@ -52,32 +58,40 @@ def update_grain(grain_id: int, updates: Grain, session: Session = Depends(get_s
 def create_warehouse(warehouse: Warehouse, session: Session = Depends(get_session)):
     session.add(warehouse)
     session.commit()
+    bump_data_version()
+    bump_resource_version("warehouses", "inventory")
     session.refresh(warehouse)
     logger.info(f"Warehouse created: {warehouse.name}")
     return warehouse
 
 @router.get("/warehouses", response_model=List[Warehouse])
-def read_warehouses(session: Session = Depends(get_session)):
-    warehouses = session.exec(select(Warehouse)).all()
-    return warehouses
+async def read_warehouses(request: Request, read: Reader = Depends(get_reader)):
+    return await conditional_json(request, "warehouses", lambda: read(lambda session: session.exec(select(Warehouse)).all()))
 
 # CONTACTS
 @router.post("/contacts", response_model=Contact)
 def create_contact(contact: Contact, session: Session = Depends(get_session)):
     session.add(contact)
     session.commit()
+    bump_data_version()
+    bump_resource_version("contacts")
     session.refresh(contact)
     logger.info(f"Contact created: {contact.name} ({contact.type})")
     return contact
 
 @router.get("/contacts", response_model=List[Contact])
-def read_contacts(session: Session = Depends(get_session)):
-    contacts = session.exec(select(Contact)).all()
-    return contacts
+async def read_contacts(request: Request, read: Reader = Depends(get_reader)):
+    return await conditional_json(request, "contacts", lambda: read(lambda session: session.exec(select(Contact)).all()))
 
 # BANK DETAILS
 @router.get("/bank-details", response_model=BankDetails)
-def get_bank_details():
+async def read_bank_details(request: Request):
+    # From the environment: never changes while the process runs
+    async def compute():
+        return get_bank_details()
+    return await conditional_json(request, "bank_details", compute)
+
+def get_bank_details() -> BankDetails:
     return BankDetails(
         bank_name=os.getenv("BANK_NAME", ""),
         account_no=os.getenv("BANK_ACCOUNT_NO", ""),
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, select, func
 from typing import List, Optional
-from database import get_session
+from database import get_reader, Reader
 from models import Transaction, DispatchInfo
 from pydantic import BaseModel
 from datetime import datetime
@@ -26,22 +26,44 @@ class TransportReportItem(BaseModel):
     status: str
 
 @router.get("/transport", response_model=List[TransportReportItem])
-def get_transport_report(session: Session = Depends(get_session)):
+async def get_transport_report(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    transporter: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    read: Reader = Depends(get_reader)
+):
     """
-    Fetch transport report data by joining DispatchInfo with Transactions.
+    Fetch transport report data by joining DispatchInfo with the first Transaction of its bill.
+    One query: filtering, ordering (newest first) and pagination all run in the DB.
     """
-    # Select all dispatch info
-    dispatches = session.exec(select(DispatchInfo)).all()
-    
+    # First transaction in the group (lowest id) carries the bill date / invoice number
+    first_trx_id = select(func.min(Transaction.id)).where(
+        Transaction.sale_group_id == DispatchInfo.sale_group_id
+    ).correlate(DispatchInfo).scalar_subquery()
+
+    stmt = select(DispatchInfo, Transaction.date, Transaction.invoice_number).join(
+        Transaction, Transaction.id == first_trx_id
+    ) # Inner join: orphan dispatch records (no transaction left) are skipped
+
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    if transporter:
+        # Case-insensitive substring; autoescape makes "%" and "_" in the search text match literally
+        stmt = stmt.where(DispatchInfo.transporter_name.icontains(transporter, autoescape=True))
+
+    # Sort by date desc
+    stmt = stmt.order_by(Transaction.date.desc(), DispatchInfo.id.desc()).offset(skip)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
     report_data = []
     
-    for d in dispatches:
-        # Find associated transaction (first one in group to get date/invoice)
-        trx = session.exec(select(Transaction).where(Transaction.sale_group_id == d.sale_group_id)).first()
-        
-        if not trx:
-            continue # Skip orphan dispatch records? Or show with null date? Skip for now.
-            
+    rows = await read(lambda session: session.exec(stmt).all())
+    for d, trx_date, invoice_number in rows:
         deductions = d.shortage_deduction + d.other_deduction
         pending = d.gross_freight - d.advance_paid - d.delivery_paid - deductions
         
@@ -53,8 +75,8 @@ def get_transport_report(session: Session = Depends(get_session)):
             
         item = TransportReportItem(
             dispatch_id=d.id,
-            date=trx.date,
-            invoice_number=trx.invoice_number,
+            date=trx_date,
+            invoice_number=invoice_number,
             transporter_name=d.transporter_name or "Unknown",
             vehicle_number=d.vehicle_number,
             total_weight=d.total_weight,
@@ -69,8 +91,5 @@ def get_transport_report(session: Session = Depends(get_session)):
             status=status
         )
         report_data.append(item)
-        
-    # Sort by date desc
-    report_data.sort(key=lambda x: x.date, reverse=True)
     
     return report_data
@@ -1,59 +1,31 @@
 from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from database import get_session
-from models import Transaction, Grain
+from sqlmodel import Session
+from database import get_reader, Reader
+from ledger import dashboard_totals
 from typing import Dict, Any
+from cache import cached, result_cache
+import db_metrics
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 @router.get("/dashboard", response_model=Dict[str, Any])
-def get_dashboard_stats(session: Session = Depends(get_session)):
-    transactions = session.exec(select(Transaction)).all()
-    inventory_data = {} # grain_id -> {qty, avg_price}
+async def get_dashboard_stats(read: Reader = Depends(get_reader)):
+    # Recomputed only after a write (data version bump) or TTL expiry
+    return await cached("dashboard", {}, lambda: read(_compute_dashboard_stats))
 
-    total_receivable = 0.0
-    total_payable = 0.0
-    
-    # Calculate Receivable/Payable & Inventory Avg Price Data
-    for trx in transactions:
-        pending = trx.total_amount - trx.amount_paid
-        
-        if trx.type == 'sale':
-            # Deduct shortage and other deductions from pending amount logic
-            # Adjusted Expected Amount = (Qty - Shortage) * Rate - Deduction
-            # Note: total_amount stored is Qty * Rate.
-            # So Adjusted = Total - (Shortage * Rate) - Deduction
-            
-            loss_amt = (trx.shortage_quantity * trx.rate_per_quintal) + trx.deduction_amount
-            real_pending = (trx.total_amount - loss_amt) - trx.amount_paid
-            
-            if real_pending > 0: total_receivable += real_pending
-            
-            # Inventory Subtraction
-            gid = trx.grain_id
-            if gid not in inventory_data: inventory_data[gid] = {"qty": 0, "val": 0, "purchased_qty": 0}
-            inventory_data[gid]["qty"] -= trx.quantity_quintal
-            
-        elif trx.type == 'purchase':
-            if pending > 0: total_payable += pending
-            
-            # Inventory Addition + Avg Price Calculation
-            gid = trx.grain_id
-            if gid not in inventory_data: inventory_data[gid] = {"qty": 0, "val": 0, "purchased_qty": 0}
-            
-            inventory_data[gid]["qty"] += trx.quantity_quintal
-            inventory_data[gid]["val"] += trx.total_amount
-            inventory_data[gid]["purchased_qty"] += trx.quantity_quintal
-
-    # Calculate Total Inventory Value
-    total_inventory_value = 0.0
-    for gid, data in inventory_data.items():
-        if data["qty"] > 0 and data["purchased_qty"] > 0:
-            avg_price = data["val"] / data["purchased_qty"]
-            total_inventory_value += (data["qty"] * avg_price)
+@router.get("/cache", response_model=Dict[str, Any])
+def get_cache_stats():
+    # Hit/miss counters and memory use of the result cache
+    return result_cache.stats()
 
+@router.get("/db", response_model=Dict[str, Any])
+def get_db_stats():
+    # Query count, DB time and slowest statements of the most recent requests (newest last)
     return {
-        "total_receivable": total_receivable,
-        "total_payable": total_payable,
-        "total_inventory_value": total_inventory_value
+        "slow_query_ms": db_metrics.SLOW_QUERY_MS,
+        "requests": db_metrics.recent_requests()
     }
+
+def _compute_dashboard_stats(session: Session):
+    # Totals are maintained incrementally by ledger.py on every transaction write (StockBalance per grain/warehouse, GrainCost per grain)
+    return dashboard_totals(session)
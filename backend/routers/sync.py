@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from database import get_reader, Reader
+from models import Grain, Warehouse, Contact, Transaction, PaymentHistory, DispatchInfo
+from typing import Dict, List, Optional
+from datetime import datetime
+import base64
+import changes
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+class SyncResponse(BaseModel):
+    cursor: str # Pass back as ?since= on the next sync
+    reset: bool # True: full snapshot, replace the local replica instead of merging
+    grains: List[Grain]
+    warehouses: List[Warehouse]
+    contacts: List[Contact]
+    transactions: List[Transaction]
+    payments: List[PaymentHistory]
+    dispatches: List[DispatchInfo]
+    deleted: Dict[str, List[int]] # Same keys as above: ids to drop from the replica
+
+def _encode_cursor(since: datetime) -> str:
+    return base64.urlsafe_b64encode(since.isoformat().encode()).decode()
+
+def _decode_cursor(cursor: str) -> datetime:
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("", response_model=SyncResponse)
+async def sync(since: Optional[str] = None, read: Reader = Depends(get_reader)):
+    """
+    Delta sync for app replicas: everything changed or deleted since the cursor.
+    Without a cursor (first sync) the full data set is returned with reset=true.
+    """
+    since_time = _decode_cursor(since) if since else None
+    reset, rows, deleted, next_since = await read(changes.changes_since, since_time)
+    return SyncResponse(cursor=_encode_cursor(next_since), reset=reset, deleted=deleted, **rows)
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select
-from database import get_session
+from database import get_session, get_reader, Reader, begin_write
 from models import Transaction, PaymentHistory, DispatchInfo
 from typing import List, Optional
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
+from ledger import record_transaction, reverse_transaction, record_pending, reverse_pending, lock_balances, ledger_keys, grain_avg_cost, STOCK_FIELDS, PENDING_FIELDS
+from invoices import next_invoice_number
+from cache import bump_data_version, bump_resource_version
+from changes import record_delete
+from serialization import ORJSONResponse, row_dicts
 from logger import get_logger
 logger = get_logger("transactions")
 
@@ -11,6 +16,7 @@ router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 @router.post("/", response_model=Transaction)
 def create_transaction(transaction: Transaction, session: Session = Depends(get_session)):
+    begin_write(session)
     # Calculate total if not provided
     if transaction.total_amount == 0 and transaction.quantity_quintal > 0 and transaction.rate_per_quintal > 0:
         raw_total = transaction.quantity_quintal * transaction.rate_per_quintal
@@ -28,18 +34,24 @@ def create_transaction(transaction: Transaction, session: Session = Depends(get_
              transaction.total_amount = raw_total
              # (Expenses logic omitted for single sale as UI primarily uses Bulk)
 
-    # Auto Increment Invoice Number
-    max_inv = session.exec(select(func.max(Transaction.invoice_number)).where(Transaction.type == transaction.type)).first()
-    transaction.invoice_number = (max_inv or 0) + 1
-        
+    # Lock order on every write path: StockBalance rows, GrainCost rows, then the invoice counter
+    lock_balances(session, *ledger_keys(transaction.type, transaction.grain_id, transaction.warehouse_id))
+    record_transaction(session, transaction)
+
+    # Auto Increment Invoice Number (locked counter row, no max() scan), last so the counter is held briefly
+    transaction.invoice_number = next_invoice_number(session, transaction.type, transaction.date)
     session.add(transaction)
     session.commit()
+    bump_data_version()
+    bump_resource_version("inventory")
     session.refresh(transaction)
     logger.info(f"Transaction created: {transaction.type.upper()} {transaction.invoice_number} (Grain: {transaction.grain_id})")
     return transaction
 
 from pydantic import BaseModel
 import uuid
+import base64
+from datetime import datetime
 
 class WarehouseAllocation(BaseModel):
     warehouse_id: int
@@ -78,60 +90,52 @@ class TransactionUpdate(BaseModel):
 
 @router.post("/bulk_sale", response_model=List[Transaction])
 def create_bulk_sale(sale_data: BulkSaleCreate, session: Session = Depends(get_session)):
+    # SQLite: take the database write lock before the first read, so the stock check
+    # and the inserts below can't interleave with another sale (Postgres locks rows instead)
+    begin_write(session)
+
     sale_group_id = str(uuid.uuid4())
     transactions = []
     
-    # 1. Calculate Average Purchase Cost (for Profit visibility)
-    # Fetch all purchases for this grain
-    purchases = session.exec(select(Transaction).where(Transaction.type == "purchase", Transaction.grain_id == sale_data.grain_id)).all()
-    # Calculate using Cost to Company (Gross Rate)
-    total_p_val = sum(p.quantity_quintal * p.rate_per_quintal for p in purchases)
-    total_p_qty = sum(p.quantity_quintal for p in purchases)
-    avg_cost = total_p_val / total_p_qty if total_p_qty > 0 else 0.0
-    
-    # 2. Auto Increment Invoice Number (One per Group)
-    max_inv = session.exec(select(func.max(Transaction.invoice_number)).where(Transaction.type == "sale")).first()
-    next_inv = (max_inv or 0) + 1
+    # 1. Average Purchase Cost (for Profit visibility)
+    # Read from the running per-grain totals, Cost to Company (Gross Rate)
+    avg_cost = grain_avg_cost(session, sale_data.grain_id)
 
     # Calculate total quantity and bags
     total_bags = sum(alloc.bags for alloc in sale_data.warehouses)
     total_sale_qty = sale_data.total_weight_kg / 100.0 # Convert to Quintal
 
-    transactions = []
-    
-    # 2. Iterate and Create Transactions (Proportional Distribution)
+    # Proportional Distribution: quantity per allocation
+    alloc_qtys = []
+    requested = {} # warehouse_id -> total qty asked from it
     for alloc in sale_data.warehouses:
         # Avoid division by zero
         if total_bags > 0:
             qty_quintal = (alloc.bags / total_bags) * total_sale_qty
         else:
             qty_quintal = 0.0
-        
-        # VALIDATION: Check Stock
-        # Calculate available stock for this Grain + Warehouse
-        p_qty = session.exec(select(func.sum(Transaction.quantity_quintal)).where(
-            Transaction.type == "purchase", 
-            Transaction.grain_id == sale_data.grain_id, 
-            Transaction.warehouse_id == alloc.warehouse_id
-        )).first() or 0.0
-        
-        s_qty = session.exec(select(func.sum(Transaction.quantity_quintal)).where(
-            Transaction.type == "sale", 
-            Transaction.grain_id == sale_data.grain_id, 
-            Transaction.warehouse_id == alloc.warehouse_id
-        )).first() or 0.0
-        
-        available_stock = p_qty - s_qty
-        
+        alloc_qtys.append(qty_quintal)
+        requested[alloc.warehouse_id] = requested.get(alloc.warehouse_id, 0.0) + qty_quintal
+
+    # 2. VALIDATION: Reserve (lock) and check Stock for all warehouses
+    # Held until commit: parallel sales of the same grain+warehouse queue here, others don't.
+    # A sale writes nothing else per grain, so this is the only lock that makes another sale wait
+    available = lock_balances(session, [(sale_data.grain_id, wh_id) for wh_id in requested])
+    for wh_id, qty_quintal in requested.items():
+        available_stock = available[(sale_data.grain_id, wh_id)]
         if qty_quintal > available_stock:
              # Fetch warehouse name for better error
              from models import Warehouse
-             wh_name = session.get(Warehouse, alloc.warehouse_id).name
+             wh_name = session.get(Warehouse, wh_id).name
              raise HTTPException(
                  status_code=400, 
                  detail=f"Insufficient stock in {wh_name}. Available: {available_stock:.2f} Qtl, Requested: {qty_quintal:.2f} Qtl"
              )
 
+    transactions = []
+    
+    # 3. Iterate and Create Transactions
+    for alloc, qty_quintal in zip(sale_data.warehouses, alloc_qtys):
         # Cost Calculations
         labour_total = alloc.bags * sale_data.labour_cost_per_bag
         transport_total = qty_quintal * sale_data.transport_cost_per_qtl
@@ -175,7 +179,6 @@ def create_bulk_sale(sale_data: BulkSaleCreate, session: Session = Depends(get_s
             expenses_total=expenses,
             cost_price_per_quintal=avg_cost,
             payment_status="pending",
-            invoice_number=next_inv, # Assign same invoice number
             notes=f"Bulk Sale: {alloc.bags} bags",
             transporter_name=sale_data.transporter_name,
             destination=sale_data.destination,
@@ -183,11 +186,17 @@ def create_bulk_sale(sale_data: BulkSaleCreate, session: Session = Depends(get_s
             vehicle_number=sale_data.vehicle_number,
             sale_group_id=sale_group_id
         )
-        session.add(transaction)
+        record_transaction(session, transaction)
         transactions.append(transaction)
-        
-    
-    # 3. Create Dispatch Record (Auto-calculated)
+
+    # 4. Auto Increment Invoice Number (One per Group)
+    # Last, after the stock checks: the counter is shared by every sale, so it is held only for the final inserts
+    next_inv = next_invoice_number(session, "sale")
+    for transaction in transactions:
+        transaction.invoice_number = next_inv # Assign same invoice number
+        session.add(transaction)
+
+    # 5. Create Dispatch Record (Auto-calculated)
     # Total Freight = Sum of (Qty * TransportRate)
     total_qty_qtl = sum(t.quantity_quintal for t in transactions)
     # Use the transport rate from the first item (assuming uniform rate for the trip) or from input
@@ -208,6 +217,8 @@ def create_bulk_sale(sale_data: BulkSaleCreate, session: Session = Depends(get_s
     session.add(dispatch_info)
     
     session.commit()
+    bump_data_version()
+    bump_resource_version("inventory")
     # Refresh all to get IDs
     for t in transactions:
         session.refresh(t)
@@ -248,12 +259,13 @@ def update_dispatch_info(dispatch_id: int, updates: DispatchInfo, session: Sessi
         )
 
     for key, value in dispatch_data.items():
-        # Avoid overwriting ID or Group ID if passed
-        if key not in ['id', 'sale_group_id']:
+        # Avoid overwriting ID, Group ID or sync timestamp if passed
+        if key not in ['id', 'sale_group_id', 'updated_at']:
             setattr(dispatch, key, value)
         
     session.add(dispatch)
     session.commit()
+    bump_data_version()
     session.refresh(dispatch)
     return dispatch
 
@@ -272,22 +284,101 @@ def get_transaction_bill(transaction_id: int, session: Session = Depends(get_ses
     # 3. Otherwise return just this one
     return [main_trx]
 
+# Lean path for the large lists: plain column rows, not Transaction objects (see serialization.row_dicts)
+TRANSACTION_COLUMNS = tuple(Transaction.__table__.columns)
+
 @router.get("/", response_model=List[Transaction])
-def read_transactions(skip: int = 0, limit: int = 2000, session: Session = Depends(get_session)):
-    transactions = session.exec(select(Transaction).offset(skip).limit(limit)).all()
-    return transactions
+async def read_transactions(skip: int = 0, limit: int = 2000, read: Reader = Depends(get_reader)):
+    stmt = select(*TRANSACTION_COLUMNS).offset(skip).limit(limit)
+    rows = await read(lambda session: session.exec(stmt).all())
+    # Returned as a Response, so response_model only documents the shape: DB rows need no re-validation
+    return ORJSONResponse(row_dicts(rows))
+
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page, null on the last page
+
+def _encode_cursor(trx: Transaction) -> str:
+    raw = f"{trx.date.isoformat()}|{trx.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, id_str = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_str), int(id_str)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/page", response_model=TransactionPage)
+async def read_transactions_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    trx_type: Optional[str] = Query(None, alias="type"),
+    grain_id: Optional[int] = None,
+    contact_id: Optional[int] = None,
+    warehouse_id: Optional[int] = None,
+    payment_status: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    sale_group_id: Optional[str] = None,
+    read: Reader = Depends(get_reader)
+):
+    """
+    Newest first, keyset paginated on (date, id).
+    Each page seeks past the cursor instead of OFFSET-skipping rows, so page 50 costs the same as page 1.
+    """
+    stmt = select(*TRANSACTION_COLUMNS)
+
+    # Server-side filters
+    if trx_type:
+        stmt = stmt.where(Transaction.type == trx_type)
+    if grain_id is not None:
+        stmt = stmt.where(Transaction.grain_id == grain_id)
+    if contact_id is not None:
+        stmt = stmt.where(Transaction.contact_id == contact_id)
+    if warehouse_id is not None:
+        stmt = stmt.where(Transaction.warehouse_id == warehouse_id)
+    if payment_status:
+        stmt = stmt.where(Transaction.payment_status == payment_status)
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    if sale_group_id:
+        stmt = stmt.where(Transaction.sale_group_id == sale_group_id)
+
+    if cursor:
+        c_date, c_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Transaction.date, Transaction.id) < tuple_(c_date, c_id))
+
+    # Fetch one extra row to know whether another page exists
+    stmt = stmt.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+    rows = await read(lambda session: session.exec(stmt).all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+
+    return ORJSONResponse({"items": row_dicts(rows), "next_cursor": next_cursor})
 
 @router.delete("/{transaction_id}")
 def delete_transaction(transaction_id: int, session: Session = Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
+    begin_write(session)
+    transaction = session.get(Transaction, transaction_id, with_for_update=True)
     if not transaction:
         return {"error": "Transaction not found"}
+    lock_balances(session, *ledger_keys(transaction.type, transaction.grain_id, transaction.warehouse_id))
     
     # Cascade Delete: Remove associated payment history first
     payments = session.exec(select(PaymentHistory).where(PaymentHistory.transaction_id == transaction_id)).all()
     for p in payments:
+        record_delete(session, p)
         session.delete(p)
 
+    reverse_transaction(session, transaction)
+    record_delete(session, transaction)
     session.delete(transaction)
     
     # Check if this was the last transaction in a group, if so, delete the Dispatch Info
@@ -302,10 +393,13 @@ def delete_transaction(transaction_id: int, session: Session = Depends(get_sessi
             # Delete Dispatch Info
             dispatch = session.exec(select(DispatchInfo).where(DispatchInfo.sale_group_id == transaction.sale_group_id)).first()
             if dispatch:
+                record_delete(session, dispatch)
                 session.delete(dispatch)
                 logger.info(f"Dispatch Info deleted for group {transaction.sale_group_id}")
 
     session.commit()
+    bump_data_version()
+    bump_resource_version("inventory")
     logger.info(f"Transaction deleted: {transaction_id}")
     return {"ok": True}
 
@@ -314,7 +408,8 @@ class PaymentUpdate(BaseModel):
 
 @router.post("/{transaction_id}/payment")
 def update_payment(transaction_id: int, payment: PaymentUpdate, session: Session = Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
+    begin_write(session)
+    transaction = session.get(Transaction, transaction_id, with_for_update=True)
     if not transaction:
         return {"error": "Transaction not found"}
     
@@ -338,8 +433,11 @@ def update_payment(transaction_id: int, payment: PaymentUpdate, session: Session
 
     session.add(history)
 
-    # Update Transaction Total
+    # Update Transaction Total (dashboard pending moves with it, same DB transaction)
+    lock_balances(session, [(transaction.grain_id, transaction.warehouse_id)])
+    reverse_pending(session, transaction)
     transaction.amount_paid += payment.amount
+    record_pending(session, transaction)
     
     # Update Status
     # Calculate Net Amount (Post Deductions)
@@ -357,6 +455,7 @@ def update_payment(transaction_id: int, payment: PaymentUpdate, session: Session
         
     session.add(transaction)
     session.commit()
+    bump_data_version()
     session.refresh(transaction)
     logger.info(f"Payment recorded: {payment.amount} for Trx {transaction_id}")
     return transaction
@@ -393,13 +492,37 @@ class TransactionUpdate(BaseModel):
 
 @router.put("/{transaction_id}", response_model=Transaction)
 def update_transaction(transaction_id: int, updates: TransactionUpdate, session: Session = Depends(get_session)):
-    transaction = session.get(Transaction, transaction_id)
+    begin_write(session)
+    transaction = session.get(Transaction, transaction_id, with_for_update=True)
     if not transaction:
         return {"error": "Transaction not found"}
     
     update_data = updates.dict(exclude_unset=True)
+    # Move stock only if a quantity/location field actually changes
+    stock_changed = bool(STOCK_FIELDS & update_data.keys())
+    # Payment/deduction edits only move the dashboard receivable/payable
+    pending_changed = not stock_changed and bool(PENDING_FIELDS & update_data.keys())
+    if stock_changed:
+        # Old and new grain+warehouse in one sorted pass, never "old row, GrainCost, new row"
+        old_keys = ledger_keys(transaction.type, transaction.grain_id, transaction.warehouse_id)
+        new_keys = ledger_keys(
+            update_data.get("type", transaction.type),
+            update_data.get("grain_id", transaction.grain_id),
+            update_data.get("warehouse_id", transaction.warehouse_id)
+        )
+        lock_balances(session, old_keys[0] + new_keys[0], old_keys[1] + new_keys[1])
+        reverse_transaction(session, transaction)
+    elif pending_changed:
+        lock_balances(session, [(transaction.grain_id, transaction.warehouse_id)])
+        reverse_pending(session, transaction)
+
     for key, value in update_data.items():
         setattr(transaction, key, value)
+
+    if stock_changed:
+        record_transaction(session, transaction)
+    elif pending_changed:
+        record_pending(session, transaction)
     
     # Re-calculate Payment Status if amounts changed
     shortage_val = (transaction.shortage_quantity or 0) * transaction.rate_per_quintal
@@ -415,6 +538,9 @@ def update_transaction(transaction_id: int, updates: TransactionUpdate, session:
         
     session.add(transaction)
     session.commit()
+    bump_data_version()
+    if stock_changed:
+        bump_resource_version("inventory")
     session.refresh(transaction)
     
     # NEW: Sync Dispatch Info if Quantity or Transport Cost changed
@@ -437,6 +563,7 @@ def update_transaction(transaction_id: int, updates: TransactionUpdate, session:
             
             session.add(dispatch)
             session.commit()
+            bump_data_version()
             logger.info(f"Dispatch Info updated for group {transaction.sale_group_id}")
 
     logger.info(f"Transaction updated: {transaction_id}")
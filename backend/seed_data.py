@@ -2,7 +2,10 @@ import random
 from datetime import datetime, timedelta
 from sqlmodel import Session, select, func, delete
 from database import engine
-from models import Grain, Contact, Warehouse, Transaction, PaymentHistory, DispatchInfo
+from models import Grain, Contact, Warehouse, Transaction, PaymentHistory, DispatchInfo, StockBalance, GrainCost, InvoiceSequence
+from invoices import next_invoice_number
+import ledger
+import changes
 
 def create_random_date():
     start_date = datetime.now() - timedelta(days=365)
@@ -11,9 +14,15 @@ def create_random_date():
 
 def clear_existing_data(session: Session):
     print("Clearing existing transaction data...")
+    # App replicas drop the wiped rows on their next sync
+    for model in (PaymentHistory, DispatchInfo, Transaction):
+        changes.record_delete_all(session, model)
     session.exec(delete(PaymentHistory))
     session.exec(delete(DispatchInfo))
     session.exec(delete(Transaction))
+    session.exec(delete(StockBalance))
+    session.exec(delete(GrainCost))
+    session.exec(delete(InvoiceSequence)) # Numbering restarts with the data
     session.commit()
     print("Data cleared.")
 
@@ -36,14 +45,6 @@ def seed_data():
         # Track Inventory: {(grain_id, warehouse_id): quantity_quintal}
         inventory = {}
 
-        # Track Invoice Numbers
-        # Fetch max current (should be 0 after clear, but good practice)
-        max_p_inv = session.exec(select(func.max(Transaction.invoice_number)).where(Transaction.type == "purchase")).first() or 0
-        max_s_inv = session.exec(select(func.max(Transaction.invoice_number)).where(Transaction.type == "sale")).first() or 0
-        
-        current_p_inv = max_p_inv
-        current_s_inv = max_s_inv
-
         # 1. Purchases
         print("Generating 500 Purchases...")
         for _ in range(500):
@@ -67,12 +68,12 @@ def seed_data():
             if status == "paid": paid = total_amount
             elif status == "partial": paid = round(total_amount / 2, 2)
             
-            current_p_inv += 1
+            trx_date = create_random_date()
 
             t = Transaction(
-                date=create_random_date(),
+                date=trx_date,
                 type="purchase",
-                invoice_number=current_p_inv,
+                invoice_number=next_invoice_number(session, "purchase", trx_date),
                 grain_id=grain.id,
                 contact_id=contact.id,
                 warehouse_id=warehouse.id,
@@ -120,7 +121,7 @@ def seed_data():
             shortage_qty = round(random.uniform(0, 0.5), 2) if random.random() > 0.8 else 0 # Small shortage
             deduction_amt = round(random.uniform(0, 500), 2) if random.random() > 0.9 else 0
             
-            current_s_inv += 1
+            trx_date = create_random_date()
 
             # Costs
             transport_rate = round(random.uniform(20, 100), 2)
@@ -133,9 +134,9 @@ def seed_data():
             elif status == "partial": paid = round(net_payable / 2, 2)
 
             t = Transaction(
-                date=create_random_date(),
+                date=trx_date,
                 type="sale",
-                invoice_number=current_s_inv,
+                invoice_number=next_invoice_number(session, "sale", trx_date),
                 grain_id=grain.id,
                 contact_id=contact.id,
                 warehouse_id=warehouse.id,
@@ -167,6 +168,9 @@ def seed_data():
             if qty < 0:
                  print(f"WARNING: Negative Inventory detected for Grain {g_id}, Wh {w_id}: {qty}")
 
+        print("Rebuilding stock balances...")
+        ledger.rebuild(session)
+
         session.commit()
         print("Success! Database re-seeded.")
 
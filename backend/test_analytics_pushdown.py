@@ -0,0 +1,99 @@
+import random
+from datetime import datetime, timedelta
+from itertools import product
+from sqlmodel import Session
+
+from models import Grain, Contact, Warehouse, Transaction
+from routers.analytics import AnalyticsQuery, _get_analytics_data_sql, _get_analytics_data_python
+
+TOLERANCE = 1e-6 # Relative: SQL SUM and Python += may add floats in a different order
+
+def _seed(session: Session, rng: random.Random):
+    grains = [Grain(name=n) for n in ("Wheat", "Rice", "Chana")]
+    contacts = [Contact(name=n, type=t) for n, t in (
+        ("Ram Kumar", "supplier"), ("ABC Traders", "buyer"), ("Shyam & Sons", "buyer"), ("100% Agro", "buyer")
+    )]
+    warehouses = [Warehouse(name=n) for n in ("Main Godown", "Godown 2")]
+    session.add_all(grains + contacts + warehouses)
+    session.flush()
+
+    start = datetime(2024, 1, 1)
+    for i in range(400):
+        trx_type = rng.choice(["purchase", "sale"])
+        qty = round(rng.uniform(1, 200), 2)
+        rate = round(rng.uniform(2000, 5000), 2)
+        total = round(qty * rate, 2)
+        bags = rng.choice([None, 0, int(qty * 2)])
+        paid = rng.choice([0.0, total, round(total / 2, 2), total - 0.5])
+        session.add(Transaction(
+            date=start + timedelta(days=rng.randrange(365), minutes=i),
+            type=trx_type,
+            invoice_number=rng.choice([None, i + 1, i + 1, i + 1]),
+            grain_id=rng.choice(grains).id,
+            contact_id=rng.choice(contacts).id,
+            warehouse_id=rng.choice(warehouses).id,
+            quantity_quintal=qty,
+            number_of_bags=bags,
+            rate_per_quintal=rate,
+            total_amount=total,
+            amount_paid=paid,
+            cost_price_per_quintal=round(rng.uniform(1800, 4800), 2),
+            shortage_quantity=rng.choice([0.0, 0.0, round(rng.uniform(0, 0.5), 2)]),
+            deduction_amount=rng.choice([0.0, 0.0, round(rng.uniform(0, 500), 2)]),
+            labour_cost_per_bag=rng.choice([0.0, 3.0]),
+            transport_cost_per_qtl=rng.choice([0.0, 50.0]),
+            mandi_cost=rng.choice([0.0, 9000.0 / 3])
+        ))
+    session.commit()
+
+def _close(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) <= TOLERANCE * max(1.0, abs(a), abs(b))
+    return a == b
+
+def _assert_same(expected, actual, label):
+    assert expected.keys() == actual.keys(), label
+    for field in expected:
+        assert _close(expected[field], actual[field]), f"{label}: {field} {expected[field]!r} != {actual[field]!r}"
+
+def _assert_parity(expected, actual, label):
+    _assert_same(expected["summary"], actual["summary"], f"{label} summary")
+
+    # The Python version follows the DB scan order (plan dependent), so compare order-independently
+    exp_groups = {g["name"]: g for g in expected["groups"]}
+    act_groups = {g["name"]: g for g in actual["groups"]}
+    assert exp_groups.keys() == act_groups.keys(), label
+    for name, exp_g in exp_groups.items():
+        _assert_same(exp_g, act_groups[name], f"{label} group {name}")
+
+    row_key = lambda r: (r["date"], r["invoice_number"] or 0, r["quantity_quintal"])
+    exp_rows = sorted(expected["rows"], key=row_key)
+    act_rows = sorted(actual["rows"], key=row_key)
+    assert len(exp_rows) == len(act_rows), label
+    for exp_r, act_r in zip(exp_rows, act_rows):
+        _assert_same(exp_r, act_r, f"{label} row")
+
+def test_sql_pushdown_matches_python(engine):
+    with Session(engine) as session:
+        _seed(session, random.Random(42))
+
+        date_ranges = [(None, None), (datetime(2024, 3, 1), datetime(2024, 9, 30))]
+        searches = [None, "ram", "TRADERS", "1", "%", "zzz"]
+        for report_type, group_by, status, (start, end), search in product(
+            ["profit", "purchase", "sale", "transport"],
+            ["none", "grain", "party", "warehouse"],
+            ["all", "paid", "pending", "partial"],
+            date_ranges,
+            searches
+        ):
+            query = AnalyticsQuery(
+                report_type=report_type, group_by=group_by, status=status,
+                start_date=start, end_date=end, search_query=search
+            )
+            label = query.model_dump_json()
+            # No limit: the Python version does not order rows, so a limited slice could differ
+            _assert_parity(
+                _get_analytics_data_python(session, query, limit=None),
+                _get_analytics_data_sql(session, query, limit=None),
+                label
+            )
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import event
+
+import database
+from conftest import seed_masters, purchase
+
+READS = ["/inventory/", "/stats/dashboard", "/transactions/page?limit=2"]
+
+@pytest.mark.parametrize("app_db", [False, True], indirect=True)
+def test_hot_reads_through_either_reader(app_db):
+    client, engine = app_db
+    (grain,), (wh_a, wh_b), (party,) = seed_masters(client, warehouses=("A", "B"))
+    purchase(client, grain, party, wh_a, 30, total_amount=60000)
+    purchase(client, grain, party, wh_b, 20, total_amount=40000, amount_paid=10000)
+    res = client.post("/transactions/bulk_sale", json={
+        "contact_id": party["id"], "grain_id": grain["id"], "rate_per_quintal": 2500, "total_weight_kg": 1000,
+        "mandi_cost": 0, "warehouses": [{"warehouse_id": wh_a["id"], "bags": 10}]
+    })
+    assert res.status_code == 200, res.text
+
+    # Which engine served the reads: the async one only when the fixture switched it on
+    checkouts = {"async": 0}
+    if database.async_engine is not None:
+        @event.listens_for(database.async_engine.sync_engine, "checkout")
+        def _count(*args):
+            checkouts["async"] += 1
+
+    inventory, dashboard, page = (client.get(path) for path in READS)
+    for res in (inventory, dashboard, page):
+        assert res.status_code == 200, res.text
+    assert checkouts["async"] == (len(READS) if database.async_engine is not None else 0)
+
+    (wheat,) = inventory.json()
+    assert wheat["total_quintal"] == pytest.approx(40)
+    assert {w["name"]: w["quintal"] for w in wheat["warehouses"]} == pytest.approx({"A": 20, "B": 20})
+
+    assert dashboard.json() == pytest.approx({
+        "total_receivable": 25000, "total_payable": 90000, "total_inventory_value": 40 * 2000
+    })
+
+    items = page.json()["items"]
+    assert [t["type"] for t in items] == ["sale", "purchase"]
+    assert page.json()["next_cursor"]
@@ -0,0 +1,88 @@
+import json
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+
+from models import User
+from routers.auth import create_access_token, get_current_user, user_cache
+
+def _bearer(username, version):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username, 'v': version})}"}
+
+def test_cached_user_follows_updates_immediately(app_db):
+    client, engine = app_db
+    with Session(engine) as session:
+        session.add(User(username="boss", password_hash="boss-hash", role="admin", permissions='["all"]', token_version=1))
+        session.add(User(username="clerk", password_hash="clerk-hash", role="worker", permissions='["sales"]', token_version=1))
+        session.commit()
+        clerk_id = session.exec(select(User.id).where(User.username == "clerk")).one()
+
+    def current_user(headers):
+        with Session(engine) as session:
+            return asyncio.run(get_current_user(headers["Authorization"][7:], session))
+
+    boss, clerk = _bearer("boss", 1), _bearer("clerk", 1)
+
+    # Role change: the cached worker entry is dropped, the next request sees the admin role
+    assert client.get("/users/", headers=clerk).status_code == 403
+    assert client.put(f"/users/{clerk_id}", json={"role": "admin"}, headers=boss).status_code == 200
+    assert client.get("/users/", headers=clerk).status_code == 200
+
+    # Permission change
+    assert json.loads(current_user(clerk).permissions) == ["sales"]
+    assert client.put(f"/users/{clerk_id}", json={"permissions": ["sales", "reports"]}, headers=boss).status_code == 200
+    assert json.loads(current_user(clerk).permissions) == ["sales", "reports"]
+
+    # Neither the cache entry nor the returned user carry the password hash
+    user = current_user(clerk)
+    assert user.password_hash == ""
+    found, entry = user_cache.get("clerk")
+    assert found and "clerk-hash" not in entry
+
+    # Password change bumps token_version: tokens issued before it stop working at once
+    res = client.put(f"/users/{clerk_id}", json={"password": "new-secret"}, headers=boss)
+    assert res.status_code == 200 and res.json()["new_version"] == 2
+    assert client.get("/users/", headers=clerk).status_code == 401
+    assert client.get("/users/", headers=_bearer("clerk", 2)).status_code == 200
+
+    # Bumped by another worker (no local invalidation): a token newer than the cache entry re-reads the DB
+    with Session(engine) as session:
+        row = session.get(User, clerk_id)
+        row.token_version = 3
+        session.add(row)
+        session.commit()
+    assert client.get("/users/", headers=_bearer("clerk", 3)).status_code == 200
+    assert client.get("/users/", headers=_bearer("clerk", 2)).status_code == 401
+
+def test_login_setup_and_user_management_through_hash_executor(app_db):
+    client, engine = app_db
+
+    def login(username, password):
+        return client.post("/auth/login", data={"username": username, "password": password})
+
+    # Register the first admin: the password is hashed on the auth pool
+    assert client.post("/auth/setup", json={"username": "owner", "password": "owner-pw"}).status_code == 200
+    assert client.post("/auth/setup", json={"username": "other", "password": "x"}).status_code == 400
+    with Session(engine) as session:
+        stored = session.exec(select(User).where(User.username == "owner")).one().password_hash
+    assert stored and stored != "owner-pw"
+
+    res = login("owner", "owner-pw")
+    assert res.status_code == 200, res.text
+    assert res.json()["user"]["role"] == "admin" and res.json()["user"]["permissions"] == ["all"]
+    owner = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    assert login("owner", "wrong").status_code == 401
+    assert login("nobody", "owner-pw").status_code == 401
+
+    res = client.post("/users/", json={"username": "clerk", "password": "clerk-pw", "permissions": ["sales"]}, headers=owner)
+    assert res.status_code == 200, res.text
+    assert client.post("/users/", json={"username": "clerk", "password": "x"}, headers=owner).status_code == 400
+
+    users = client.get("/users/", headers=owner).json()
+    assert sorted(u["username"] for u in users) == ["clerk", "owner"]
+    assert next(u for u in users if u["username"] == "clerk")["permissions"] == ["sales"]
+
+    # Several logins at once queue on the small hash pool, every one still gets its answer
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(lambda i: login("clerk", "clerk-pw" if i % 2 else "bad").status_code, range(8)))
+    assert codes == [401, 200] * 4
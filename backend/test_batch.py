@@ -0,0 +1,72 @@
+from sqlalchemy import event
+from sqlmodel import select
+
+import routers.bills
+from models import Transaction
+from conftest import seed_masters, purchase
+
+def _count_db_use(engine):
+    # Pool checkouts and DB transactions started on the engine
+    counts = {"checkout": 0, "begin": 0}
+    event.listen(engine, "checkout", lambda *args: counts.__setitem__("checkout", counts["checkout"] + 1))
+    event.listen(engine, "begin", lambda *args: counts.__setitem__("begin", counts["begin"] + 1))
+    return counts
+
+def test_bill_full_and_batch(app_db, monkeypatch):
+    client, engine = app_db
+    (grain, _), warehouses, (party,) = seed_masters(client, grains=("Wheat", "Rice"), warehouses=("A", "B", "C"))
+    for wh in warehouses[:2]:
+        purchase(client, grain, party, wh, 100)
+    sale = client.post("/transactions/bulk_sale", json={
+        "contact_id": party["id"], "grain_id": grain["id"], "rate_per_quintal": 2500, "total_weight_kg": 3000,
+        "warehouses": [{"warehouse_id": warehouses[0]["id"], "bags": 30}, {"warehouse_id": warehouses[1]["id"], "bags": 20}]
+    }).json()
+    client.post(f"/transactions/{sale[0]['id']}/payment", json={"amount": 100})
+
+    # Any row of the bill gives the whole bill, with only the master rows it references
+    full = client.get(f"/bills/{sale[1]['id']}/full").json()
+    assert sorted(t["id"] for t in full["transactions"]) == sorted(t["id"] for t in sale)
+    assert len(full["payments"]) == 1
+    assert full["dispatch"]["sale_group_id"] == sale[0]["sale_group_id"]
+    assert [g["id"] for g in full["grains"]] == [grain["id"]]
+    assert sorted(w["id"] for w in full["warehouses"]) == [warehouses[0]["id"], warehouses[1]["id"]]
+    assert "bank_name" in full["bank_details"]
+    assert client.get("/bills/999/full").status_code == 404
+
+    counts = _count_db_use(engine)
+    res = client.post("/batch", json={"requests": [
+        {"id": "grains", "path": "/master/grains"},
+        {"id": "page", "path": "/transactions/page?type=sale&limit=1"},
+        {"id": "bill", "path": f"/bills/{sale[0]['id']}/full"},
+        {"id": "dispatch", "path": "/transactions/dispatch/missing"},
+        {"id": "unknown", "path": "/no-such-route"},
+    ]})
+    assert res.status_code == 200, res.text
+    by_id = {r["id"]: r for r in res.json()["responses"]}
+    assert by_id["grains"]["status"] == 200 and by_id["grains"]["body"] == client.get("/master/grains").json()
+    assert len(by_id["page"]["body"]["items"]) == 1
+    assert by_id["bill"]["body"] == full
+    assert by_id["dispatch"]["status"] == 404
+    assert by_id["unknown"]["status"] == 404
+    # Every sub-request ran on the batch's one session: one pooled connection, one DB transaction
+    assert counts == {"checkout": 1, "begin": 1}, counts
+
+    # A sub-request that fails mid-query gets a 500 of its own; the shared session is rolled back
+    # and the sub-requests after it still run (in a new transaction on the same session)
+    def broken_bill(session, transaction_id):
+        session.exec(select(Transaction)).first()
+        raise RuntimeError("boom")
+    monkeypatch.setattr(routers.bills, "_bill_full", broken_bill)
+    counts.update(checkout=0, begin=0)
+    res = client.post("/batch", json={"requests": [
+        {"id": "page", "path": "/transactions/page?type=sale&limit=1"},
+        {"id": "bill", "path": f"/bills/{sale[0]['id']}/full"},
+        {"id": "after", "path": "/transactions/page?type=purchase&limit=5"},
+    ]})
+    assert res.status_code == 200, res.text
+    assert [r["status"] for r in res.json()["responses"]] == [200, 500, 200]
+    assert len(res.json()["responses"][2]["body"]["items"]) == 2
+    assert counts["begin"] == 2, counts
+
+    assert client.post("/batch", json={"requests": [{"path": "/master/grains", "method": "POST"}]}).status_code == 400
+    assert client.post("/batch", json={"requests": [{"path": "/batch"}]}).status_code == 400
@@ -0,0 +1,87 @@
+import random
+from sqlmodel import Session, select
+
+from models import Transaction
+from conftest import seed_masters, purchase
+
+TOLERANCE = 0.01
+
+def _expected_bills(transactions):
+    # What the app computed client-side: group by sale_group_id, every other row is its own bill
+    bills = {}
+    for trx in transactions:
+        bills.setdefault(trx.sale_group_id or trx.id, []).append(trx)
+
+    expected = {}
+    for rows in bills.values():
+        net = sum(
+            t.total_amount - (t.shortage_quantity * t.rate_per_quintal + t.deduction_amount) if t.type == 'sale' else t.total_amount
+            for t in rows
+        )
+        paid = sum(t.amount_paid for t in rows)
+        status = "paid" if paid >= net - 1.0 else "partial" if paid > 0 else "pending"
+        expected[min(t.id for t in rows)] = {
+            "row_count": len(rows),
+            "total_quantity": sum(t.quantity_quintal for t in rows),
+            "gross_amount": sum(t.total_amount for t in rows),
+            "net_amount": net,
+            "paid_amount": paid,
+            "status": status
+        }
+    return expected
+
+def test_bills_are_aggregated_per_bill_and_paginated(app_db):
+    rng = random.Random(3)
+    client, engine = app_db
+    (grain,), warehouses, parties = seed_masters(client, warehouses=("A", "B"), contacts=(("Ramesh", "buyer"), ("Suresh", "buyer")))
+
+    for _ in range(40):
+        if rng.random() < 0.5:
+            res = client.post("/transactions/", json={
+                "type": "purchase", "grain_id": grain["id"], "contact_id": rng.choice(parties)["id"],
+                "warehouse_id": rng.choice(warehouses)["id"], "quantity_quintal": 50, "number_of_bags": 80,
+                "rate_per_quintal": 2000, "total_amount": 0
+            })
+        else:
+            res = client.post("/transactions/bulk_sale", json={
+                "contact_id": rng.choice(parties)["id"], "grain_id": grain["id"], "rate_per_quintal": 2500,
+                "total_weight_kg": 1000,
+                "warehouses": [{"warehouse_id": w["id"], "bags": 10} for w in warehouses]
+            })
+        if res.status_code == 200 and rng.random() < 0.5:
+            first = res.json()[0] if isinstance(res.json(), list) else res.json()
+            client.post(f"/transactions/{first['id']}/payment", json={"amount": rng.choice([1000.0, 200000.0])})
+
+    # Walk every page
+    bills, cursor = [], None
+    while True:
+        page = client.get("/bills", params={"limit": 7, **({"cursor": cursor} if cursor else {})}).json()
+        bills += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    with Session(engine) as session:
+        expected = _expected_bills(session.exec(select(Transaction)).all())
+
+    assert sorted(b["bill_id"] for b in bills) == sorted(expected)
+    assert [(b["date"], b["bill_id"]) for b in bills] == sorted(((b["date"], b["bill_id"]) for b in bills), reverse=True)
+    for bill in bills:
+        for field, value in expected[bill["bill_id"]].items():
+            if isinstance(value, float):
+                assert abs(bill[field] - value) <= TOLERANCE, (field, bill[field], value)
+            else:
+                assert bill[field] == value, (field, bill[field], value)
+
+    for status in ("pending", "partial", "paid"):
+        items = client.get("/bills", params={"status": status, "limit": 500}).json()["items"]
+        assert sorted(b["bill_id"] for b in items) == sorted(k for k, v in expected.items() if v["status"] == status)
+
+    sales_for_ramesh = client.get("/bills", params={"type": "sale", "q": "rame", "limit": 500}).json()["items"]
+    assert len(sales_for_ramesh) == sum(1 for b in bills if b["type"] == "sale" and b["party_name"] == "Ramesh")
+
+    # "%" and "_" in q match literally, not as wildcards
+    agro = client.post("/master/contacts", json={"name": "100% Agro", "type": "supplier"}).json()
+    agro_bill = purchase(client, grain, agro, warehouses[0], 5)
+    assert [b["bill_id"] for b in client.get("/bills", params={"q": "%", "limit": 500}).json()["items"]] == [agro_bill["id"]]
+    assert client.get("/bills", params={"q": "_", "limit": 500}).json()["items"] == []
@@ -0,0 +1,158 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select, func
+
+from models import Transaction, StockBalance, GrainCost
+import ledger
+from conftest import sqlite_engine, seed_masters, purchase
+
+# Set TEST_DATABASE_URL to a scratch Postgres DB to exercise SELECT ... FOR UPDATE.
+# Default: a throwaway SQLite file (BEGIN IMMEDIATE path).
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+PARALLEL_SALES = 40
+SALE_KG = 1000 # 10 Qtl per truck
+STOCK_QTL = 105.0 # Room for 10 trucks, not 11
+LOCK_WAIT_SECONDS = 10 # Upper bound for a sale that must not be blocked
+
+@pytest.fixture
+def engine(tmp_path):
+    if TEST_DATABASE_URL:
+        engine = create_engine(TEST_DATABASE_URL, pool_size=PARALLEL_SALES, max_overflow=0)
+    else:
+        engine = sqlite_engine(tmp_path / "concurrency.db")
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+def test_parallel_bulk_sales_never_oversell(app_db):
+    client, engine = app_db
+    (grain,), (wh_a, wh_b), (buyer,) = seed_masters(client, warehouses=("Godown A", "Godown B"))
+    for wh in (wh_a, wh_b):
+        purchase(client, grain, buyer, wh, STOCK_QTL, total_amount=STOCK_QTL * 2000)
+
+    def sell(i):
+        # Half the trucks load from A, half from B
+        wh = wh_a if i % 2 == 0 else wh_b
+        return client.post("/transactions/bulk_sale", json={
+            "contact_id": buyer["id"], "grain_id": grain["id"], "rate_per_quintal": 2500,
+            "total_weight_kg": SALE_KG, "warehouses": [{"warehouse_id": wh["id"], "bags": 10}],
+            "mandi_cost": 0
+        }).status_code
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_SALES) as pool:
+        codes = list(pool.map(sell, range(PARALLEL_SALES)))
+
+    per_wh_capacity = int(STOCK_QTL // (SALE_KG / 100))
+    assert codes.count(200) == 2 * per_wh_capacity, codes
+    assert codes.count(400) == PARALLEL_SALES - 2 * per_wh_capacity, codes
+
+    with Session(engine) as session:
+        for wh in (wh_a, wh_b):
+            sold = session.exec(select(func.sum(Transaction.quantity_quintal)).where(
+                Transaction.type == "sale", Transaction.warehouse_id == wh["id"]
+            )).one() or 0.0
+            balance = session.get(StockBalance, (grain["id"], wh["id"]))
+            assert sold <= STOCK_QTL + 1e-6
+            assert abs(balance.quantity_quintal - (STOCK_QTL - sold)) < 1e-6
+
+        # One invoice per successful truck, no duplicates
+        invoices = session.exec(select(Transaction.invoice_number).where(Transaction.type == "sale")).all()
+        assert len(set(invoices)) == len(invoices) == codes.count(200)
+
+def test_parallel_single_and_bulk_sales(app_db):
+    # Single and bulk sales both lock stock rows (sorted), then the invoice counter
+    # (on Postgres two orders under this mix would deadlock)
+    client, engine = app_db
+    (grain,), (wh_a, wh_b), (buyer,) = seed_masters(client, warehouses=("Godown A", "Godown B"))
+    for wh in (wh_a, wh_b):
+        purchase(client, grain, buyer, wh, 1000, total_amount=2000000)
+
+    def sell(i):
+        if i % 2 == 0:
+            return client.post("/transactions/bulk_sale", json={
+                "contact_id": buyer["id"], "grain_id": grain["id"], "rate_per_quintal": 2500,
+                "total_weight_kg": SALE_KG, "mandi_cost": 0,
+                "warehouses": [{"warehouse_id": wh_a["id"], "bags": 5}, {"warehouse_id": wh_b["id"], "bags": 5}]
+            }).status_code
+        return client.post("/transactions/", json={
+            "type": "sale", "grain_id": grain["id"], "contact_id": buyer["id"],
+            "warehouse_id": (wh_a if i % 4 == 1 else wh_b)["id"], "quantity_quintal": SALE_KG / 100,
+            "rate_per_quintal": 2500, "total_amount": 0
+        }).status_code
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_SALES) as pool:
+        codes = list(pool.map(sell, range(PARALLEL_SALES)))
+    assert codes == [200] * PARALLEL_SALES, codes
+
+    with Session(engine) as session:
+        for wh in (wh_a, wh_b):
+            sold = session.exec(select(func.sum(Transaction.quantity_quintal)).where(
+                Transaction.type == "sale", Transaction.warehouse_id == wh["id"]
+            )).one()
+            balance = session.get(StockBalance, (grain["id"], wh["id"]))
+            assert abs(balance.quantity_quintal - (1000 - sold)) < 1e-6
+
+        # One number per bill: a bulk sale's rows share theirs, single sales get their own
+        rows = session.exec(select(Transaction.invoice_number, Transaction.sale_group_id).where(Transaction.type == "sale")).all()
+        bills = {group or f"single-{number}" for number, group in rows}
+        assert len({number for number, _ in rows}) == len(bills) == PARALLEL_SALES
+
+def _bulk_sale(client, grain, buyer, warehouses, kg=SALE_KG):
+    return client.post("/transactions/bulk_sale", json={
+        "contact_id": buyer["id"], "grain_id": grain["id"], "rate_per_quintal": 2500,
+        "total_weight_kg": kg, "mandi_cost": 0,
+        "warehouses": [{"warehouse_id": wh["id"], "bags": 5} for wh in warehouses]
+    }).status_code
+
+def test_parallel_warehouse_edits_and_bulk_sales(app_db):
+    # Moving a purchase to another warehouse writes both stock rows and GrainCost, a bulk sale writes stock rows:
+    # every path takes them in one order, so this mix can't deadlock on Postgres
+    client, engine = app_db
+    (grain,), (wh_a, wh_b), (buyer,) = seed_masters(client, warehouses=("Godown A", "Godown B"))
+    for wh in (wh_a, wh_b):
+        purchase(client, grain, buyer, wh, 1000, total_amount=2000000)
+    lots = [purchase(client, grain, buyer, (wh_a, wh_b)[i % 2], 1) for i in range(PARALLEL_SALES // 2)]
+
+    def work(i):
+        if i % 2 == 0:
+            # A -> B and B -> A, so edits lock the two rows starting from either side
+            lot = lots[i // 2]
+            target = wh_b if lot["warehouse_id"] == wh_a["id"] else wh_a
+            res = client.put(f"/transactions/{lot['id']}", json={"warehouse_id": target["id"]})
+            return res.status_code
+        return _bulk_sale(client, grain, buyer, (wh_b, wh_a) if i % 4 == 1 else (wh_a, wh_b))
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_SALES) as pool:
+        codes = list(pool.map(work, range(PARALLEL_SALES)))
+    assert codes == [200] * PARALLEL_SALES, codes
+
+    with Session(engine) as session:
+        assert ledger.check(session) == []
+        for lot in lots:
+            assert session.get(Transaction, lot["id"]).warehouse_id != lot["warehouse_id"]
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="SQLite has no row locks, every writer waits (set TEST_DATABASE_URL)")
+def test_sales_wait_only_for_their_own_stock_row(app_db):
+    client, engine = app_db
+    (grain,), (wh_a, wh_b), (buyer,) = seed_masters(client, warehouses=("Godown A", "Godown B"))
+    for wh in (wh_a, wh_b):
+        purchase(client, grain, buyer, wh, STOCK_QTL, total_amount=STOCK_QTL * 2000)
+
+    with ThreadPoolExecutor(max_workers=2) as pool, engine.connect() as holder:
+        # Another writer mid-transaction on stock A and the grain's purchase totals
+        holder.execute(select(StockBalance).where(
+            StockBalance.grain_id == grain["id"], StockBalance.warehouse_id == wh_a["id"]
+        ).with_for_update()).all()
+        holder.execute(select(GrainCost).where(GrainCost.grain_id == grain["id"]).with_for_update()).all()
+
+        blocked = pool.submit(_bulk_sale, client, grain, buyer, [wh_a])
+        assert pool.submit(_bulk_sale, client, grain, buyer, [wh_b]).result(timeout=LOCK_WAIT_SECONDS) == 200
+        time.sleep(0.5)
+        assert not blocked.done()
+
+        holder.rollback()
+        assert blocked.result(timeout=LOCK_WAIT_SECONDS) == 200
@@ -0,0 +1,42 @@
+from cache import ResultCache, result_cache
+from conftest import seed_masters, purchase
+
+def test_cached_results_follow_writes(app_db):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    first = purchase(client, grain, party, warehouse, 10, total_amount=20000)
+
+    dashboard = client.get("/stats/dashboard").json()
+    report = client.post("/analytics/query", json={"report_type": "purchase"}).json()
+    hits = result_cache.hits
+    assert client.get("/stats/dashboard").json() == dashboard
+    assert client.post("/analytics/query", json={"report_type": "purchase"}).json() == report
+    assert result_cache.hits == hits + 2
+
+    # A write bumps the data version: the next reads recompute
+    purchase(client, grain, party, warehouse, 5, total_amount=10000)
+    after = client.get("/stats/dashboard").json()
+    assert after["total_payable"] == dashboard["total_payable"] + 10000
+    assert after["total_inventory_value"] == dashboard["total_inventory_value"] + 10000
+    assert len(client.post("/analytics/query", json={"report_type": "purchase"}).json()["rows"]) == len(report["rows"]) + 1
+
+    # So does a payment, which moves no stock
+    client.post(f"/transactions/{first['id']}/payment", json={"amount": 20000})
+    assert client.get("/stats/dashboard").json()["total_payable"] == after["total_payable"] - 20000
+
+def test_lru_eviction_under_the_byte_cap():
+    cache = ResultCache(max_bytes=30, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper(), 10)
+    assert cache.get("a") == (True, "A") # Now most recently used
+
+    cache.set("d", "D", 10)
+    assert cache.get("b") == (False, None)
+    assert [cache.get(key)[0] for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.evictions == 1 and cache.current_bytes == 30
+
+    # Replacing an entry frees its old size first, oversized values are not stored at all
+    cache.set("a", "AA", 20)
+    assert cache.get("c") == (False, None) and cache.current_bytes == 30
+    cache.set("huge", "X", 31)
+    assert cache.get("huge") == (False, None) and cache.get("a") == (True, "AA")
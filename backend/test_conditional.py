@@ -0,0 +1,57 @@
+from conftest import seed_masters, purchase
+
+def _revalidate(client, path, etag, **headers):
+    return client.get(path, headers={"If-None-Match": etag, **headers})
+
+def test_etags_change_after_writes(app_db):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    first = purchase(client, grain, party, warehouse, 10)
+
+    etags = {}
+    for path in ("/master/grains", "/master/warehouses", "/master/contacts", "/inventory/"):
+        res = client.get(path)
+        etags[path] = res.headers["etag"]
+        assert _revalidate(client, path, etags[path]).status_code == 304
+
+    def assert_changed(path, check_body):
+        # The old tag no longer matches: full 200 with the new body and a new tag, which then matches
+        res = _revalidate(client, path, etags[path])
+        assert res.status_code == 200 and res.headers["etag"] != etags[path]
+        assert check_body(res.json())
+        etags[path] = res.headers["etag"]
+        assert _revalidate(client, path, etags[path]).status_code == 304
+
+    client.post("/master/grains", json={"name": "Rice"})
+    assert_changed("/master/grains", lambda body: {"Wheat", "Rice"} == {g["name"] for g in body})
+    client.post("/master/warehouses", json={"name": "B"})
+    assert_changed("/master/warehouses", lambda body: len(body) == 2)
+    client.post("/master/contacts", json={"name": "Mohan", "type": "supplier"})
+    assert_changed("/master/contacts", lambda body: "Mohan" in {c["name"] for c in body})
+
+    purchase(client, grain, party, warehouse, 5)
+    assert_changed("/inventory/", lambda body: body[0]["total_quintal"] == 15)
+
+    # A payment moves no stock: every tag stays valid
+    client.post(f"/transactions/{first['id']}/payment", json={"amount": 100})
+    for path, etag in etags.items():
+        assert _revalidate(client, path, etag).status_code == 304, path
+
+def test_etag_is_weak_and_shared_by_every_encoding(app_db):
+    client, engine = app_db
+    # Big enough to be compressed
+    seed_masters(client, grains=[f"Grain {i}" for i in range(40)])
+
+    plain = client.get("/master/grains", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    etag = plain.headers["etag"]
+    assert etag.startswith('W/"')
+
+    for encoding in ("br", "gzip"):
+        res = client.get("/master/grains", headers={"Accept-Encoding": encoding})
+        assert res.headers["content-encoding"] == encoding and res.headers["etag"] == etag
+        not_modified = _revalidate(client, "/master/grains", etag, **{"Accept-Encoding": encoding})
+        assert not_modified.status_code == 304 and not_modified.headers["etag"] == etag
+
+    # Clients that drop the W/ prefix still match (weak comparison)
+    assert _revalidate(client, "/master/grains", etag[2:]).status_code == 304
@@ -0,0 +1,81 @@
+import random
+from sqlmodel import Session, select
+
+from models import Transaction
+import ledger
+from conftest import seed_masters
+
+TOLERANCE = 0.01
+
+def _legacy_dashboard(transactions):
+    # The full-scan computation /stats/dashboard used before the incremental totals
+    inventory_data = {}
+    total_receivable = 0.0
+    total_payable = 0.0
+    for trx in transactions:
+        data = inventory_data.setdefault(trx.grain_id, {"qty": 0, "val": 0, "purchased_qty": 0})
+        if trx.type == 'sale':
+            loss_amt = (trx.shortage_quantity * trx.rate_per_quintal) + trx.deduction_amount
+            real_pending = (trx.total_amount - loss_amt) - trx.amount_paid
+            if real_pending > 0: total_receivable += real_pending
+            data["qty"] -= trx.quantity_quintal
+        elif trx.type == 'purchase':
+            pending = trx.total_amount - trx.amount_paid
+            if pending > 0: total_payable += pending
+            data["qty"] += trx.quantity_quintal
+            data["val"] += trx.total_amount
+            data["purchased_qty"] += trx.quantity_quintal
+
+    total_inventory_value = 0.0
+    for data in inventory_data.values():
+        if data["qty"] > 0 and data["purchased_qty"] > 0:
+            total_inventory_value += data["qty"] * (data["val"] / data["purchased_qty"])
+
+    return {
+        "total_receivable": total_receivable,
+        "total_payable": total_payable,
+        "total_inventory_value": total_inventory_value
+    }
+
+def test_dashboard_summary_tracks_every_write(app_db):
+    rng = random.Random(7)
+    client, engine = app_db
+    grains, warehouses, (party,) = seed_masters(client, grains=("Wheat", "Rice"), warehouses=("A", "B"))
+
+    ids = []
+    for i in range(60):
+        trx_type = rng.choice(["purchase", "purchase", "sale"])
+        res = client.post("/transactions/", json={
+            "type": trx_type, "grain_id": rng.choice(grains)["id"], "contact_id": party["id"],
+            "warehouse_id": rng.choice(warehouses)["id"], "quantity_quintal": round(rng.uniform(1, 50), 2),
+            "number_of_bags": rng.randrange(0, 100), "rate_per_quintal": round(rng.uniform(2000, 3000), 2),
+            "total_amount": 0, "amount_paid": rng.choice([0.0, 1000.0])
+        })
+        assert res.status_code == 200, res.text
+        ids.append(res.json()["id"])
+
+        action = rng.choice(["none", "pay", "edit_amounts", "edit_stock", "delete"])
+        trx_id = rng.choice(ids)
+        if action == "pay":
+            client.post(f"/transactions/{trx_id}/payment", json={"amount": 500.0})
+        elif action == "edit_amounts":
+            res = client.put(f"/transactions/{trx_id}", json={
+                "shortage_quantity": round(rng.uniform(0, 1), 2), "deduction_amount": 250.0, "amount_paid": 2000.0
+            })
+            assert res.status_code == 200, res.text
+        elif action == "edit_stock":
+            res = client.put(f"/transactions/{trx_id}", json={
+                "quantity_quintal": round(rng.uniform(1, 50), 2), "warehouse_id": rng.choice(warehouses)["id"]
+            })
+            assert res.status_code == 200, res.text
+        elif action == "delete":
+            assert client.delete(f"/transactions/{trx_id}").status_code == 200
+            ids.remove(trx_id)
+
+        if i % 15 == 14:
+            with Session(engine) as session:
+                expected = _legacy_dashboard(session.exec(select(Transaction)).all())
+                assert ledger.check(session) == []
+            actual = client.get("/stats/dashboard").json()
+            for field, value in expected.items():
+                assert abs(actual[field] - value) <= TOLERANCE, (field, actual[field], value)
@@ -0,0 +1,66 @@
+import queue
+import logging
+from contextlib import contextmanager
+from sqlalchemy import event
+
+import database
+import db_metrics
+from logger import ContextQueueHandler
+from conftest import seed_masters, purchase
+
+@contextmanager
+def _statements(engine):
+    # Every statement the app sends, on either engine (the async reader has its own)
+    executed = []
+    engines = [engine] + ([database.async_engine.sync_engine] if database.async_engine is not None else [])
+    record = lambda conn, cursor, statement, *args: executed.append(statement)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield executed
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", record)
+
+def test_db_headers_count_the_request_queries(app_db):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    for _ in range(3):
+        purchase(client, grain, party, warehouse, 10)
+
+    with _statements(engine) as executed:
+        res = client.get("/transactions/page", params={"limit": 2})
+    assert int(res.headers["X-DB-Query-Count"]) == len(executed)
+    assert sum("FROM \"transaction\"" in statement for statement in executed) == 1 # One keyset query
+    assert float(res.headers["X-DB-Time-Ms"]) >= 0
+
+    res = client.get("/health")
+    assert res.headers["X-DB-Query-Count"] == "0" and res.headers["X-DB-Time-Ms"] == "0.0"
+
+    # Writes count every statement of the request, and /stats/db keeps the same numbers
+    trx = purchase(client, grain, party, warehouse, 1)
+    with _statements(engine) as executed:
+        res = client.post(f"/transactions/{trx['id']}/payment", json={"amount": 10})
+    assert int(res.headers["X-DB-Query-Count"]) == len(executed) > 1
+    last = client.get("/stats/db").json()["requests"][-1]
+    assert last["path"].endswith("/payment") and last["query_count"] == len(executed)
+
+def test_slow_query_log(app_db, monkeypatch):
+    client, _ = app_db
+    records = queue.SimpleQueue()
+    capture = ContextQueueHandler(records)
+    slow = logging.getLogger("slow_query")
+    slow.addHandler(capture)
+    try:
+        client.get("/master/warehouses", headers={"X-Request-ID": "fast"})
+        monkeypatch.setattr(db_metrics, "SLOW_QUERY_MS", 0) # Every statement is over the threshold
+        client.get("/master/grains", headers={"X-Request-ID": "slow"})
+    finally:
+        slow.removeHandler(capture)
+
+    logged = []
+    while not records.empty():
+        logged.append(records.get())
+    assert logged and all(record.request_id == "slow" and record.levelno == logging.WARNING for record in logged)
+    (select,) = [record.getMessage() for record in logged if "FROM grain" in record.getMessage()]
+    assert select.startswith("Slow query (") and "| params:" in select
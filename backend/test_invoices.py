@@ -0,0 +1,80 @@
+from datetime import datetime
+from sqlmodel import Session
+
+import invoices
+from models import Transaction, InvoiceSequence
+from conftest import seed_masters
+
+def test_numbers_restart_each_financial_year(engine, monkeypatch):
+    monkeypatch.setattr(invoices, "INVOICE_RESET_YEARLY", True)
+    with Session(engine) as session:
+        def sale(date):
+            number = invoices.next_invoice_number(session, "sale", date)
+            session.commit()
+            return number
+
+        assert [sale(datetime(2025, 3, 30, 10)), sale(datetime(2025, 3, 31, 23, 59))] == [1, 2]
+        assert [sale(datetime(2025, 4, 1)), sale(datetime(2025, 4, 2, 9))] == [1, 2] # FY 2025-26
+        assert sale(datetime(2025, 3, 31, 12)) == 3 # A late entry for the old year continues its sequence
+
+        assert session.get(InvoiceSequence, ("sale", "2024-25")).last_value == 3
+        assert session.get(InvoiceSequence, ("sale", "2025-26")).last_value == 2
+
+    # POST /transactions/ passes the body's date as an ISO string
+    assert invoices.sequence_scope("2026-03-31T23:59:59") == "2025-26"
+    assert invoices.sequence_scope("2026-04-01T00:00:00") == "2026-27"
+
+def _numbered_sales(session, grain, warehouse, party, numbers, date=datetime(2025, 6, 1)):
+    # Invoices from before the counter existed (imports, old versions)
+    for number in numbers:
+        session.add(Transaction(
+            type="sale", date=date, invoice_number=number, grain_id=grain["id"], contact_id=party["id"],
+            warehouse_id=warehouse["id"], quantity_quintal=1, rate_per_quintal=2500, total_amount=2500
+        ))
+    session.commit()
+
+def test_missing_counter_is_seeded_from_existing_invoices(app_db, monkeypatch):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    with Session(engine) as session:
+        _numbered_sales(session, grain, warehouse, party, [5, 41, 17])
+        assert invoices.next_invoice_number(session, "sale", count=3) == 42
+        assert invoices.next_invoice_number(session, "purchase") == 1 # Own sequence
+        session.commit()
+        assert session.get(InvoiceSequence, ("sale", "")).last_value == 44
+
+    # Per financial year: only that year's invoices seed its counter
+    monkeypatch.setattr(invoices, "INVOICE_RESET_YEARLY", True)
+    with Session(engine) as session:
+        _numbered_sales(session, grain, warehouse, party, [7], date=datetime(2024, 12, 1))
+        assert invoices.next_invoice_number(session, "sale", datetime(2025, 1, 15)) == 8
+        assert invoices.next_invoice_number(session, "sale", datetime(2025, 5, 1)) == 42
+        session.commit()
+
+def test_counter_created_concurrently_is_used_after_savepoint_rollback(app_db, monkeypatch):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    with Session(engine) as session:
+        _numbered_sales(session, grain, warehouse, party, [41])
+        # Another request created the counter (and used it) after this one looked for it
+        session.add(InvoiceSequence(type="sale", financial_year="", last_value=100))
+        session.commit()
+
+    real_lock = invoices._lock_sequence
+    lookups = []
+    def racing_lock(session, trx_type, fy):
+        lookups.append(fy)
+        return None if len(lookups) == 1 else real_lock(session, trx_type, fy)
+    monkeypatch.setattr(invoices, "_lock_sequence", racing_lock)
+
+    with Session(engine) as session:
+        # Seeding from max(41) hits the primary key, the savepoint rolls back and the existing row is locked
+        assert invoices.next_invoice_number(session, "sale") == 101
+        assert len(lookups) == 2
+        # The outer transaction survived the failed insert
+        session.add(Transaction(
+            type="sale", invoice_number=101, grain_id=grain["id"], contact_id=party["id"],
+            warehouse_id=warehouse["id"], quantity_quintal=1, rate_per_quintal=2500, total_amount=2500
+        ))
+        session.commit()
+        assert session.get(InvoiceSequence, ("sale", "")).last_value == 101
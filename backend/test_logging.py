@@ -0,0 +1,27 @@
+import json
+import queue
+import logging
+
+from logger import ContextQueueHandler, JsonFormatter
+
+def test_access_log_records_carry_route_template(app_db):
+    client, _ = app_db
+    # Same stamping as the app's own queue handler, onto a queue read here
+    records = queue.SimpleQueue()
+    capture = ContextQueueHandler(records)
+    access = logging.getLogger("access")
+    access.addHandler(capture)
+    try:
+        client.delete("/transactions/12345", headers={"X-Request-ID": "req-1"})
+        client.get("/inventory/", headers={"X-Request-ID": "req-2"})
+    finally:
+        access.removeHandler(capture)
+
+    lines = []
+    while not records.empty():
+        lines.append(json.loads(JsonFormatter().format(records.get())))
+    by_request = {line["request_id"]: line for line in lines}
+    assert by_request["req-1"]["route"] == "/transactions/{transaction_id}"
+    assert by_request["req-1"]["status_code"] == 200
+    assert by_request["req-2"]["route"] == "/inventory/"
+    assert "duration_ms" in by_request["req-2"]
@@ -0,0 +1,26 @@
+from conftest import seed_masters, purchase
+
+def _counter(text, series):
+    # Value of one series in the Prometheus text, 0 if absent (counters are process-wide, so compare deltas)
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_metrics_are_labelled_with_route_templates(app_db):
+    client, _ = app_db
+    delete_series = 'http_requests_total{method="DELETE",route="/transactions/{transaction_id}",status="200"}'
+    deletes_before = _counter(client.get("/metrics").text, delete_series)
+
+    (grain,), (warehouse,), (party,) = seed_masters(client, contacts=(("Party", "supplier"),))
+    trx = purchase(client, grain, party, warehouse, 10)
+    assert client.delete(f"/transactions/{trx['id']}").status_code == 200
+    client.get("/inventory/")
+    client.get("/no-such-route")
+
+    text = client.get("/metrics").text
+    # Endpoints of included routers get their own template, not the 404 label
+    assert _counter(text, delete_series) == deletes_before + 1
+    assert _counter(text, 'http_requests_total{method="POST",route="/transactions/",status="200"}') >= 1
+    assert _counter(text, 'http_request_duration_seconds_count{method="GET",route="/inventory/"}') >= 1
+    assert _counter(text, 'http_requests_total{method="GET",route="unmatched",status="404"}') >= 1
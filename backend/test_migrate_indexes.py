@@ -0,0 +1,22 @@
+from sqlalchemy import inspect, text
+
+import migrate_indexes
+
+def test_indexes_on_columns_an_old_database_lacks_are_skipped(engine, monkeypatch):
+    # Schema from before delta sync: no updated_at column on the transaction table.
+    # It also still has the retired stock-sum index
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_transaction_updated_at"))
+        conn.execute(text('ALTER TABLE "transaction" DROP COLUMN updated_at'))
+        conn.execute(text("DROP INDEX ix_transaction_type_date"))
+        conn.execute(text('CREATE INDEX ix_transaction_type_grain_warehouse ON "transaction" (type, grain_id, warehouse_id)'))
+    monkeypatch.setattr(migrate_indexes, "engine", engine)
+
+    migrate_indexes.ensure_indexes()
+    indexes = {i["name"] for i in inspect(engine).get_indexes("transaction")}
+    assert "ix_transaction_type_date" in indexes
+    assert "ix_transaction_updated_at" not in indexes
+    assert "ix_transaction_type_grain_warehouse" not in indexes
+    assert migrate_indexes.check_query_plans()
+
+    migrate_indexes.ensure_indexes() # Idempotent
@@ -0,0 +1,54 @@
+import os
+import json
+from sqlmodel import Session
+
+from models import User, Transaction
+from routers.auth import create_access_token
+from cache import result_cache
+from conftest import seed_masters
+
+# Enough rows that the analytics query runs for many sampling intervals
+PROFILED_ROWS = 5000
+
+def _read_profile(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+def test_admin_can_profile_router_endpoint(app_db):
+    client, engine = app_db
+    (grain,), (warehouse,), (party,) = seed_masters(client)
+    with Session(engine) as session:
+        session.add(User(username="boss", password_hash="-", role="admin", permissions='["all"]', token_version=1))
+        session.add(User(username="clerk", password_hash="-", role="user", permissions='[]', token_version=1))
+        session.add_all(Transaction(
+            type="sale" if i % 3 else "purchase", grain_id=grain["id"], contact_id=party["id"], warehouse_id=warehouse["id"],
+            quantity_quintal=10, rate_per_quintal=2000 + i % 100, total_amount=20000, invoice_number=i
+        ) for i in range(PROFILED_ROWS))
+        session.commit()
+
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': 'boss', 'v': 1})}", "X-Profile": "1"}
+    clerk = {"Authorization": f"Bearer {create_access_token({'sub': 'clerk', 'v': 1})}", "X-Profile": "1"}
+
+    # Caches warmed by plain requests: the profiled ones must do the work again, not return the cached result
+    etag = client.get("/inventory/").headers["etag"]
+    expected = client.post("/analytics/query", json={"report_type": "profit"}).json()
+    hits = result_cache.hits
+
+    res = client.get("/inventory/", headers=admin)
+    assert res.status_code == 200 and res.headers["etag"] == etag
+    profile = _read_profile(res.headers["x-profile-file"])
+    assert profile["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    assert profile["name"].startswith("GET /inventory/")
+
+    res = client.post("/analytics/query", json={"report_type": "profit"}, headers=admin)
+    assert res.status_code == 200 and res.json() == expected
+    profile = _read_profile(res.headers["x-profile-file"])
+    assert profile["profiles"]
+    assert "_get_analytics_data" in {frame["name"] for frame in profile["shared"]["frames"]}
+    assert result_cache.hits == hits
+
+    # Non-admins are served normally, without a profile
+    assert "x-profile-file" not in client.get("/inventory/", headers=clerk).headers
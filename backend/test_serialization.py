@@ -0,0 +1,53 @@
+from typing import List
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+
+from models import Transaction
+from conftest import seed_masters, purchase
+
+def test_lean_lists_and_compression(app_db):
+    client, engine = app_db
+    (grain,), warehouses, (party,) = seed_masters(client, warehouses=("A", "B"))
+    for i in range(30):
+        purchase(client, grain, party, warehouses[i % 2], 10.5, number_of_bags=17, notes="Gehūn ✓")
+    sale = client.post("/transactions/bulk_sale", json={
+        "contact_id": party["id"], "grain_id": grain["id"], "rate_per_quintal": 2500, "total_weight_kg": 1000,
+        "warehouses": [{"warehouse_id": w["id"], "bags": 10} for w in warehouses]
+    }).json()
+    client.post(f"/transactions/{sale[0]['id']}/payment", json={"amount": 100})
+
+    # Lean path: same JSON the response_model produced from ORM objects (keys now in declaration order)
+    with Session(engine) as session:
+        adapter = TypeAdapter(List[Transaction])
+        everything = session.exec(select(Transaction)).all()
+        assert client.get("/transactions/").json() == adapter.dump_python(everything, mode="json")
+        newest = session.exec(select(Transaction).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(5)).all()
+    page = client.get("/transactions/page", params={"limit": 5}).json()
+    assert page["items"] == adapter.dump_python(newest, mode="json")
+    assert client.get("/transactions/page", params={"limit": 5, "cursor": page["next_cursor"]}).json()["items"][0]["id"] != newest[-1].id
+
+    plain = client.get("/transactions/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and "Accept-Encoding" in plain.headers["vary"]
+    for accept, encoding in (("gzip, deflate, br", "br"), ("gzip", "gzip"), ("br;q=0, gzip", "gzip")):
+        res = client.get("/transactions/", headers={"Accept-Encoding": accept})
+        assert res.headers["content-encoding"] == encoding
+        assert int(res.headers["content-length"]) < len(plain.content) / 3
+        assert res.content == plain.content # Decoded by the client
+
+    # Small responses go out as is
+    assert "content-encoding" not in client.get("/health", headers={"Accept-Encoding": "br"}).headers
+
+    # Conditional GET still works on a compressed response
+    res = client.get("/master/grains", headers={"Accept-Encoding": "gzip"})
+    assert client.get("/master/grains", headers={"Accept-Encoding": "gzip", "If-None-Match": res.headers["etag"]}).status_code == 304
+
+    # Streamed CSV export: compressed chunk by chunk, no Content-Length
+    csv_plain = client.post("/analytics/export", json={"report_type": "purchase"}, headers={"Accept-Encoding": "identity"})
+    assert csv_plain.status_code == 200 and csv_plain.content.count(b"\n") > 30
+    for encoding in ("br", "gzip"):
+        res = client.post("/analytics/export", json={"report_type": "purchase"}, headers={"Accept-Encoding": encoding})
+        assert res.headers["content-encoding"] == encoding and "content-length" not in res.headers
+        assert res.content == csv_plain.content
+
+    report = client.post("/analytics/query", json={"report_type": "purchase"})
+    assert report.status_code == 200 and report.headers["content-type"] == "application/json"
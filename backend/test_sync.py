@@ -0,0 +1,55 @@
+from sqlmodel import create_engine, text
+from sqlalchemy import inspect
+
+import changes
+from conftest import seed_masters, purchase
+
+def _ids(payload, key):
+    return sorted(row["id"] for row in payload[key])
+
+def test_sync_returns_only_changes_since_cursor(app_db, monkeypatch):
+    client, _ = app_db
+    monkeypatch.setattr(changes, "SYNC_OVERLAP_SECONDS", 0)
+    (wheat, rice), (godown,), (party,) = seed_masters(client, grains=("Wheat", "Rice"))
+    purchases = [purchase(client, wheat, party, godown, 10) for _ in range(3)]
+
+    # First sync: full snapshot
+    first = client.get("/sync").json()
+    assert first["reset"] is True
+    assert _ids(first, "grains") == sorted([wheat["id"], rice["id"]])
+    assert _ids(first, "transactions") == sorted(p["id"] for p in purchases)
+
+    # Nothing changed: empty delta
+    empty = client.get("/sync", params={"since": first["cursor"]}).json()
+    assert empty["reset"] is False
+    assert all(empty[key] == [] for key in changes.SYNCED_MODELS)
+    assert all(ids == [] for ids in empty["deleted"].values())
+
+    # One edit, one payment, one delete, one master change
+    assert client.put(f"/master/grains/{rice['id']}", json={"name": "Rice", "standard_bharti": 50}).status_code == 200
+    client.post(f"/transactions/{purchases[0]['id']}/payment", json={"amount": 500})
+    assert client.delete(f"/transactions/{purchases[1]['id']}").status_code == 200
+
+    delta = client.get("/sync", params={"since": empty["cursor"]}).json()
+    assert delta["reset"] is False
+    assert _ids(delta, "grains") == [rice["id"]]
+    assert _ids(delta, "transactions") == [purchases[0]["id"]]
+    assert len(delta["payments"]) == 1
+    assert delta["deleted"]["transactions"] == [purchases[1]["id"]]
+    assert delta["warehouses"] == [] and delta["contacts"] == []
+
+    assert client.get("/sync", params={"since": "not-a-cursor"}).status_code == 400
+
+def test_add_sync_columns_upgrades_old_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE grain (id INTEGER PRIMARY KEY, name VARCHAR, hindi_name VARCHAR, standard_bharti FLOAT)'))
+        conn.execute(text("INSERT INTO grain (name, standard_bharti) VALUES ('Wheat', 60)"))
+    try:
+        assert changes.add_sync_columns(engine) == ["grain"]
+        assert changes.add_sync_columns(engine) == []
+        inspector = inspect(engine)
+        assert "updated_at" in {c["name"] for c in inspector.get_columns("grain")}
+        assert "ix_grain_updated_at" in {i["name"] for i in inspector.get_indexes("grain")}
+    finally:
+        engine.dispose()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+
+from models import Transaction, DispatchInfo
+from conftest import seed_masters
+
+TRANSPORTERS = ["Sharma Roadways", "SHARMA roadways", "100% Carriers", "A_B Transport", "AxB Transport", None]
+
+def _legacy_report(session: Session, transporter=None):
+    # The per-dispatch loop /reports/transport used before the single query (filter applied the same way)
+    rows = []
+    for d in session.exec(select(DispatchInfo)).all():
+        trx = session.exec(select(Transaction).where(Transaction.sale_group_id == d.sale_group_id)).first()
+        if not trx:
+            continue # Orphan dispatch records are skipped
+        if transporter and transporter.lower() not in (d.transporter_name or "").lower():
+            continue
+
+        deductions = d.shortage_deduction + d.other_deduction
+        pending = d.gross_freight - d.advance_paid - d.delivery_paid - deductions
+        status = "Pending"
+        if pending < 1:
+            status = "Paid"
+        elif d.advance_paid + d.delivery_paid > 0:
+            status = "Partial"
+        rows.append({
+            "dispatch_id": d.id, "date": trx.date.isoformat(), "invoice_number": trx.invoice_number,
+            "transporter_name": d.transporter_name or "Unknown", "vehicle_number": d.vehicle_number,
+            "total_weight": d.total_weight, "rate": d.rate, "gross_freight": d.gross_freight,
+            "advance_paid": d.advance_paid, "delivery_paid": d.delivery_paid,
+            "shortage_deduction": d.shortage_deduction, "other_deduction": d.other_deduction,
+            "total_deduction": deductions, "balance_pending": pending, "status": status
+        })
+    return rows
+
+def test_transport_report_matches_per_row_version(app_db):
+    client, engine = app_db
+    (grain,), warehouses, (party,) = seed_masters(client, warehouses=("A", "B"))
+    start = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        for i in range(24):
+            group = f"group-{i}"
+            # Two rows per bill: the first (lowest id) carries the bill date and invoice number
+            for j, warehouse in enumerate(warehouses):
+                session.add(Transaction(
+                    type="sale", date=start + timedelta(days=i % 7, hours=j), invoice_number=i + 1,
+                    grain_id=grain["id"], contact_id=party["id"], warehouse_id=warehouse["id"],
+                    quantity_quintal=5, rate_per_quintal=2500, total_amount=12500, sale_group_id=group
+                ))
+                session.flush()
+            session.add(DispatchInfo(
+                sale_group_id=group, transporter_name=TRANSPORTERS[i % len(TRANSPORTERS)], vehicle_number=f"MP09 {i}",
+                rate=50, total_weight=10, gross_freight=500, advance_paid=(0, 100, 500)[i % 3], other_deduction=i % 2
+            ))
+        # Orphans: the bill's transactions are gone
+        session.add(DispatchInfo(sale_group_id="deleted-bill", transporter_name="Sharma Roadways", gross_freight=800))
+        session.commit()
+
+        for transporter in (None, "sharma", "%", "_", "a_b", "nobody"):
+            expected = _legacy_report(session, transporter)
+            params = {"transporter": transporter} if transporter else {}
+            actual = client.get("/reports/transport", params=params).json()
+            # Same rows (the old sort left same-date rows in table order), newest first
+            assert sorted(actual, key=lambda r: r["dispatch_id"]) == sorted(expected, key=lambda r: r["dispatch_id"]), transporter
+            assert [r["date"] for r in actual] == sorted((r["date"] for r in expected), reverse=True)
+
+        # "%" and "_" are literal characters, not wildcards
+        names = lambda params: {r["transporter_name"] for r in client.get("/reports/transport", params=params).json()}
+        assert names({"transporter": "%"}) == {"100% Carriers"}
+        assert names({"transporter": "a_b"}) == {"A_B Transport"}
+
+        page = client.get("/reports/transport", params={"skip": 5, "limit": 5}).json()
+        assert page == client.get("/reports/transport").json()[5:10]